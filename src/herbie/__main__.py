@@ -25,6 +25,9 @@ def set_logging(log_level="DEBUG", log_file=None):
 @click.group()
 @click.option("-h", "--hc", default="herbstclient",
               help="Set the herbstclient executable name")
+@click.option("-t", "--transport", default="pipe",
+              type=click.Choice(["pipe", "exec"]),
+              help="Talk to herbstclient via one --binary-pipe or exec per call")
 @click.option("-c", "--config",
               type=click.Path(),
               help="Set configuration file")
@@ -33,9 +36,10 @@ def set_logging(log_level="DEBUG", log_file=None):
 @click.option("-L", "--log-level", default="INFO",
               help="Set log level")
 @click.pass_context
-def cli(ctx, hc, log_file, log_level, config):
+def cli(ctx, hc, transport, log_file, log_level, config):
     import herbie.astluft
     herbie.astluft.herbstclient = hc
+    herbie.astluft.transport = transport
     set_logging(log_level.upper(), log_file)
     ctx.obj = Herbie(config)
 
@@ -49,12 +53,98 @@ def version():
     print(herbie.__version__)
 
 @cli.command("hooks")
+@click.option("-r", "--record", type=click.Path(),
+              help="Record hooks, herbstclient calls and menus to file")
+@click.option("-T", "--trace", type=click.Path(),
+              help="Write a Chrome trace of hooks, calls and menus to file")
 @click.pass_context
-def hooks(ctx):
+def hooks(ctx, record, trace):
     '''
     Start herbie loop and respond react to herbstlufwm hooks
     '''
-    asyncio.run(ctx.obj.run())
+    recorder = tracer = None
+    if record:
+        from herbie.record import Recorder
+        recorder = Recorder(record)
+        recorder.install(ctx.obj)
+    if trace:
+        from herbie.trace import Tracer
+        tracer = Tracer(trace)
+        tracer.install(ctx.obj)
+    try:
+        asyncio.run(ctx.obj.run())
+    finally:
+        if recorder:
+            recorder.close()
+        if tracer:
+            tracer.close()
+
+
+@cli.command("replay")
+@click.option("-f", "--fast", is_flag=True,
+              help="Feed hooks as fast as handlers allow")
+@click.option("-T", "--trace", type=click.Path(),
+              help="Write a Chrome trace of the replay to file")
+@click.argument("path", type=click.Path(exists=True))
+@click.pass_context
+def replay(ctx, fast, trace, path):
+    '''
+    Drive herbie from a recording made by "hooks --record", without a WM
+    '''
+    from herbie.record import replay
+    tracer = None
+    if trace:
+        from herbie.trace import Tracer
+        tracer = Tracer(trace)
+        tracer.install(ctx.obj)
+    try:
+        got = asyncio.run(replay(ctx.obj, path, fast))
+    finally:
+        if tracer:
+            tracer.close()
+    for key, value in got.items():
+        print(f'{key}: {value}')
+
+
+@cli.command("stats")
+@click.option("-j", "--json", "as_json", is_flag=True,
+              help="Print the measures as JSON")
+@click.option("-p", "--prometheus", is_flag=True,
+              help="Print the measures in the Prometheus text format")
+@click.option("-w", "--wait", default=2.0,
+              help="Seconds to wait for the running herbie to save")
+@click.pass_context
+def stats(ctx, as_json, prometheus, wait):
+    '''
+    Print latency measures of the running herbie
+    '''
+    import json
+    import time
+    import subprocess
+    import herbie.astluft
+    import herbie.stats as stats
+    path = stats.default_path()
+    before = path.stat().st_mtime_ns if path.exists() else None
+    subprocess.run([herbie.astluft.herbstclient, "emit_hook", "herbie_stats"])
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if path.exists() and path.stat().st_mtime_ns != before:
+            break
+        time.sleep(0.05)
+    else:
+        if not path.exists():
+            raise click.ClickException(f'no stats saved to {path}')
+        log.warning(f'showing stats not updated by herbie in {wait}s')
+    data = json.loads(path.read_text())
+    if as_json:
+        print(json.dumps(data, indent=1))
+        return
+    hists, counts = stats.undump(data)
+    if prometheus:
+        print(stats.prometheus(hists, counts), end='')
+        return
+    for line in stats.lines(hists, counts):
+        print(line)
 
 
 def main():
@@ -1,18 +1,28 @@
 import os
 import sys
+import math
+import itertools
+from time import monotonic
+import shlex
 import asyncio
 import configparser
 from pathlib import Path
-from anytree.resolver import Resolver, ChildResolverError
-from herbie.util import make_tree, render_split
-from herbie.hmenu import Menu, Item, Rofi 
+from herbie.hmenu import Menu, Item, Rofi, Ready
+from herbie.state import Mirror
+from herbie.dispatch import Dispatcher, policies
 import herbie.alayouts as layouts
+import herbie.events as events
+import herbie.frames as frames
+import herbie.icons
+import herbie.similar as similar
+import herbie.fuzzy as fuzzy
+import herbie.stats as stats
+import herbie.hmenu
 import datetime
 
+import herbie.astluft
 from herbie.astluft import (
-    hc, now, get_layout, tag_status, window_info,
-    window_times, window_ids, tag_times, focused_tag,
-    init_my_focus_time, clear_tag)
+    hc, hc_batch, now, get_layout, init_my_focus_time, clear_tags, write_behind)
 
 import logging
 log = logging.getLogger("herbie")
@@ -24,6 +34,7 @@ def get_config(cfgfile=None):
 
     if not cfgfile:             # old spot
         cfgfile = home / ".herbierc"
+    cfgfile = Path(cfgfile)
 
     if cfgfile.exists():
         log.info(f"loading {cfgfile}")
@@ -46,6 +57,24 @@ def get_config(cfgfile=None):
 
 class Herbie:
 
+    # Methods handling the hook of the same name.
+    hooks = (
+        "reinit_idle", "tag_added", "tag_changed", "focus_changed",
+        "last_window", "reload", "herbie_stats", "rule",
+        "task_start", "task_clear", "window_menu",
+        "layout_load", "layout_load_any", "layout_save", "layout_drop",
+        "window_jump_tag", "window_jump_any")
+
+    # Concurrency policy by hook, see herbie.dispatch.  Hooks not listed are
+    # serialized.  The [hooks] config section may override.
+    hook_policies = dict(
+        focus_changed="fast", tag_changed="fast", tag_added="fast",
+        reinit_idle="fast", rule="fast",
+        window_jump_tag="drop", window_jump_any="drop", window_menu="drop",
+        layout_load="drop", layout_load_any="drop",
+        layout_save="drop", layout_drop="drop",
+        task_start="drop", task_clear="drop")
+
     def __init__(self, cfgfile):
         self.cfgfile = cfgfile
         self.cfg = get_config(cfgfile)
@@ -60,34 +89,197 @@ class Herbie:
             for k in self.cfg[sec]:
                 secd[k] = self.cfg[sec][k]
             self.wincfg[name] = secd
+        self.state = Mirror()
+        # Whether to keep my_focus_time attributes in herbstluftwm for the
+        # benefit of other tools.  herbie itself uses self.state.history.
+        self.focus_attrs = self.cfg.getboolean("herbie", "focus_attrs",
+                                               fallback=True)
+        # Attribute writes within this many seconds are coalesced.
+        write_behind.window = self.cfg.getfloat("herbie", "write_window",
+                                                fallback=0.5)
+
+        hook_policies = dict(self.hook_policies)
+        if "hooks" in self.cfg:
+            for hook, policy in self.cfg["hooks"].items():
+                if policy not in policies:
+                    log.warning(f'unknown policy "{policy}" for hook {hook}')
+                    continue
+                hook_policies[hook] = policy
+        self.dispatcher = Dispatcher(hook_policies)
+
+        # Seconds to wait for the windows of a task to appear.
+        self.task_timeout = self.cfg.getfloat("herbie", "task_timeout",
+                                              fallback=10.0)
+        # Futures of windows placed by our rules, by rule hook name.
+        self.placing = dict()
+        self._rule_ids = itertools.count()
+
+        # Number of layout icons to keep cached on disk.
+        herbie.icons.cache().capacity = self.cfg.getint(
+            "herbie", "icon_cache_size", fallback=512)
+
+        # Where layouts are stored, "files" or "db".
+        self.store = layouts
+        if self.cfg.get("herbie", "layout_store", fallback="files") == "db":
+            from herbie import db
+            db.connection()
+            got = db.migrate()
+            if got:
+                log.info(f'copied {got} layouts into {db.default_path}')
+            self.store = db
+
+        # Menus kept ready to show, rebuilt in the background on changes.
+        self.ready = dict(
+            window_jump_tag=Ready(self._window_key_tag, self._window_menu,
+                                  self.window_select_render),
+            window_jump_any=Ready(self._window_key_any, self._window_menu,
+                                  self.window_select_render),
+            window_menu=Ready(self._window_key_any, self._window_ops_menu,
+                              self.window_menu_render),
+            layout_load=Ready(self._layout_key, self._layout_load_menu,
+                              self.layout_load_render))
+        self.ready_renders = dict(window_jump_tag="window_select_render",
+                                  window_jump_any="window_select_render",
+                                  window_menu="window_menu_render",
+                                  layout_load="layout_load_render")
+        self._placement = None
+        if self.cfg.getboolean("herbie", "ready_menus", fallback=True):
+            self.state.listeners.append(self._state_changed)
+        else:
+            for ready in self.ready.values():
+                ready.enabled = False
+
+        # Functions called with (line, received) of each hook taken.
+        self.observers = list()
+        # Functions called with no arguments just before a reload execs.
+        self.on_reload = list()
+
+        # Latency measures, saved on herbie_stats and every stats_interval.
+        stats.enabled = self.cfg.getboolean("herbie", "stats", fallback=True)
+        self.stats_interval = self.cfg.getfloat("herbie", "stats_interval",
+                                                fallback=60.0)
+        self.stats_textfile = self.cfg.get("herbie", "stats_textfile",
+                                           fallback=None)
+        if stats.on_call not in herbie.astluft.observers:
+            herbie.astluft.observers.append(stats.on_call)
+        if stats.on_menu not in herbie.hmenu.observers:
+            herbie.hmenu.observers.append(stats.on_menu)
+
+        handlers = {name: None for name in self.state.follows}
+        handlers.update({name: getattr(self, name) for name in self.hooks})
+        self.table = events.Table(handlers)
 
     async def run(self):
-        await init_my_focus_time()
+        if self.focus_attrs:
+            await init_my_focus_time()
+        await self.state.load()
+        resync = self.cfg.getfloat("herbie", "resync", fallback=60.0)
+        checker = asyncio.create_task(self.state.watch(resync))
+        saver = asyncio.create_task(self.save_stats_every())
 
         log.debug('starting herbstclient --idle')
         idle = await asyncio.create_subprocess_exec(
-            'herbstclient', '--idle',
+            herbie.astluft.herbstclient, '--idle', self.table.regex(),
             stdout=asyncio.subprocess.PIPE)
 
         log.debug('looping on hooks')
         while True:
 
             line = await idle.stdout.readline()
-            line = line.decode().strip()
             if not line:
                 break
-            parts = line.split("\t")
-            hook = parts[0]
+            self.feed(line, monotonic())
+        checker.cancel()
+        saver.cancel()
+        await self.dispatcher.close()
+        await write_behind.flush()
 
-            meth = getattr(self, hook, None)
-            if not meth:
-                # log.debug(f'no hook for {hook}')
-                continue
+    def feed(self, line, received=None):
+        '''
+        Apply and dispatch one line from herbstclient --idle.
+        '''
+        if received is None:
+            received = monotonic()
+        try:
+            got = self.table.lookup(line)
+        except Exception as err:
+            log.warning(f'can not parse hook {line}: {err}')
+            return
+        if got is None:
+            return
+        event, handler = got
+        for observer in self.observers:
+            observer(line, received)
+
+        self.state.apply(event)
+
+        if handler is None:
+            return
+        log.debug(f'hooking: {event}')
+        self.dispatcher.submit(handler.__name__, handler, (event,), received)
+
+    async def herbie_stats(self, event):
+        '''
+        Log herbie's internal metrics.
+        '''
+        for lane, metrics in self.dispatcher.metrics().items():
+            text = ' '.join(f'{k}={v:.3g}' if isinstance(v, float) else f'{k}={v}'
+                            for k, v in metrics.items())
+            log.info(f'dispatch {lane}: {text}')
+        text = ' '.join(f'{k}={v}' for k, v in write_behind.metrics().items())
+        log.info(f'write behind: {text}')
+        for name, ready in self.ready.items():
+            log.info(f'ready menu {name}: builds={ready.builds} hits={ready.hits}')
+        for line in stats.lines():
+            log.info(f'stats {line}')
+        self.save_stats()
+
+    def save_stats(self):
+        '''
+        Save latency measures for "herbie stats" and the textfile if any.
+        '''
+        if not stats.enabled:
+            return
+        try:
+            stats.save()
+            if self.stats_textfile:
+                stats.write(self.stats_textfile, stats.prometheus())
+        except OSError as err:
+            log.warning(f'can not save stats: {err}')
+
+    async def save_stats_every(self):
+        if self.stats_interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            self.save_stats()
 
-            log.debug(f'hooking: [{len(parts)}] {parts}')
-            await meth(*parts)
+    # Attributes holding the hmenu.Backend of each menu.
+    renders = ("task_menu_render", "task_clear_render", "window_menu_render",
+               "layout_load_render", "layout_drop_render",
+               "window_select_render")
 
-    async def reinit_idle(self, name):
+    def use_menus(self, make):
+        '''
+        Replace each menu backend with make(backend).
+        '''
+        for name in self.renders:
+            setattr(self, name, make(getattr(self, name)))
+        for hook, ready in self.ready.items():
+            ready.render = getattr(self, self.ready_renders[hook])
+            ready.built = None
+
+    def _state_changed(self):
+        # The layout menu asks herbstluftwm for the current layout so it is
+        # only refreshed when tags or clients move, not on focus or titles.
+        for name, ready in self.ready.items():
+            if name != "layout_load":
+                ready.refresh()
+        if self.state.placement != self._placement:
+            self._placement = self.state.placement
+            self.ready["layout_load"].refresh()
+
+    async def reinit_idle(self, event):
         autostart = Path(Path.home() / ".config/herbie/autostart")
         if autostart.exists():
             log.debug('running herbie autostart')
@@ -102,32 +294,27 @@ class Herbie:
                 log.warn(stderr.decode())
 
 
-    async def tag_added(self, name, tag):
-        time = now()
-        await hc(*f'new_attr string tags.by-name.{tag}.my_focus_time {time}'
-                 .split())
+    async def tag_added(self, event):
+        if self.focus_attrs:
+            write_behind.set(f'tags.by-name.{event.tag}.my_focus_time', now())
 
-    async def tag_changed(self, name, tag, num):
-        time = now()
-        await hc(*f'set_attr tags.by-name.{tag}.my_focus_time {time}'.split())
+    async def tag_changed(self, event):
+        if self.focus_attrs:
+            write_behind.set(f'tags.by-name.{event.tag}.my_focus_time', now())
 
-    async def focus_changed(self, name, wid, title=None):
-        if wid == '0x0':
-            log.debug(f'focus_changed got wid-0x0: {name} {title}')
+    async def focus_changed(self, event):
+        if not event.winid:
+            log.debug(f'focus_changed got wid-0x0: {event.title}')
             return
-        time = now()
-        log.debug(f'focus_changed set {wid=} ({name} {title}) to {time}')
-        attr = f'clients.{wid}.my_focus_time'
-        cmd = f'or , set_attr {attr} {time} , new_attr string {attr} {time}'
-        # log.debug(f'focus_changed: {cmd}')
-        await hc(*cmd.split())
+        if self.focus_attrs:
+            write_behind.set(f'clients.{hex(event.winid)}.my_focus_time', now())
 
     # The time last_window was last called.
     _last_window_time = None
     _last_window_index = 1
     last_window_timeout = 1.0   # seconds
 
-    async def last_window_index(self):
+    def last_window_index(self, nclients):
         '''
         Allow to go back in history via last_window if fast enough
         '''
@@ -142,42 +329,41 @@ class Herbie:
         self._last_window_index += 1
 
         # cycle around if we exceed history size
-        nclients = int(await hc('get_attr tags.focus.client_count'))
         if self._last_window_index >= nclients:
             self._last_window_index = 0
         self._last_window_time = now()
         return self._last_window_index
     
-    async def last_window(self, name):
+    async def last_window(self, event):
         '''
         Focus the previously focused window.
         '''
-        tag = await focused_tag()
-        history = await window_times(tag)
-        # make freshest first
-        history.reverse()
-        for number, (wid,tag,time) in enumerate(history):
-            title = await hc(f'get_attr clients.{wid}.title')
-            ts = datetime.datetime.fromtimestamp(time)
-            log.debug(f'HISTORY:{number} {tag} {wid} {ts} ({time-self.start_time:.1f}) {title.strip()}')
-
-        if len(history) <= 1:
+        tag = self.state.focused_tag
+        history = self.state.history
+        nclients = history.count(tag)
+
+        if log.isEnabledFor(logging.DEBUG):
+            clients = self.state.snap.clients
+            for number, (wid, time) in enumerate(history.recent(tag)):
+                title = clients[wid].title if wid in clients else ''
+                ts = datetime.datetime.fromtimestamp(time)
+                log.debug(f'HISTORY:{number} {tag} {wid} {ts} ({time-self.start_time:.1f}) {title}')
+
+        if nclients <= 1:
             return
 
-        # history item is: (wid,tag,time)
-        index = await self.last_window_index()
-        if index >= len(history):
-            index = 0
-        last = history[index]
-        log.debug(f'JUMPTO {index=} {last}')
-        wid = last[0]
+        index = self.last_window_index(nclients)
+        wid = history.nth(index, tag)
+        log.debug(f'JUMPTO {index=} {wid}')
         await hc("jumpto", wid)
 
-    async def reload(self, name):
+    async def reload(self, event):
         '''
         Restart self.
         '''
         log.info("reloading")
+        for one in self.on_reload:
+            one()
         #os.execv(__file__, sys.argv)
         log.info(f'command: {sys.argv}')
         os.execv(sys.argv[0], sys.argv)
@@ -185,96 +371,154 @@ class Herbie:
 
     task_menu_render = Rofi()
 
-    async def task_start(self, name):
+    async def task_start(self, event):
         '''
         Create a tag with a layout.
         '''
         tasks = self.cfg['tasks']
-        items = list()
+        menu = Menu(prompt="Start a task")
         for tname, task in tasks.items():
-            items.append(Item(tname, value=task, icon=tname))
-        log.debug(f"TASK START with {len(items)} known tasks")
-        menu = Menu(items, prompt="Start a task")
+            menu.add(tname, value=task, icon=tname)
+        log.debug(f"TASK START with {len(menu)} known tasks")
         got = await self.task_menu_render(menu)
-        if not got or not got[0]:
+        if not got or not got[0].text:
             log.debug('task menu returns nothing')
             return
-        task_name = got[0]
+        ind, task_name = got[0]
 
-        await hc(f'add {task_name}')
-
-        ind = menu.index(task_name)
         if ind is None:
             log.debug(f'novel task "{task_name}"')
+            await hc(f'add {task_name}')
             # fixme: probably should save or something
             return
 
-        task = items[ind].value
-        tree = make_tree(task)
-        sexp = render_split(tree)
-        if sexp:
-            cmd = ['load', task_name, sexp]
-            await hc(*cmd)
-
-        have = await hc(f'dump {task_name}')
+        task = menu.values[ind]
+        tree = frames.parse(task)
+        sexp = frames.render(tree)
+        async with hc_batch() as b:
+            b.add(f'add {task_name}')
+            if sexp:
+                b.add('load', task_name, sexp)
+            have = b.add(f'dump {task_name}')
+        have = have.result().output
         log.debug(f"start_task has layout: {have}")
-        have = make_tree(have)
+        have = frames.parse(have)
 
-        r = Resolver()
-        for node in [tree] + list(tree.descendants):
-            if not hasattr(node, 'windows'):
+        spawns = list()
+        moves = list()
+        claimed = set()
+        for node in tree.walk():
+            if not node.windows:
                 log.debug(f'no windows in {node}')
                 continue
-            pathlist = [str(n.name) for n in node.path]
-            path = '/'.join(pathlist)
-            path = '/' + path
-            try:
-                got = r.get(have, path)
-                got = getattr(got, "wids", None)
-            except ChildResolverError:
-                got = None
-            if got:
+            index = node.index
+            got = have.get(index)
+            if got and got.wids:
                 log.debug(f'nothing for node {node}')
                 continue
             for window in node.windows:
-                wc = self.wincfg.get(window)
+                wc = dict(self.wincfg.get(window, {}))
                 if not wc:
                     log.debug(f'no wincfg for {window}')
                     continue
                 command = wc.pop("command", None)
                 if command is None:
                     continue
-                match = ' '.join(['%s="%s"' % (k, v) for k, v in wc.items()])
-                index = ''.join(pathlist[1:])
-                print(f'index:{index} match:{match}')
-                await hc(f'rule once {match} '
-                         f'tag={task_name} index={index} maxage=10')
-                await hc(f'spawn {command}')
-        await hc("focus_monitor 0")
-        await hc(f'use {task_name}')
-
-        pass
+                match = [f'{k}={v}' for k, v in wc.items()]
+                log.debug(f'index:{index} match:{match}')
+                running = [wid for wid in self.state.find_clients(wc)
+                           if wid not in claimed]
+                if running:
+                    claimed.add(running[0])
+                    moves.append((window, index, match, running[0]))
+                else:
+                    spawns.append((window, index, match, command))
+        await self.spawn_placed(task_name, spawns, moves,
+                                ["focus_monitor 0", f'use {task_name}'])
+
+    async def spawn_placed(self, tag, spawns, moves=(), then=()):
+        '''
+        Spawn all commands at once with rules placing their windows on tag.
+
+        The spawns is a list of (window, index, match, command), moves a
+        list of (window, index, match, winid) of running windows to place
+        instead and then a list of commands to send with them.  Each rule
+        has a hook= which tells when its window appeared.  Return list of
+        (window, seconds) until each spawned window appeared, with None for
+        those not seen in task_timeout.
+        '''
+        loop = asyncio.get_running_loop()
+        names = list()
+        maxage = math.ceil(self.task_timeout)
+        start = monotonic()
+        async with hc_batch() as b:
+            for window, index, match, command in spawns:
+                name = f'herbie-{tag}-{next(self._rule_ids)}'
+                self.placing[name] = loop.create_future()
+                names.append(name)
+                b.add('rule', 'once', f'label={name}', *match,
+                      f'tag={tag}', f'index={index}', f'maxage={maxage}',
+                      f'hook={name}')
+                b.add('spawn', *shlex.split(command))
+            for window, index, match, wid in moves:
+                name = f'herbie-{tag}-{next(self._rule_ids)}'
+                log.info(f'task {tag}: moving running {window} {wid}')
+                b.add('rule', f'label={name}', *match,
+                      f'tag={tag}', f'index={index}')
+                b.add('apply_rules', wid)
+                b.add('unrule', name)
+            for cmd in then:
+                b.add(cmd)
+
+        futures = [self.placing[name] for name in names]
+        if futures:
+            await asyncio.wait(futures, timeout=self.task_timeout)
+        ret = list()
+        late = list()
+        for name, fut, (window, *_) in zip(names, futures, spawns):
+            del self.placing[name]
+            if not fut.done():
+                fut.cancel()
+                late.append(name)
+                log.warning(f'task {tag}: no {window} after {self.task_timeout}s')
+                ret.append((window, None))
+                continue
+            winid, when = fut.result()
+            log.info(f'task {tag}: {window} {hex(winid)} '
+                     f'appeared after {when - start:.3f}s')
+            ret.append((window, when - start))
+        if late:
+            async with hc_batch() as b:
+                for name in late:
+                    b.add('unrule', name)
+        return ret
+
+    async def rule(self, event):
+        '''
+        Note that a window placed by one of our rules appeared.
+        '''
+        fut = self.placing.get(event.name)
+        if fut is not None and not fut.done():
+            fut.set_result((event.winid, monotonic()))
 
     task_clear_render = Rofi(multi_select=True)
 
-    async def task_clear(self, name):
-        ts = await tag_status()
+    async def task_clear(self, event):
+        ts = self.state.tag_status()
 
         current_tag = [t for t in ts if ts[t] == "#"][0]
 
-        items = list()
+        menu = Menu(prompt="Select task tags to clear")
         for tag in ts:
-            items.append(Item(tag))
-        menu = Menu(items, prompt="Select task tags to clear")
-        for tag in await self.task_clear_render(menu):
-            await clear_tag(tag, current_tag)
+            menu.add(tag)
+        tags = [tag for ind, tag in await self.task_clear_render(menu)
+                if ind is not None]
+        if tags:
+            await clear_tags(tags, current_tag)
 
     window_menu_render = Rofi(location="tl", monitor="focused_window")
 
-    async def window_menu(self, name):
-        '''
-        Open a window menu
-        '''
+    async def _window_ops_menu(self, key):
         menu = Menu([
             Item("Minimize", "set_attr clients.focus.minimized true", "minimizen"),
             Item("Close", "close", "close"),
@@ -283,106 +527,158 @@ class Herbie:
             Item("Toggle floating", "pseudotile floating"),
             ], "window operation")
 
-        for tag, time in await tag_times():
-            item = Item(f'Move to tag {tag}', f'move {tag};use {tag}')
-            menu.items.append(item)
+        for tag, time in self.state.tag_times():
+            menu.add(f'Move to tag {tag}', f'move {tag};use {tag}')
+        return menu
 
-        for text in await self.window_menu_render(menu):
-            ind = menu.index(text)
+    async def window_menu(self, event):
+        '''
+        Open a window menu
+        '''
+        _, menu, got = await self.ready["window_menu"].show()
+        for ind, text in got:
             if ind is None:
                 cmd = text
             else:
-                cmd = menu.items[ind].value
+                cmd = menu.values[ind]
             cmd = cmd.split(" ")
             await hc(*cmd)
 
     layout_load_render = Rofi()
 
-    async def layout_load(self, name):
+    def _layout_menu(self, tag, cursexp, prompt, message=None, ranked=False):
+        '''
+        Return menu of layouts stored on tag given the current layout.
+
+        Items of layouts the same as the current one are marked active.  If
+        ranked, the layouts most similar to the current one come first.
+        '''
+        lays = self.store.read_store(tag)
+        current = {lay.name for lay in self.store.find_store(cursexp, tag)}
+        if ranked:
+            lays = [lay for _, _, lay in similar.rank(cursexp, {tag: lays})]
+        return Menu(prompt=prompt, message=message,
+                    source=self._layout_items(
+                        (lay.name, lay, lay.name in current) for lay in lays))
+
+    async def _layout_items(self, entries):
+        '''
+        Yield Items from (text, Layout, active) with icons as they are made.
+        '''
+        icons = herbie.icons.cache()
+        for text, lay, active in entries:
+            yield Item(text, lay, icons.icon(lay.sexp), active)
+            await asyncio.sleep(0)
+
+    def _save_layout(self, name, cursexp, tag):
+        same = [lay.name for lay in self.store.find_store(cursexp, tag)
+                if lay.name != name]
+        if same:
+            log.info(f'layout "{name}" on {tag} is the same as {same}')
+        self.store.add_store(layouts.Layout(name, cursexp), tag)
+        self.ready["layout_load"].refresh()
+
+    async def _layout_key(self):
+        tag = self.state.focused_tag
+        return (tag, await get_layout(tag), self.store.stamp(tag))
+
+    async def _layout_load_menu(self, key):
+        tag, cursexp, _ = key
+        return self._layout_menu(tag, cursexp, "layout to load",
+                                 "New name saves current", ranked=True)
+
+    async def layout_load(self, event):
         '''
         Open a menu to select a layout to load.
 
         If name returned which is new, then save current to that name.
         '''
-        tag = await focused_tag()
-        lays = layouts.read_store(tag)
-        cursexp = await get_layout(tag)
-        icons = layouts.make_icons(lays, tag)
-
-        menu = Menu(list(), prompt="layout to load",
-                    message="New name saves current")
-        for lay, icon in zip(lays, icons):
-            menu.items.append(Item(lay.name, lay, icon))
-
-        name = await self.layout_load_render(menu)
-        if not name:
+        key, menu, got = await self.ready["layout_load"].show()
+        if not got:
             return
 
-        name = name[0]
-        ind = menu.index(name)
-        if ind is None and name not in lays:  # new
-            lay = layouts.Layout(name, cursexp)
-            layouts.add_store(lay, tag)
+        tag, cursexp, _ = key
+        ind, name = got[0]
+        if ind is None:         # new
+            self._save_layout(name, cursexp, tag)
             return
 
-        lay = lays[ind]
+        lay = menu.values[ind]
         cmd = ['load', lay.sexp]
         await hc(*cmd)
 
-    async def layout_save(self, name):
+    # Most layouts offered by layout_load_any.
+    layout_load_any_limit = 100
+
+    async def layout_load_any(self, event):
+        '''
+        Open a menu to select a layout from any tag to load.
+
+        Layouts most similar to the current one come first.
+        '''
+        tag = self.state.focused_tag
+        cursexp = await get_layout(tag)
+        collection = {one: self.store.read_store(one)
+                      for one in self.store.tags()}
+        ranked = similar.rank(cursexp, collection,
+                              limit=self.layout_load_any_limit)
+        menu = Menu(prompt="layout to load",
+                    source=self._layout_items(
+                        (f'{lay.name} [{other}]', lay, dist == 0 and other == tag)
+                        for dist, other, lay in ranked))
+
+        got = await self.layout_load_render(menu)
+        if not got or got[0].index is None:
+            return
+        await hc('load', menu.values[got[0].index].sexp)
+
+    async def layout_save(self, event):
         '''
         Save current layout.
 
         This may overwrite existing name.
         '''
-        tag = await focused_tag()
-        lays = layouts.read_store(tag)
+        tag = self.state.focused_tag
         cursexp = await get_layout(tag)
-        icons = layouts.make_icons(lays, tag)
-
-        menu = Menu(list(), prompt="save layout to name")
-        for lay, icon in zip(lays, icons):
-            menu.items.append(Item(lay.name, lay, icon))
+        menu = self._layout_menu(tag, cursexp, "save layout to name")
+        same = [lay.name for lay in self.store.find_store(cursexp, tag)]
+        if same:
+            menu.message = "Current layout is saved as " + ", ".join(same)
 
-        name = await self.layout_load_render(menu)
-        if not name:
+        got = await self.layout_load_render(menu)
+        if not got:
             return
 
-        name = name[0]
-        lay = layouts.Layout(name, cursexp)
-        layouts.add_store(lay, tag)
+        self._save_layout(got[0].text, cursexp, tag)
 
     layout_drop_render = Rofi(multi_select=True)
 
-    async def layout_drop(self, name):
+    async def layout_drop(self, event):
         '''
         Ask user for a layout to drop.
 
         If drop current then go to first remaining.
         '''
-        tag = await focused_tag()
-        lays = layouts.read_store(tag)
+        tag = self.state.focused_tag
         cursexp = await get_layout(tag)
-        icons = layouts.make_icons(lays, tag)
-
-        menu = Menu(list(), prompt="layout to drop",
-                    message="New name saves current")
-        for lay, icon in zip(lays, icons):
-            menu.items.append(Item(lay.name, lay, icon))
+        menu = self._layout_menu(tag, cursexp, "layout to drop",
+                                 "New name saves current")
+        got = await self.layout_drop_render(menu)
+        lays = list(menu.values)
+        active = set(menu.active)
 
         drop_cur = False
-        for name in await self.layout_drop_render(menu):
-            ind = menu.index(name)
+        for ind, name in got:
             if ind is None:     # new
-                lay = layouts.Layout(name, cursexp)
-                layouts.add_store(lay, tag)
+                self._save_layout(name, cursexp, tag)
                 continue
             dead = lays[ind]
             lays[ind] = None
-            if dead.sexp == cursexp:
+            if ind in active:
                 drop_cur = True
             log.debug(f'LAYOUT DROP {name=} {ind=} {dead=} {drop_cur=}')
-            layouts.del_store(dead, tag)
+            self.store.del_store(dead, tag)
+            self.ready["layout_load"].refresh()
 
         # drop the current layout, so pick first one and apply it.
         if drop_cur:
@@ -395,48 +691,67 @@ class Herbie:
 
     window_select_render = Rofi(columns=3)
 
-    async def _window_jump(self, want_tag=None):
-        items = list()
-        widtags = await window_ids(want_tag)
+    async def _window_key_tag(self):
+        return (self.state.version, self.state.focused_tag)
 
-        tlen = 2+max([len(tag) for _, tag in widtags])
-        winfos = [await window_info(wid) for wid, _ in widtags]
-        clen = 2+max([len(winfo.get("class", "")) for winfo in winfos])
+    async def _window_key_any(self):
+        return (self.state.version, None)
 
-        seen = set()
-        for winfo, (wid, tag) in zip(winfos, widtags):
-            if wid in seen:
-                continue
-            seen.add(wid)
+    async def _window_menu(self, key):
+        _, want_tag = key
+        winfos = self.state.snap.windows(want_tag)
+        return Menu(prompt="Jump to window",
+                    source=self._window_items(winfos, want_tag))
 
-            if winfo.get("minimized", False):
+    async def _window_items(self, winfos, want_tag):
+        '''
+        Yield Items for jumping to windows.
+        '''
+        if not winfos:
+            return
+        tlen = 2+max([len(winfo.tag) for winfo in winfos])
+        clen = 2+max([len(winfo.klass) for winfo in winfos])
+
+        for winfo in winfos:
+            if winfo.minimized:
                 continue
-            if want_tag and not winfo.get("visible", True):
+            if want_tag and not winfo.visible:
                 continue
-            stag = f'[{tag}]'
-            scls = '(' + winfo['class'] + ')'
-            item = Item(f'{stag:{tlen}}\t{scls:{clen}}\t' + winfo['title'],
-                        value=f'jumpto {wid}',
-                        icon=winfo.get("instance", None))
-            items.append(item)
-        menu = Menu(items, prompt="Jump to window")
-        for text in await self.window_select_render(menu):
-            ind = menu.index(text)
+            stag = f'[{winfo.tag}]'
+            scls = '(' + winfo.klass + ')'
+            yield Item(f'{stag:{tlen}}\t{scls:{clen}}\t' + winfo.title,
+                       value=f'jumpto {winfo.winid}',
+                       icon=winfo.instance or None)
+
+    # Most windows offered when a jump hook gives a query.
+    window_jump_limit = 50
+
+    async def _window_jump(self, ready, event):
+        query = ' '.join(getattr(event, "args", None) or ())
+        if query:
+            # Filter the full menu, this one is not kept ready.
+            key, menu, _ = await ready.get()
+            menu = fuzzy.select(menu, query, self.window_jump_limit)
+            got = await ready.render(menu) if len(menu) else []
+        else:
+            key, menu, got = await ready.show(empty=False)
+        for ind, text in got:
             if ind is None:
                 continue
-            await hc(menu.items[ind].value)
+            await hc(menu.values[ind])
 
-        pass
-
-    async def window_jump_tag(self, name):
+    async def window_jump_tag(self, event):
         '''
         Jump to a selected window in current tag.
+
+        Hook arguments, if any, are a query to filter windows by.
         '''
-        tag = await focused_tag()
-        await self._window_jump(tag)
+        await self._window_jump(self.ready["window_jump_tag"], event)
 
-    async def window_jump_any(self, name):
+    async def window_jump_any(self, event):
         '''
         Jump to a selected window in any tag.
+
+        Hook arguments, if any, are a query to filter windows by.
         '''
-        await self._window_jump()
+        await self._window_jump(self.ready["window_jump_any"], event)
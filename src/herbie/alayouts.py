@@ -10,11 +10,15 @@ herbie stores layout data on a per tag basis in files under
 
 import os
 import sys
-from herbie.util import make_tree
-from herbie.svg import make_icon
+import herbie.icons
+import herbie.stats as stats
+from herbie.frames import fingerprint
 from collections import namedtuple
 from pathlib import Path
 
+import logging
+log = logging.getLogger("herbie")
+
 # in herbie we use this object representation for all info about a
 # "layout"
 Layout = namedtuple("Layout", "name sexp")
@@ -37,56 +41,186 @@ def layout_path(tag, name):
     return p / n
     
 
+# In-memory index of the store:
+#
+#   tag -> (directory mtime in ns, {name: Layout}, {fingerprint: {name}})
+#
+# An index entry is used as long as the mtime of its tag directory is
+# unchanged.  Adding or removing a layout file (or saving it by rename as
+# most editors do) changes that mtime.  Layouts written here update the
+# index in place.
+_index = dict()
+
+# Count of directory scans and of layout files read and written.
+io = dict(scans=0, reads=0, writes=0)
+
+# Count of changes made here to any tag.
+_changes = 0
+
+
+def _mtime(p):
+    try:
+        return p.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _fingerprint(lay):
+    try:
+        return fingerprint(lay.sexp)
+    except ValueError as err:
+        log.warning(f'bad layout "{lay.name}": {err}')
+        return None
+
+
+def _remember(entry, lay):
+    _, lays, prints = entry
+    _forget(entry, lay.name)
+    lays[lay.name] = lay
+    prints.setdefault(_fingerprint(lay), set()).add(lay.name)
+
+
+def _forget(entry, name):
+    _, lays, prints = entry
+    old = lays.pop(name, None)
+    if old is None:
+        return
+    fp = _fingerprint(old)
+    names = prints.get(fp, set())
+    names.discard(name)
+    if not names:
+        prints.pop(fp, None)
+
+
+def _entry(tag):
+    '''
+    Return index entry for tag, rescanning if stale, or None.
+    '''
+    p = tag_path(tag)
+    mtime = _mtime(p)
+    if mtime is None:
+        _index.pop(tag, None)
+        return None
+    got = _index.get(tag)
+    if got and got[0] == mtime:
+        return got
+    io["scans"] += 1
+    entry = (mtime, dict(), dict())
+    for one in p.glob("*.layout"):
+        io["reads"] += 1
+        _remember(entry, Layout(name=one.stem, sexp=one.read_text().strip()))
+    _index[tag] = entry
+    return entry
+
+
+def _layouts(tag):
+    '''
+    Return dict of name to Layout for tag, from the index if fresh.
+    '''
+    entry = _entry(tag)
+    return entry[1] if entry else dict()
+
+
+def _update(tag, before, add=None, remove=None):
+    '''
+    Add or remove a layout in the index of tag if it was fresh at mtime before.
+    '''
+    global _changes
+    _changes += 1
+    got = _index.get(tag)
+    if not got or got[0] != before:
+        _index.pop(tag, None)   # someone else changed it, rescan later
+        return
+    if remove is not None:
+        _forget(got, remove)
+    if add is not None:
+        _remember(got, add)
+    _index[tag] = (_mtime(tag_path(tag)),) + got[1:]
+
+
 def purge(tag):
     p = tag_path(tag)
+    _index.pop(tag, None)
     if p.exists():
         os.removedirs(p.resolve())
 
 
+def tags():
+    '''
+    Return list of tags having a layout directory.
+    '''
+    if not base_path.exists():
+        return []
+    return sorted(p.name for p in base_path.iterdir() if p.is_dir())
+
+
+def stamp(tag):
+    '''
+    Return something that differs after layouts of tag change.
+    '''
+    return (_mtime(tag_path(tag)), _changes)
+
+
+@stats.timed("store.read")
 def read_store(tag):
     '''
     Return list of Layouts stored on given or focused tag.
     '''
-    p = tag_path(tag)
-    if not p.exists():
-        return []
-    return [Layout(name=one.stem, sexp=one.read_text().strip())
-            for one in p.glob("*.layout")]
+    return list(_layouts(tag).values())
 
 
+@stats.timed("store.write")
 def add_store(lay, tag):
     '''
     Add lay to store for tag
     '''
     lp = layout_path(tag, lay.name)
     assuredir(lp.parent)
+    before = _mtime(lp.parent)
     lp.write_text(lay.sexp + "\n")
+    io["writes"] += 1
+    _update(tag, before, add=lay)
 
 
+@stats.timed("store.delete")
 def del_store(lay, tag):
     '''
     Assure layout is no longer in store.
     '''
     lp = layout_path(tag, lay.name)
+    before = _mtime(lp.parent)
     os.remove(lp)
+    _update(tag, before, remove=lay.name)
+
+
+@stats.timed("store.find")
+def find_store(sexp, tag):
+    '''
+    Return list of Layouts stored on tag with the same fingerprint as sexp.
+    '''
+    entry = _entry(tag)
+    if not entry:
+        return []
+    names = entry[2].get(fingerprint(sexp), ())
+    return [entry[1][name] for name in sorted(names)]
 
 
 def write_store(layouts, tag):
     '''
     Save layouts to tag.
     '''
-    for oen in layouts:
+    for one in layouts:
         add_store(one, tag)
 
 
 def make_icons(oldlays, tag):
-    ret = list()
-    for lay in oldlays:
-        tree = make_tree(lay.sexp)
-        iname = f'herbie{tag}{lay.name}'
-        fname = make_icon(iname, tree)
-        ret.append(iname)
-    return ret
+    '''
+    Return list of icons, one per layout, as used by rofi.
+
+    The tag is no longer used as icons are shared by geometry.
+    '''
+    cache = herbie.icons.cache()
+    return [cache.icon(lay.sexp) for lay in oldlays]
 
 def layout_text(lay, **kwds):
     return lay.name
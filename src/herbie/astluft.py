@@ -1,9 +1,12 @@
 '''
 An async interface to herbsluftwm via the client.
 '''
+import re
 import asyncio
+from collections import deque, namedtuple, defaultdict
+from dataclasses import dataclass, field
 from datetime import datetime
-from herbie.util import make_tree
+from time import monotonic
 
 import logging
 log = logging.getLogger("herbie")
@@ -15,21 +18,316 @@ def now():
 
 herbstclient = "herbstclient"
 
+# How to talk to herbstclient: "pipe" keeps one "herbstclient --binary-pipe"
+# process open, "exec" runs one herbstclient process per call.  The "pipe"
+# transport falls back to "exec" if herbstclient does not support it.
+transport = "pipe"
 
-async def hc(*args):
+Reply = namedtuple("Reply", "status output")
+
+
+class NotSent(ConnectionError):
     '''
-    Call herbstclient.  If single arg, it will be split on spaces.
+    A request that never reached herbstclient.
     '''
-    if len(args) == 1 and isinstance(args[0],str):
-        args = args[0].split(" ")
 
+
+class Connection:
+    '''
+    A long-lived "herbstclient --binary-pipe" process.
+
+    Each request is written as its arguments separated by newline and
+    terminated by a null byte.  Each reply is the exit status in decimal, a
+    newline and then the command output, terminated by a null byte.  Replies
+    come back in request order so each request waits on its own future which
+    is resolved from a queue by a single reader task.
+
+    If the pipe dies, pending requests fail with ConnectionError and the next
+    request starts a fresh process.  A request that could not be written
+    fails with NotSent.
+    '''
+
+    def __init__(self, client=None):
+        self.client = client
+        self.proc = None
+        self.supported = None   # unknown until the first start
+        self._pending = deque()
+        self._reader = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def alive(self):
+        return self.proc is not None and self.proc.returncode is None
+
+    async def start(self):
+        '''
+        Assure the herbstclient process is running.  Return False if
+        herbstclient does not support --binary-pipe.
+        '''
+        if self.alive:
+            return True
+        if self.supported is False:
+            return False
+        async with self._lock:
+            if self.alive:
+                return True
+            client = self.client or herbstclient
+            log.debug(f'starting {client} --binary-pipe')
+            proc = await asyncio.create_subprocess_exec(
+                client, '--binary-pipe',
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                limit=2**24)
+            self.proc = proc
+            self._reader = asyncio.create_task(self._read(proc))
+            try:
+                await self._send(('true',))
+            except ConnectionError:
+                if self.supported is None:
+                    log.info(f'{client} lacks --binary-pipe, using exec')
+                    self.supported = False
+                return False
+            self.supported = True
+            return True
+
+    async def call(self, *args):
+        '''
+        Send one command and return its Reply.
+        '''
+        if not await self.start():
+            raise NotSent("herbstclient --binary-pipe not available")
+        return await self._send(args)
+
+    async def _send(self, args):
+        proc = self.proc
+        if proc is None:
+            raise NotSent("herbstclient pipe is closed")
+        fut = asyncio.get_running_loop().create_future()
+        # No await between queuing the future and writing the request so
+        # that the order of futures matches the order of requests.
+        self._pending.append(fut)
+        proc.stdin.write(('\n'.join(args) + '\0').encode())
+        try:
+            await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as err:
+            raise NotSent(f'herbstclient pipe died: {err}') from err
+        return await fut
+
+    async def _read(self, proc):
+        while True:
+            try:
+                data = await proc.stdout.readuntil(b'\0')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                    ConnectionError):
+                break
+            status, _, output = data[:-1].decode().partition('\n')
+            fut = self._pending.popleft()
+            if not fut.done():  # caller may have been cancelled
+                fut.set_result(Reply(int(status), output))
+
+        if self.proc is proc:
+            self.proc = None
+        pending, self._pending = self._pending, deque()
+        for fut in pending:
+            if not fut.done():
+                fut.set_exception(ConnectionError("herbstclient pipe died"))
+        if proc.returncode is None:
+            proc.kill()
+        await proc.wait()
+
+    async def close(self):
+        proc = self.proc
+        if proc is None:
+            return
+        self.proc = None
+        proc.stdin.close()
+        await self._reader
+
+
+_connection = None
+
+def connection():
+    '''
+    Return the shared binary-pipe connection.
+    '''
+    global _connection
+    if _connection is None:
+        _connection = Connection()
+    return _connection
+
+
+async def exec_call(*args):
+    '''
+    Run one herbstclient process for one command, return Reply.
+    '''
     proc = await asyncio.create_subprocess_exec(
         herbstclient, *args,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE)
-    got = await proc.stdout.read()
-    got = got.decode()
-    return got
+    got, _ = await proc.communicate()
+    return Reply(proc.returncode, got.decode())
+
+
+# Functions called with (args, Reply, start, seconds) after each call, the
+# start being the time.monotonic() of sending it.
+observers = list()
+
+
+async def call(*args):
+    '''
+    Call herbstclient with args, return Reply.
+
+    Arguments holding a newline or null byte can not be framed on the pipe
+    and go through exec.
+    '''
+    start = monotonic()
+    reply = await _call(args)
+    for observer in observers:
+        observer(args, reply, start, monotonic() - start)
+    return reply
+
+
+# Commands that only read, safe to send again if the pipe died after they
+# were sent.
+read_only = frozenset(["attr", "get_attr", "dump", "layout", "tag_status",
+                       "echo", "true", "false", "version", "complete",
+                       "list_monitors", "list_rules", "list_keybinds"])
+
+
+async def _call(args):
+    if transport == "pipe" and not any('\n' in a or '\0' in a for a in args):
+        conn = connection()
+        try:
+            return await conn.call(*args)
+        except NotSent as err:
+            if conn.supported:
+                log.warning(f'{err}, retrying with exec: {args}')
+        except ConnectionError as err:
+            # It may have run, only a read is safe to run again.
+            if not args or args[0] not in read_only:
+                raise
+            log.warning(f'{err}, retrying with exec: {args}')
+    return await exec_call(*args)
+
+
+async def hc(*args):
+    '''
+    Call herbstclient.  If single arg, it will be split on spaces.
+    '''
+    if len(args) == 1 and isinstance(args[0],str):
+        args = args[0].split(" ")
+    reply = await call(*args)
+    return reply.output
+
+
+RS = '\x1e'                    # ascii record separator
+_batch_marker = re.compile(f'{RS}(\\d+){RS}([01])\n')
+
+
+class Batch:
+    '''
+    Collect commands and send them in one "chain" round trip.
+
+    Use as:
+
+        async with hc_batch() as b:
+            got = b.add("get_attr tags.focus.name")
+            b.add("use", "dev")
+        print(got.result().output)
+
+    Each add() returns a future resolved with the Reply of that command.
+    Each command is wrapped so that its output is followed by a marker
+    holding its status.  As herbstluftwm only tells success from failure
+    here, the status is 0 or 1.
+    '''
+
+    # chain, or and and separators.  No argument may equal one of these.
+    seps = (RS + 'c', RS + 'o', RS + 'a')
+
+    def __init__(self):
+        self.commands = list()
+        self.futures = list()
+        self.results = list()
+
+    def add(self, *args):
+        '''
+        Add a command.  If single arg, it will be split on spaces.
+        '''
+        if len(args) == 1 and isinstance(args[0], str):
+            args = args[0].split(" ")
+        args = tuple(map(str, args))
+        if set(args).intersection(self.seps):
+            raise ValueError(f'batch separator in command: {args}')
+        fut = asyncio.get_running_loop().create_future()
+        self.commands.append(args)
+        self.futures.append(fut)
+        return fut
+
+    def chain(self):
+        '''
+        Return arguments of the chain command for what has been added.
+        '''
+        sc, so, sa = self.seps
+        cmd = ['chain']
+        for ind, args in enumerate(self.commands):
+            cmd += [sc, 'or', so, 'and', sa, *args,
+                    sa, 'echo', f'{RS}{ind}{RS}0',
+                    so, 'echo', f'{RS}{ind}{RS}1']
+        return cmd
+
+    @staticmethod
+    def split(output):
+        '''
+        Split output of chain() into list of Reply.
+        '''
+        replies = list()
+        last = 0
+        for m in _batch_marker.finditer(output):
+            replies.append(Reply(int(m[2]), output[last:m.start()]))
+            last = m.end()
+        return replies
+
+    async def flush(self):
+        '''
+        Send commands added so far, return their list of Reply.
+        '''
+        if not self.commands:
+            return list()
+        if len(self.commands) == 1:
+            replies = [await call(*self.commands[0])]
+        else:
+            replies = self.split((await call(*self.chain())).output)
+        futures = self.futures
+        self.commands = list()
+        self.futures = list()
+        if len(replies) != len(futures):
+            err = RuntimeError(f'batch of {len(futures)} commands '
+                               f'gave {len(replies)} replies')
+            for fut in futures:
+                fut.set_exception(err)
+            raise err
+        for fut, reply in zip(futures, replies):
+            fut.set_result(reply)
+        self.results += replies
+        return replies
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, typ, value, tb):
+        if typ is None:
+            await self.flush()
+            return
+        for fut in self.futures:
+            fut.cancel()
+
+
+def hc_batch():
+    '''
+    Return a Batch to use as an async context manager.
+    '''
+    return Batch()
 
 
 async def load_layout(tag, sexp):
@@ -47,6 +345,118 @@ async def get_layout(tag):
     return got.strip()
 
 
+async def set_my_attr(attr, value):
+    '''
+    Set string attribute, creating it if needed.
+    '''
+    await hc('or', ',', 'set_attr', attr, str(value),
+             ',', 'new_attr', 'string', attr, str(value))
+
+
+class WriteBehind:
+    '''
+    Coalesce attribute writes and flush them later in one batch.
+
+    Writes to an attribute within window seconds of its first pending write
+    keep only the latest value.  Readers in this process should use get()
+    or get_attr() to see values not yet flushed.
+    '''
+
+    def __init__(self, window=0.5):
+        self.window = window
+        self.pending = dict()   # attr -> (type, value)
+        self._since = dict()    # attr -> monotonic time of first write
+        self._timer = None
+        self.writes = 0
+        self.flushes = 0
+        self.flushed = 0
+        self.lag_sum = 0.0
+        self.lag_max = 0.0
+
+    def set(self, attr, value, atype="string"):
+        '''
+        Set attr to value, creating it with atype if needed.
+        '''
+        self.writes += 1
+        self.pending[attr] = (atype, str(value))
+        self._since.setdefault(attr, monotonic())
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._later())
+
+    def get(self, attr, default=None):
+        '''
+        Return pending value of attr or default.
+        '''
+        got = self.pending.get(attr)
+        if got is None:
+            return default
+        return got[1]
+
+    # Most seconds to wait before trying a failed flush again.
+    retry_max = 30.0
+
+    async def _later(self, delay=None):
+        await asyncio.sleep(self.window if delay is None else delay)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as err:
+            delay = min(2 * (delay or self.window), self.retry_max)
+            log.warning(f'write behind flush failed, '
+                        f'retrying in {delay:.3g}s: {err}')
+            if self.pending and self._timer is None:
+                self._timer = asyncio.create_task(self._later(delay))
+
+    async def flush(self):
+        '''
+        Write all pending values now.
+
+        If the batch fails its values stay pending, unless written again
+        meanwhile, and are tried with the next flush.  A failed flush from
+        the timer is tried again after a growing delay.
+        '''
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, dict()
+        since, self._since = self._since, dict()
+        try:
+            async with hc_batch() as b:
+                for attr, (atype, value) in pending.items():
+                    b.add('or', ',', 'set_attr', attr, value,
+                          ',', 'new_attr', atype, attr, value)
+        except BaseException:
+            for attr, one in pending.items():
+                self.pending.setdefault(attr, one)
+                self._since[attr] = since[attr]
+            raise
+        done = monotonic()
+        self.flushes += 1
+        self.flushed += len(pending)
+        for first in since.values():
+            lag = done - first
+            self.lag_sum += lag
+            self.lag_max = max(self.lag_max, lag)
+
+    def metrics(self):
+        return dict(writes=self.writes, flushes=self.flushes,
+                    flushed=self.flushed, pending=len(self.pending),
+                    lag_mean=self.lag_sum / self.flushed if self.flushed else 0.0,
+                    lag_max=self.lag_max)
+
+
+write_behind = WriteBehind()
+
+
+async def get_attr(attr):
+    '''
+    Return value of attr as string, including pending writes.
+    '''
+    got = write_behind.get(attr)
+    if got is not None:
+        return got
+    return (await hc('get_attr', attr)).strip()
+
+
 async def tags_arg(tags=None):
     '''
     Return tags.  Tags is None, "focus", "all", "other" else pass-through.
@@ -63,6 +473,13 @@ async def tags_arg(tags=None):
 
 async def tag_status():
     text = await hc("tag_status")
+    return parse_tag_status(text)
+
+
+def parse_tag_status(text):
+    '''
+    Return dict mapping tag name to status character from tag_status.
+    '''
     parts = text.strip().split('\t')
     tis = dict()
     for part in parts:
@@ -76,9 +493,20 @@ async def window_info(wid):
     '''
     Return dict of attributes for window of given wid or "focus".
     '''
-    lines = await hc(f'attr clients.{wid}')
-    lines = lines.split('\n')
-    lines = lines[lines.index(' V V V')+1:]
+    return parse_attrs(await hc(f'attr clients.{wid}'))
+
+
+def parse_attrs(text, floats=True):
+    '''
+    Return dict of attributes from output of "attr OBJECT".
+
+    If floats is True, string values that look like a float become float.
+    '''
+    lines = text.split('\n')
+    try:
+        lines = lines[lines.index(' V V V')+1:]
+    except ValueError:          # object has no attributes
+        return dict()
 
     ret = dict()
     for line in lines:
@@ -87,7 +515,7 @@ async def window_info(wid):
             continue
 
         t, _, _ = line[:5].split(' ')
-        k, v = line[6:].split(" = ")
+        k, v = line[6:].split(" = ", 1)
 
         if t == "b":        # boolean
             v = v == "true"
@@ -99,10 +527,11 @@ async def window_info(wid):
             pass
         elif t == "s":      # string
             v = v[1:-1]     # remove quotes
-            try:            # maybe a float as string
-                v = float(v)
-            except ValueError:
-                pass
+            if floats:
+                try:            # maybe a float as string
+                    v = float(v)
+                except ValueError:
+                    pass
         elif t == "u":      # unsigned int
             v = int(v)
         else:
@@ -114,12 +543,171 @@ async def window_info(wid):
     return ret
 
 
+@dataclass
+class Client:
+    '''
+    A herbstluftwm client (window).
+    '''
+    winid: str
+    tag: str = ""
+    title: str = ""
+    klass: str = ""
+    '''The X11 class attribute'''
+    instance: str = ""
+    visible: bool = True
+    minimized: bool = False
+    focus_time: float = 0.0
+    '''The value of the my_focus_time attribute'''
+    attrs: dict = field(default_factory=dict)
+    '''All attributes'''
+
+    @classmethod
+    def from_attrs(cls, attrs):
+        return cls(winid=attrs["winid"], tag=attrs.get("tag", ""),
+                   title=attrs.get("title", ""),
+                   klass=attrs.get("class", ""),
+                   instance=attrs.get("instance", ""),
+                   visible=attrs.get("visible", True),
+                   minimized=attrs.get("minimized", False),
+                   focus_time=float(attrs.get("my_focus_time", 0)),
+                   attrs=attrs)
+
+
+@dataclass
+class Tag:
+    '''
+    A herbstluftwm tag.
+    '''
+    name: str
+    index: int = 0
+    client_count: int = 0
+    visible: bool = False
+    focus_time: float = 0.0
+    '''The value of the my_focus_time attribute'''
+    attrs: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_attrs(cls, attrs):
+        return cls(name=attrs["name"], index=attrs.get("index", 0),
+                   client_count=attrs.get("client_count", 0),
+                   visible=attrs.get("visible", False),
+                   focus_time=float(attrs.get("my_focus_time", 0)),
+                   attrs=attrs)
+
+
+@dataclass
+class Monitor:
+    '''
+    A herbstluftwm monitor.
+    '''
+    index: int
+    tag: str = ""
+    name: str = ""
+    attrs: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_attrs(cls, attrs):
+        return cls(index=attrs["index"], tag=attrs.get("tag", ""),
+                   name=attrs.get("name", ""), attrs=attrs)
+
+
+@dataclass
+class Snapshot:
+    '''
+    The state of herbstluftwm clients, tags and monitors at one time.
+    '''
+    clients: dict = field(default_factory=dict)
+    '''Client by winid'''
+    tags: dict = field(default_factory=dict)
+    '''Tag by name in index order'''
+    monitors: list = field(default_factory=list)
+    '''Monitor by index'''
+    focused_wid: str = None
+    focused_tag: str = None
+    focused_monitor: int = None
+    time: float = 0.0
+
+    def windows(self, tag=None):
+        '''
+        Return list of Client, only those on tag if given.
+        '''
+        if tag is None:
+            return list(self.clients.values())
+        return [c for c in self.clients.values() if c.tag == tag]
+
+    def window_times(self, tag=None):
+        '''
+        Return list of tuples (wid,tag,time) oldest focus first.
+        '''
+        return sorted([(c.winid, c.tag, c.focus_time)
+                       for c in self.windows(tag)], key=lambda tt: tt[2])
+
+    def tag_times(self):
+        '''
+        Return list of tuples (tag,time) oldest focus first.
+        '''
+        return sorted([(t.name, t.focus_time) for t in self.tags.values()],
+                      key=lambda tt: tt[1])
+
+
+_snap_marker = re.compile(f'^{RS}snap (\\S+?)\\.?$', re.M)
+
+
+async def snapshot(clients=True, tags=True, monitors=True):
+    '''
+    Return a Snapshot from one call to herbstclient.
+
+    Pass False to skip gathering some kinds of objects.
+    '''
+    await write_behind.flush()
+    cmd = ['chain']
+    for want, var, obj in [(clients, 'C', 'clients.'),
+                           (tags, 'T', 'tags.'),
+                           (monitors, 'M', 'monitors.')]:
+        if want:
+            cmd += [RS, 'foreach', var, obj,
+                    'chain', ',', 'echo', f'{RS}snap', var, ',', 'attr', var]
+    return parse_snapshot(await hc(*cmd))
+
+
+def parse_snapshot(text):
+    '''
+    Return a Snapshot parsed from the output of the snapshot() command.
+    '''
+    snap = Snapshot(time=now())
+    marks = list(_snap_marker.finditer(text))
+    ends = [m.start() for m in marks[1:]] + [len(text)]
+    for mark, end in zip(marks, ends):
+        kind, _, child = mark[1].partition('.')
+        attrs = parse_attrs(text[mark.end():end], floats=False)
+        if not attrs:
+            continue
+        if kind == "clients":
+            if child == "focus":
+                snap.focused_wid = attrs.get("winid")
+            elif child.startswith("0x"):
+                snap.clients[child] = Client.from_attrs(attrs)
+        elif kind == "tags":
+            if child == "focus":
+                snap.focused_tag = attrs.get("name")
+            elif child.isdigit():
+                tag = Tag.from_attrs(attrs)
+                snap.tags[tag.name] = tag
+        elif kind == "monitors":
+            if child == "focus":
+                snap.focused_monitor = attrs.get("index")
+            elif child.isdigit():
+                snap.monitors.append(Monitor.from_attrs(attrs))
+    return snap
+
+
 async def window_times(want_tag=None):
     '''
     Return list of tuples (wid,tag,time)
 
     If want_tag is given, filter list to only include that tag
     '''
+    await write_behind.flush()
     cmd=["foreach", "C", 'clients.',
          'sprintf', 'T', '%c.tag', 'C',
          'substitute', 'TAG', 'T',
@@ -170,13 +758,14 @@ async def window_ids_by_tag():
     ret = defaultdict(list)
     for wid,tag in await window_ids():
         ret[tag].append(wid)
-    return wid
+    return ret
 
 
 async def tag_times():
     '''
     Return list of tuples (tags,time)
     '''
+    await write_behind.flush()
     cmd=["foreach", "T", "tags.by-name.", "sprintf", "N",
          '%c.name', "T", "substitute", "NAME", "N",
          "sprintf", "F", "%c.my_focus_time", "T",
@@ -210,21 +799,20 @@ async def all_tags():
 
 
 async def init_my_focus_time():
-    tagdots = await hc(*"complete 1 attr tags.by-name.".split())
+    async with hc_batch() as b:
+        tagdots = b.add(*"complete 1 attr tags.by-name.".split())
+        clis = b.add(*'complete 1 attr clients.'.split())
+    tagdots = tagdots.result().output
+    clis = clis.result().output
 
+    attrs = list()
     for tagdot in tagdots.split('\n'):
         parts = [t.strip() for t in tagdot.split('.') if t.strip()]
         if not parts:
             continue
         tag = parts[-1]
-        time = str(now())
-        attr = f'tags.by-name.{tag}.my_focus_time'
-        cmd = ['or', ',',
-               'get_attr', attr, ',',
-               'new_attr', 'string', attr, time]
-        await hc(*cmd)
-
-    clis = await hc(*'complete 1 attr clients.'.split())
+        attrs.append(f'tags.by-name.{tag}.my_focus_time')
+
     for cli in clis.split('\n'):
         parts = cli.strip().split('.')
         if len(parts) < 2:
@@ -232,37 +820,66 @@ async def init_my_focus_time():
         wid = parts[1].strip()
         if not wid.startswith('0x'):
             continue
-        time = str(now())
-        attr = f'clients.{wid}.my_focus_time'
-        cmd = ['or',',',
-               'get_attr', attr, ',',
-               'new_attr', 'string', attr, time]
-        await hc(*cmd)
+        attrs.append(f'clients.{wid}.my_focus_time')
 
+    async with hc_batch() as b:
+        for attr in attrs:
+            time = str(now())
+            b.add('or', ',',
+                  'get_attr', attr, ',',
+                  'new_attr', 'string', attr, time)
 
-async def clear_tag(tag, goto=None):
+
+def clear_plan(snap, tags, goto=None):
     '''
-    Close all windows in a tag and remove tag.
+    Return list of commands clearing tags given a Snapshot.
 
+    All windows on the tags are closed, goto (or else the first tag kept)
+    is made current and the tags are merged into the first tag kept so
+    that none is merged into one also being cleared.  If every tag is to
+    be cleared the first is emptied and kept.
     '''
-    tags = await tag_status()
-    mergeto = None
-    for other in tags:
-        if other == tag:
-            continue
-        mergeto = other
-        break
+    chosen = set(tags)
+    doomed = [tag for tag in snap.tags if tag in chosen]
+    keep = [tag for tag in snap.tags if tag not in chosen]
+    emptied = set(doomed)
+    if not keep and doomed:
+        keep.append(doomed.pop(0))
+    mergeto = keep[0] if keep else None
+    if not goto or goto in doomed:
+        goto = mergeto
+    cmds = [('close', cli.winid) for cli in snap.clients.values()
+            if cli.tag in emptied]
+    if goto:
+        cmds += [('focus_monitor', '0'), ('use', goto)]
+    cmds += [('merge_tag', tag, mergeto) for tag in doomed]
+    return cmds
 
-    text = await hc(f'dump {tag}')
-    have = make_tree(text)
 
-    for node in [have] + list(have.descendants):
-        wids = getattr(node, "wids", ())
-        for wid in wids:
-            await hc(f'close {wid}')
-    if not goto:
-        goto = mergeto
-    await hc("focus_monitor 0")
-    await hc(f'use {goto}')
-    if mergeto:
-        await hc(f'merge_tag {tag} {mergeto}')
+async def clear_tags(tags, goto=None):
+    '''
+    Close all windows in tags and remove them, see clear_plan().
+
+    This takes one snapshot and sends all commands in one batch.  Return
+    dict of what was done and how long it took.
+    '''
+    start = monotonic()
+    snap = await snapshot(monitors=False)
+    cmds = clear_plan(snap, tags, goto)
+    async with hc_batch() as b:
+        for cmd in cmds:
+            b.add(*cmd)
+    ret = dict(tags=[cmd[1] for cmd in cmds if cmd[0] == 'merge_tag'],
+               closed=sum(cmd[0] == 'close' for cmd in cmds),
+               failed=sum(bool(reply.status) for reply in b.results),
+               seconds=monotonic() - start)
+    log.info(f'cleared {len(ret["tags"])} tags, closed {ret["closed"]} '
+             f'windows in {ret["seconds"]:.3f}s')
+    return ret
+
+
+async def clear_tag(tag, goto=None):
+    '''
+    Close all windows in a tag and remove tag.
+    '''
+    return await clear_tags([tag], goto)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+'''
+herbie database
+
+An SQLite store of layouts and tasks.  This is an alternative backend to
+the one file per layout store of herbie.alayouts and provides the same
+read_store(), add_store() and del_store() functions.
+
+Functions taking an optional db use the default connection() if it is not
+given.
+'''
+
+import sqlite3
+from pathlib import Path
+import herbie.alayouts as alayouts
+import herbie.stats as stats
+from herbie.alayouts import Layout
+from herbie.frames import fingerprint
+
+import logging
+log = logging.getLogger("herbie")
+
+default_path = Path.home() / ".config/herbie/herbie.db"
+
+schema = '''
+create table if not exists layouts (
+    tag text not null,
+    name text not null,
+    sexp text not null,
+    fingerprint text,
+    primary key (tag, name)
+) without rowid;
+create index if not exists layouts_name on layouts (name);
+create table if not exists tasks (
+    name text primary key,
+    sexp text not null
+);
+create table if not exists meta (
+    key text primary key,
+    value text
+);
+'''
+
+_default = None
+
+
+def connection(path=None):
+    '''
+    Return a connection to the database at path.
+
+    With no path, return the default connection, opening it at
+    default_path the first time.  A connection to a given path is not made
+    the default.
+    '''
+    global _default
+    if path is None:
+        if _default is None:
+            _default = _open(default_path)
+        return _default
+    return _open(path)
+
+
+def _open(path):
+    path = str(path)
+    if path != ":memory:":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute("pragma journal_mode=wal")
+    db.execute("pragma synchronous=normal")
+    db.executescript(schema)
+    _upgrade(db)
+    return db
+
+
+def _fingerprint(sexp):
+    try:
+        return fingerprint(sexp)
+    except ValueError as err:
+        log.warning(f'bad layout: {err}')
+        return None
+
+
+def _upgrade(db):
+    '''
+    Bring a database made by an older herbie up to the schema.
+    '''
+    cols = [row[1] for row in db.execute("pragma table_info(layouts)")]
+    with db:
+        if "fingerprint" not in cols:
+            db.execute("alter table layouts add column fingerprint text")
+        rows = db.execute("select tag, name, sexp from layouts "
+                          "where fingerprint is null").fetchall()
+        db.executemany("update layouts set fingerprint=? "
+                       "where tag=? and name=?",
+                       [(_fingerprint(sexp), tag, name)
+                        for tag, name, sexp in rows])
+        db.execute("create index if not exists layouts_fingerprint "
+                   "on layouts (tag, fingerprint)")
+
+
+def _rows(tag, lays):
+    return [(tag, lay.name, lay.sexp, _fingerprint(lay.sexp)) for lay in lays]
+
+
+def add_layouts(tag, lays, db=None):
+    '''
+    Add or replace layouts of tag in one transaction.
+    '''
+    db = db or connection()
+    with db:
+        db.executemany("insert or replace into layouts "
+                       "(tag, name, sexp, fingerprint) values (?,?,?,?)",
+                       _rows(tag, lays))
+
+
+def get_layouts(tag, db=None):
+    '''
+    Return list of Layouts of tag ordered by name.
+    '''
+    db = db or connection()
+    rows = db.execute("select name, sexp from layouts where tag=? "
+                      "order by name", (tag,))
+    return [Layout(name, sexp) for name, sexp in rows]
+
+
+def find_layouts(sexp, tag, db=None):
+    '''
+    Return list of Layouts of tag with the same fingerprint as sexp.
+    '''
+    db = db or connection()
+    rows = db.execute("select name, sexp from layouts where tag=? and "
+                      "fingerprint=? order by name", (tag, fingerprint(sexp)))
+    return [Layout(name, sexp) for name, sexp in rows]
+
+
+def del_layouts(tag, names, db=None):
+    '''
+    Remove named layouts of tag in one transaction.
+    '''
+    db = db or connection()
+    with db:
+        db.executemany("delete from layouts where tag=? and name=?",
+                       [(tag, name) for name in names])
+
+
+def tags(db=None):
+    '''
+    Return list of tags having layouts.
+    '''
+    db = db or connection()
+    return [tag for tag, in
+            db.execute("select distinct tag from layouts order by tag")]
+
+
+def add_tasks(tasks, db=None):
+    '''
+    Add or replace tasks given as dict of name to sexp.
+    '''
+    db = db or connection()
+    with db:
+        db.executemany("insert or replace into tasks values (?,?)",
+                       list(tasks.items()))
+
+
+def get_tasks(db=None):
+    '''
+    Return dict of task name to sexp.
+    '''
+    db = db or connection()
+    return dict(db.execute("select name, sexp from tasks order by name"))
+
+
+def migrate(db=None, base=None):
+    '''
+    Copy layouts from the directory store into the database once.
+
+    Return number of layouts copied, zero if this was done before.
+    '''
+    db = db or connection()
+    base = Path(base or alayouts.base_path)
+    if db.execute("select value from meta where key='migrated'").fetchone():
+        return 0
+    rows = list()
+    if base.exists():
+        for tagdir in base.iterdir():
+            if not tagdir.is_dir():
+                continue
+            for one in tagdir.glob("*.layout"):
+                lay = Layout(one.stem, one.read_text().strip())
+                rows += _rows(tagdir.name, [lay])
+    with db:
+        db.executemany("insert or replace into layouts "
+                       "(tag, name, sexp, fingerprint) values (?,?,?,?)", rows)
+        db.execute("insert into meta values ('migrated', ?)", (str(base),))
+    return len(rows)
+
+
+def stamp(tag):
+    '''
+    Return something that differs after layouts of tag change.
+    '''
+    db = connection()
+    version, = db.execute("pragma data_version").fetchone()
+    return (version, db.total_changes)
+
+
+@stats.timed("store.read")
+def read_store(tag):
+    '''
+    Return list of Layouts stored on tag.
+    '''
+    return get_layouts(tag)
+
+
+@stats.timed("store.find")
+def find_store(sexp, tag):
+    '''
+    Return list of Layouts stored on tag with the same fingerprint as sexp.
+    '''
+    return find_layouts(sexp, tag)
+
+
+@stats.timed("store.write")
+def add_store(lay, tag):
+    '''
+    Add lay to store for tag.
+    '''
+    add_layouts(tag, [lay])
+
+
+@stats.timed("store.delete")
+def del_store(lay, tag):
+    '''
+    Assure layout is no longer in store.
+    '''
+    del_layouts(tag, [lay.name])
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+'''
+Dispatch hooks to handlers without blocking on them.
+
+Hooks that only track state go through one "fast" lane which runs them in
+the order received.  Every other hook gets its own lane with one of these
+policies:
+
+- serialize :: run one at a time in order received.
+- drop :: ignore the hook if its handler is still running.
+- cancel :: cancel a still running handler and run the new one.
+
+Interactive handlers (eg, those waiting on rofi) thus run as separate tasks
+while hooks keep being read.
+'''
+
+import time
+import asyncio
+from dataclasses import dataclass, asdict
+import herbie.stats as stats
+
+import logging
+log = logging.getLogger("herbie")
+
+policies = ("fast", "serialize", "drop", "cancel")
+
+
+@dataclass
+class LaneStats:
+    '''
+    Counters for one lane.  Lag is seconds from receiving a hook to
+    starting its handler.
+    '''
+    received: int = 0
+    done: int = 0
+    failed: int = 0
+    dropped: int = 0
+    cancelled: int = 0
+    lag_sum: float = 0.0
+    lag_max: float = 0.0
+    lag_last: float = 0.0
+
+
+class Lane:
+    '''
+    Run handlers for one or more hooks following a policy.
+    '''
+
+    def __init__(self, name, policy="serialize"):
+        if policy not in policies:
+            raise ValueError(f'unknown hook policy "{policy}"')
+        self.name = name
+        self.policy = policy
+        self.stats = LaneStats()
+        self._queue = asyncio.Queue()
+        self._worker = None
+        self._task = None
+
+    @property
+    def busy(self):
+        return self._task is not None and not self._task.done()
+
+    @property
+    def depth(self):
+        '''
+        Number of hooks waiting to run.
+        '''
+        return self._queue.qsize()
+
+    def submit(self, handler, args, received):
+        self.stats.received += 1
+        if self.policy in ("fast", "serialize"):
+            self._queue.put_nowait((handler, args, received))
+            if self._worker is None or self._worker.done():
+                self._worker = asyncio.create_task(self._work())
+            return
+
+        if self.busy:
+            if self.policy == "drop":
+                log.debug(f'dropping {self.name}, still busy')
+                self.stats.dropped += 1
+                return
+            log.debug(f'cancelling running {self.name}')
+            self._task.cancel()
+            self.stats.cancelled += 1
+        self._task = asyncio.create_task(self._run(handler, args, received))
+
+    async def _work(self):
+        while True:
+            handler, args, received = await self._queue.get()
+            self._task = asyncio.create_task(self._run(handler, args, received))
+            try:
+                await self._task
+            finally:
+                self._queue.task_done()
+
+    async def join(self):
+        '''
+        Wait until no handler is waiting or running.
+        '''
+        await self._queue.join()
+        while self.busy:
+            await asyncio.wait([self._task])
+
+    async def _run(self, handler, args, received):
+        lag = time.monotonic() - received
+        counts = self.stats
+        counts.lag_last = lag
+        counts.lag_sum += lag
+        counts.lag_max = max(counts.lag_max, lag)
+        name = handler.__name__
+        stats.handler.set(name)
+        stats.observe("hook.lag", lag)
+        start = time.monotonic()
+        try:
+            await handler(*args)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            counts.failed += 1
+            log.exception(f'handler {name} failed')
+            return
+        finally:
+            stats.span("hook", start, time.monotonic() - start,
+                       dict(lag=round(lag, 6)))
+        counts.done += 1
+
+    def metrics(self):
+        ret = asdict(self.stats)
+        started = self.stats.done + self.stats.failed
+        ret.update(policy=self.policy, depth=self.depth, busy=self.busy,
+                   lag_mean=self.stats.lag_sum / started if started else 0.0)
+        return ret
+
+    async def close(self):
+        for task in (self._worker, self._task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+
+class Dispatcher:
+    '''
+    Route hooks to lanes by policy.
+
+    The policies maps hook names to a policy name, all others get default.
+    '''
+
+    def __init__(self, policies=None, default="serialize"):
+        self.policies = dict(policies or {})
+        self.default = default
+        self.fast = Lane("fast", "fast")
+        self.lanes = dict()
+
+    def policy(self, hook):
+        return self.policies.get(hook, self.default)
+
+    def lane(self, hook):
+        '''
+        Return the lane for a hook.
+        '''
+        policy = self.policy(hook)
+        if policy == "fast":
+            return self.fast
+        lane = self.lanes.get(hook)
+        if lane is None:
+            lane = self.lanes[hook] = Lane(hook, policy)
+        return lane
+
+    def submit(self, hook, handler, args, received=None):
+        '''
+        Arrange for handler(*args) to run for hook.
+
+        The received is the time.monotonic() when the hook was read.
+        '''
+        if received is None:
+            received = time.monotonic()
+        self.lane(hook).submit(handler, args, received)
+
+    def metrics(self):
+        '''
+        Return dict of lane name to dict of lane metrics.
+        '''
+        ret = {"fast": self.fast.metrics()}
+        for name, lane in self.lanes.items():
+            ret[name] = lane.metrics()
+        return ret
+
+    async def join(self):
+        '''
+        Wait until all lanes are idle.
+        '''
+        for lane in [self.fast] + list(self.lanes.values()):
+            await lane.join()
+
+    async def close(self):
+        '''
+        Cancel everything still running.
+        '''
+        for lane in [self.fast] + list(self.lanes.values()):
+            await lane.close()
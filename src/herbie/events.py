@@ -4,15 +4,14 @@ Events
 
 '''
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 
 
 def to_bool(b):
     if isinstance(b, bool):
-        return True
+        return b
     if isinstance(b, str):
-        if b.lower() in ("on","yes","true","ok","okay"):
-            return True
+        return b.lower() in ("on","yes","true","ok","okay")
     return True if b else False
 
 def to_int(w):
@@ -23,7 +22,7 @@ def to_int(w):
     return int(w, 10)
 
 
-@dataclass
+@dataclass(slots=True)
 class attribute_changed:
     '''
     The attribute PATH was changed from OLDVALUE to NEWVALUE. Requires that
@@ -33,7 +32,7 @@ class attribute_changed:
     oldvalue: str
     newvalue: str
 
-@dataclass
+@dataclass(slots=True)
 class toggle:
     status: bool
     winid: int
@@ -41,15 +40,13 @@ class toggle:
         self.status = to_bool(status)
         self.winid = to_int(winid)
 
-@dataclass
+@dataclass(slots=True, init=False)
 class fullscreen(toggle):
     '''
     The fullscreen state of window WINID was changed to [on|off].
     '''
-    def __init__(self, *args, **kwds):
-        super().__init__(*args, **kwds)
 
-@dataclass
+@dataclass(slots=True)
 class tag_changed:
     '''
     The tag TAG was selected on MONITOR.
@@ -60,7 +57,7 @@ class tag_changed:
         self.tag = tag
         self.monitor = to_int(monitor)
     
-@dataclass
+@dataclass(slots=True)
 class window:
     winid:int
     title:str
@@ -68,37 +65,33 @@ class window:
         self.winid = to_int(winid)
         self.title = title
     
-@dataclass
+@dataclass(slots=True, init=False)
 class focus_changed(window):
     '''
     The window WINID was focused. Its window title is TITLE.
     '''
-    def __init__(self, *args, **kwds):
-        super().__init__(*args, **kwds)
-    
-@dataclass
+
+@dataclass(slots=True, init=False)
 class window_title_changed(window):
     '''
     The title of the focused window was changed. Its window id is WINID and
     its new title is TITLE.
     '''
-    def __init__(self, *args, **kwds):
-        super().__init__(*args, **kwds)
 
-@dataclass
+@dataclass(slots=True)
 class tag_flags:
     '''
     The flags (i.e. urgent or filled state) have been changed.
     '''
 
-@dataclass
+@dataclass(slots=True)
 class tag_added:
     '''
     A tag named TAG was added.
     '''
     tag:str
 
-@dataclass
+@dataclass(slots=True)
 class tag_removed:
     '''
     The tag named TAG was removed and tag NOW is current
@@ -106,7 +99,7 @@ class tag_removed:
     tag:str
     now:str
     
-@dataclass
+@dataclass(slots=True)
 class tag_renamed:
     '''
     The tag name changed from OLD to NEW.
@@ -114,16 +107,13 @@ class tag_renamed:
     old:str
     new:str
 
-@dataclass
+@dataclass(slots=True, init=False)
 class urgent(toggle):
     '''
     The urgent state of client with given WINID has been changed to [on|off].
     '''
-    def __init__(self, *args, **kwds):
-        super().__init__(*args, **kwds)
-            
 
-@dataclass
+@dataclass(slots=True)
 class rule:
     '''
     A window with the id WINID appeared which triggered a rule with the consequence hook=NAME.
@@ -134,7 +124,7 @@ class rule:
         self.name = name
         self.winid = to_int(winid)
     
-@dataclass
+@dataclass(slots=True)
 class reload:
     '''
     Tells all daemons that the autostart file is reloaded — and tells them
@@ -142,14 +132,14 @@ class reload:
     file.
     '''
 
-@dataclass
+@dataclass(slots=True)
 class quit_panel:
     '''
     Tells a panel to quit. The default panel.sh quits on this hook. Many
     scripts are using this hook.
     '''
     
-@dataclass
+@dataclass(slots=True)
 class hook:
     '''
     Generic user hook
@@ -157,22 +147,87 @@ class hook:
     name: str
     args: list[str]
 
-@dataclass
+@dataclass(slots=True)
 class terminate:
     '''
     No more events will be forthcoming.
     '''
 
+# Event class by hook name.
+registry = {klass.__name__: klass for klass in (
+    attribute_changed, fullscreen, tag_changed, focus_changed,
+    window_title_changed, tag_flags, tag_added, tag_removed, tag_renamed,
+    urgent, rule, reload, quit_panel)}
+
+
+# Number of arguments by hook name.  The last argument (eg, a title) may
+# hold a tab.
+nargs = {name: len(fields(klass)) for name, klass in registry.items()}
+
+
+def split_args(name, text):
+    '''
+    Split the tab separated arguments of a hook.
+    '''
+    num = nargs.get(name)
+    if num is None:
+        return text.split('\t')
+    if num == 0:
+        return []
+    return text.split('\t', num - 1)
+
+
 def parse(hook_text):
     '''
     Given hook text from herbstclient --idle, return an event object
     '''
-    parts = hook_text.split('\t')
-    name = parts[0]
-    rest = parts[1:]
-    try:
-        klass = globals()[name]
-    except KeyError:
-        klass = hook
+    name, tab, rest = hook_text.partition('\t')
+    rest = split_args(name, rest) if tab else []
+    klass = registry.get(name)
+    if klass is None:
+        return hook(name, rest)
     return klass(*rest)
 
+
+class Table:
+    '''
+    A dispatch table compiled once from handlers.
+
+    The handlers maps a hook name to an async callable taking the event
+    object, or to None for hooks whose events are wanted without a
+    handler.
+    '''
+
+    def __init__(self, handlers):
+        self.entries = dict()
+        for name, handler in handlers.items():
+            self.entries[name.encode()] = (name, registry.get(name),
+                                           nargs.get(name), handler)
+
+    def regex(self):
+        '''
+        Return regex matching only hooks in the table for herbstclient --idle.
+        '''
+        names = sorted(entry[0] for entry in self.entries.values())
+        return '^(' + '|'.join(names) + ')(\t|$)'
+
+    def lookup(self, line):
+        '''
+        Return (event, handler) for a line from herbstclient --idle or None.
+
+        The line is bytes and is decoded only if its hook is in the table.
+        '''
+        tab = line.find(b'\t')
+        entry = self.entries.get(line[:tab] if tab >= 0 else line.rstrip())
+        if entry is None:
+            return None
+        name, klass, num, handler = entry
+        if tab < 0 or num == 0:
+            rest = []
+        elif num is None:
+            rest = line[tab+1:].rstrip(b'\n').decode().split('\t')
+        else:
+            rest = line[tab+1:].rstrip(b'\n').decode().split('\t', num - 1)
+        if klass is None:
+            return hook(name, rest), handler
+        return klass(*rest), handler
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+'''
+Frame trees as given by "hc dump" and taken by "hc load".
+
+This is a parser and renderer specific to the herbstluftwm layout grammar:
+
+  (split <orient>:<ratio>:<selection> <frame> <frame>)
+  (clients <layout>:<selection> [<winid> ...] [window:<name> ...])
+
+The window:<name> terms are herbie's own, used by tasks.  The result is the
+same as herbie.util.make_tree() and render_split() give but with a compact
+Frame in place of an anytree Node and without going through sexpdata.
+
+A fingerprint() names the shape of a layout, ignoring window IDs, windows,
+selections and whitespace, so that layouts may be compared by it.
+'''
+
+import hashlib
+from functools import lru_cache
+import herbie.stats as stats
+
+
+class Frame:
+    '''
+    One frame of a layout, a split with two children or a clients leaf.
+
+    A clients frame with a vertical or horizontal layout has its selection
+    held as ratio just as util.make_tree() gives.
+    '''
+
+    __slots__ = ("what", "attrs", "orient", "ratio", "selection", "grid",
+                 "wids", "windows", "children", "parent")
+
+    def __init__(self, what, parent=None):
+        self.what = what
+        self.attrs = list()
+        self.orient = None
+        self.ratio = None
+        self.selection = None
+        self.grid = None
+        self.wids = ()
+        self.windows = ()
+        self.children = ()
+        self.parent = parent
+
+    def __repr__(self):
+        return f'Frame({self.index!r}, {self.what} {" ".join(self.attrs)})'
+
+    @property
+    def index(self):
+        '''
+        The herbstluftwm frame index, eg "01", of this frame, "" for root.
+        '''
+        digits = list()
+        node = self
+        while node.parent is not None:
+            digits.append("0" if node.parent.children[0] is node else "1")
+            node = node.parent
+        return ''.join(reversed(digits))
+
+    @property
+    def path(self):
+        '''
+        Tuple of frames from root to this one.
+        '''
+        ret = [self]
+        while ret[-1].parent is not None:
+            ret.append(ret[-1].parent)
+        return tuple(reversed(ret))
+
+    def walk(self):
+        '''
+        Iterate this frame and all below, parents before children.
+        '''
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.children:
+                stack.extend(reversed(node.children))
+
+    @property
+    def descendants(self):
+        '''
+        Tuple of all frames below this one, parents before children.
+        '''
+        walk = self.walk()
+        next(walk)
+        return tuple(walk)
+
+    def get(self, index):
+        '''
+        Return the frame at herbstluftwm frame index below this one or None.
+        '''
+        node = self
+        for digit in index:
+            if len(node.children) != 2:
+                return None
+            node = node.children[digit == "1"]
+        return node
+
+
+def _term(node, term):
+    key, sep, value = term.partition(":")
+    if key != "window":
+        node.attrs.append(term)
+
+    if key == "vertical" or key == "horizontal":
+        node.orient = key
+        ratio, sep, selection = value.partition(":")
+        node.ratio = float(ratio)
+        if sep:
+            node.selection = int(selection)
+    elif key == "grid":
+        node.orient = key
+        node.grid = int(value)
+    elif key == "max":
+        pass
+    elif key.startswith("0x"):
+        if not node.wids:
+            node.wids = list()
+        node.wids.append(term)
+    elif key == "window":
+        if not node.windows:
+            node.windows = list()
+        node.windows.append(value)
+    else:
+        raise ValueError(f'Unknown: {term}')
+
+
+@stats.timed("parse")
+def parse(dump):
+    '''
+    Parse output of "hc dump" into a tree of Frame, return its root.
+    '''
+    tokens = dump.replace("(", " ( ").replace(")", " ) ").split()
+    if not tokens or tokens[0] != "(":
+        raise ValueError(f'not a layout: {dump!r}')
+    stack = list()
+    root = None
+    pos = 0
+    ntokens = len(tokens)
+    while pos < ntokens:
+        tok = tokens[pos]
+        pos += 1
+        if tok == "(":
+            if pos == ntokens:
+                raise ValueError("unbalanced layout")
+            parent = stack[-1] if stack else None
+            node = Frame(tokens[pos], parent)
+            pos += 1
+            if parent is None:
+                if root is not None:
+                    raise ValueError("more than one layout")
+                root = node
+            else:
+                if len(parent.children) > 1:
+                    raise ValueError("binary tree")
+                parent.children += (node,)
+            stack.append(node)
+            continue
+        if tok == ")":
+            if not stack:
+                raise ValueError("unbalanced layout")
+            node = stack.pop()
+            if node.what == "clients" and not node.attrs:
+                node.attrs.append("vertical:0")
+            continue
+        if not stack:
+            raise ValueError(f'term outside of layout: {tok}')
+        _term(stack[-1], tok)
+    if stack:
+        raise ValueError("unbalanced layout")
+    return root
+
+
+def _render(node, out):
+    out.append("(")
+    out.append(node.what)
+    out.append(" ")
+    out.append(" ".join(node.attrs))
+    for child in node.children:
+        out.append(" ")
+        _render(child, out)
+    out.append(")")
+
+
+def render(tree):
+    '''
+    Render tree of Frame back to a layout suitable for "hc load".
+    '''
+    out = list()
+    _render(tree, out)
+    return ''.join(out)
+
+
+def wids(tree):
+    '''
+    Return list of all window IDs in tree in frame order.
+    '''
+    return [wid for node in tree.walk() for wid in node.wids]
+
+
+# Digits of split ratios kept in a canonical layout.
+precision = 3
+
+# Algorithms of clients frames.
+layouts = ("vertical", "horizontal", "max", "grid")
+
+
+def _canonical(node, out):
+    out.append("(")
+    out.append(node.what)
+    if node.what == "split":
+        out.append(f' {node.orient}:{node.ratio:.{precision}f}')
+    else:
+        layout = "vertical"
+        for attr in node.attrs:
+            key = attr.partition(":")[0]
+            if key in layouts:
+                layout = key
+                break
+        out.append(" " + layout)
+    for child in node.children:
+        out.append(" ")
+        _canonical(child, out)
+    out.append(")")
+
+
+def canonical(tree):
+    '''
+    Return layout text of tree with only what makes its shape.
+
+    Window IDs, windows and selections are dropped and ratios are given
+    to a fixed precision.
+    '''
+    out = list()
+    _canonical(tree, out)
+    return ''.join(out)
+
+
+@lru_cache(maxsize=4096)
+def _fingerprint(dump):
+    text = canonical(parse(dump))
+    return hashlib.blake2b(text.encode(), digest_size=10).hexdigest()
+
+
+def fingerprint(layout):
+    '''
+    Return a hash string of the canonical form of a layout.
+
+    The layout may be text as from "hc dump" or a tree of Frame.
+    '''
+    if isinstance(layout, Frame):
+        layout = render(layout)
+    return _fingerprint(layout)
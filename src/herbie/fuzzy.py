@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+'''
+In-process fuzzy matching of menu texts.
+
+A query matches a text if its characters appear in the text in order,
+ignoring case.  Matches score higher when the query is a substring of the
+text, when its characters follow each other and when they start words.
+This is used to filter and order large menus before they reach rofi.
+'''
+
+import re
+import heapq
+from herbie.hmenu import Menu
+
+# Characters after which a match starts a word.
+boundary = frozenset(" \t/_-.:()[]")
+
+
+def pattern(query):
+    '''
+    Return a compiled regex matching texts with the characters of query in
+    order.  Each step skips only what is not the next character so a text
+    is scanned once whether or not it matches.
+    '''
+    return re.compile(''.join(f'[^{re.escape(c)}]*{re.escape(c)}'
+                              for c in query))
+
+
+def score(query, text):
+    '''
+    Return score of lower case query matching lower case text or None.
+    '''
+    if not query:
+        return 0
+    pos = text.find(query)
+    if pos >= 0:
+        bonus = 2 * len(query) if pos == 0 or text[pos-1] in boundary else 0
+        return 6 * len(query) + bonus
+    total = 0
+    prev = -2
+    pos = 0
+    for char in query:
+        pos = text.find(char, pos)
+        if pos < 0:
+            return None
+        if pos == prev + 1:
+            total += 5
+        elif pos == 0 or text[pos-1] in boundary:
+            total += 3
+        else:
+            total -= min(pos - prev - 1, 3)
+        total += 1
+        prev = pos
+        pos += 1
+    return total
+
+
+class Matcher:
+    '''
+    Match queries against a fixed list of texts.
+    '''
+
+    def __init__(self, texts):
+        self.texts = [text.lower() for text in texts]
+
+    def rank(self, query, limit=None):
+        '''
+        Return list of (score, index) of matching texts, best first.
+        '''
+        query = query.lower()
+        got = list()
+        if len(query) == 1:     # no order to check
+            for ind, text in enumerate(self.texts):
+                if query in text:
+                    got.append((score(query, text), ind))
+        else:
+            match = pattern(query).match
+            for ind, text in enumerate(self.texts):
+                if match(text):
+                    got.append((score(query, text), ind))
+        key = lambda si: (-si[0], si[1])
+        if limit is not None and len(got) > limit:
+            return heapq.nsmallest(limit, got, key=key)
+        got.sort(key=key)
+        return got
+
+
+def select(menu, query, limit=None):
+    '''
+    Return a new Menu of items of menu matching query, best first.
+    '''
+    ret = Menu(prompt=menu.prompt, message=menu.message)
+    active = set(menu.active)
+    for _, ind in Matcher(menu.texts).rank(query, limit):
+        ret.add(menu.texts[ind], menu.values[ind], menu.icons[ind],
+                ind in active)
+    return ret
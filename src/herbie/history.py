@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+'''
+Window focus history.
+
+herbie used to keep focus history only in my_focus_time attributes of
+herbstluftwm clients and read it all back to find a recent window.  This
+keeps it in process instead.
+'''
+
+import heapq
+from itertools import islice
+from collections import OrderedDict, defaultdict
+
+
+class FocusHistory:
+    '''
+    Most recently focused windows, over all tags and per tag.
+
+    Each ordering is an OrderedDict from window ID to focus time, oldest
+    first.  A focus or a move to another tag puts a window at the fresh end
+    in O(1).  Asking for the n-th most recent walks n links from the fresh
+    end so it is O(n), cheap for the small n that last_window uses.
+    '''
+
+    def __init__(self):
+        self._all = OrderedDict()
+        self._tags = defaultdict(OrderedDict)
+        self._tag_of = dict()
+
+    def __len__(self):
+        return len(self._all)
+
+    def __contains__(self, wid):
+        return wid in self._all
+
+    def count(self, tag=None):
+        '''
+        Return number of windows in history, only those on tag if given.
+        '''
+        if tag is None:
+            return len(self._all)
+        return len(self._tags.get(tag, ()))
+
+    def touch(self, wid, tag, time):
+        '''
+        Record that window wid on tag was focused at time.
+        '''
+        old = self._tag_of.get(wid)
+        if old is not None and old != tag:
+            self._tags[old].pop(wid, None)
+        self._tag_of[wid] = tag
+        for order in (self._all, self._tags[tag]):
+            order[wid] = time
+            order.move_to_end(wid)
+
+    def remove(self, wid):
+        '''
+        Forget window wid.
+        '''
+        self._all.pop(wid, None)
+        tag = self._tag_of.pop(wid, None)
+        if tag is not None:
+            self._tags[tag].pop(wid, None)
+
+    def time(self, wid):
+        '''
+        Return last focus time of wid or None.
+        '''
+        return self._all.get(wid)
+
+    def tag(self, wid):
+        '''
+        Return tag of wid as last known or None.
+        '''
+        return self._tag_of.get(wid)
+
+    def nth(self, n, tag=None):
+        '''
+        Return the n-th most recently focused wid or None.  n=0 is freshest.
+        This takes O(n).
+        '''
+        order = self._all if tag is None else self._tags.get(tag, {})
+        for wid in islice(reversed(order), n, None):
+            return wid
+        return None
+
+    def recent(self, tag=None):
+        '''
+        Iterate (wid, time) freshest first, only on tag if given.
+        '''
+        order = self._all if tag is None else self._tags.get(tag, {})
+        for wid in reversed(order):
+            yield wid, order[wid]
+
+    def move(self, wid, tag):
+        '''
+        Record that wid is now on tag without it having been focused.
+
+        It becomes the most recent window of that tag.
+        '''
+        time = self._all.get(wid)
+        if time is None or self._tag_of.get(wid) == tag:
+            return
+        self._tags[self._tag_of[wid]].pop(wid, None)
+        self._tag_of[wid] = tag
+        order = self._tags[tag]
+        order[wid] = time
+        order.move_to_end(wid)
+
+    def rename_tag(self, old, new):
+        '''
+        Move all windows of tag old to tag new.
+
+        If new already has windows the two orders are merged by focus time
+        in one pass.
+        '''
+        moved = self._tags.pop(old, None)
+        if not moved:
+            return
+        for wid in moved:
+            self._tag_of[wid] = new
+        have = self._tags.get(new)
+        if not have:
+            self._tags[new] = moved
+            return
+        self._tags[new] = OrderedDict(heapq.merge(
+            have.items(), moved.items(), key=lambda wt: wt[1]))
+
+    def seed(self, clients):
+        '''
+        Add astluft.Client objects ordered by their focus_time.
+        '''
+        for cli in sorted(clients, key=lambda c: c.focus_time):
+            self.touch(cli.winid, cli.tag, cli.focus_time)
+
+    def sync(self, clients):
+        '''
+        Make history agree with the dict of astluft.Client by winid.
+
+        Windows that are gone are forgotten, those that moved are moved and
+        new ones are added with their focus_time.
+        '''
+        for wid in [w for w in self._all if w not in clients]:
+            self.remove(wid)
+        new = [cli for wid, cli in clients.items() if wid not in self._all]
+        for wid, cli in clients.items():
+            if wid in self._all:
+                self.move(wid, cli.tag)
+        if not new:
+            return
+        # A window not in history may have been focused before others that
+        # are, so put new ones in time order and not at the fresh end.
+        bytime = lambda wt: wt[1]
+        tags = set()
+        for cli in new:
+            self._all[cli.winid] = cli.focus_time
+            self._tag_of[cli.winid] = cli.tag
+            self._tags[cli.tag][cli.winid] = cli.focus_time
+            tags.add(cli.tag)
+        self._all = OrderedDict(sorted(self._all.items(), key=bytime))
+        for tag in tags:
+            self._tags[tag] = OrderedDict(
+                sorted(self._tags[tag].items(), key=bytime))
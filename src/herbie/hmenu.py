@@ -3,12 +3,17 @@
 
 An async interface to a dmenu type of list item selection uesr interface.
 
+Menus are shown by a Backend, Rofi or, without a display, Scripted.
+
 '''
 
+import time
 import asyncio
+from abc import ABC, abstractmethod
 from asyncio.subprocess import PIPE
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
+from collections import namedtuple, deque
 
 import logging
 log = logging.getLogger("herbie")
@@ -24,42 +29,187 @@ class Item:
     '''Opaque object for use by the caller'''
     icon : str = None
     '''Optional name of an icon'''
+    active : bool = False
+    '''Whether the item is shown as currently in effect'''
 
     def __str__(self):
         return self.text
 
     
-@dataclass
+NUL = '\x00'
+GS = '\x1d'                    # ascii group separator
+RS = '\x1e'                    # ascii record separator
+US = '\x1f'                    # ascii unit separator
+_RS = RS.encode()
+
+
+def row(text, icon=None, active=False):
+    '''
+    Return the text rofi reads for one item.
+    '''
+    opts = ''
+    if icon:
+        opts += f'{NUL}icon{US}{icon}'
+    if active:
+        opts += f'{US if opts else NUL}active{US}true'
+    return text + opts
+
+
+Choice = namedtuple("Choice", "index text")
+Choice.__doc__ = '''
+A selection from a menu.  The index is that of the chosen item or None if
+the user gave text matching no item.
+'''
+
+
 class Menu:
-    items: list[Item]
-    '''List of menu items'''
-    prompt : str = None
-    '''Optional prompt'''
-    message : str = None
-    '''Optional informational message to the user'''
-    
-    
+    '''
+    Menu items held as columns.
+
+    Each item has a text, value, icon and active flag kept in parallel
+    lists.  Texts are indexed and the rows given to rofi are kept joined
+    in payload as items are added.
+    '''
+
+    def __init__(self, items=(), prompt=None, message=None, source=None):
+        self.texts = list()
+        '''The content of each item presented to the user'''
+        self.values = list()
+        '''Opaque object of each item for use by the caller'''
+        self.icons = list()
+        '''Optional name of an icon of each item'''
+        self.active = list()
+        '''Indices of items shown as currently in effect'''
+        self.prompt = prompt
+        self.message = message
+        self.source = source
+        '''Optional async iterable giving more items'''
+        self.payload = bytearray()
+        '''The rows, RS separated and encoded'''
+        self.have_icons = False
+        self._index = dict()
+        for item in items:
+            self.append(item)
+
+    def add(self, text, value=None, icon=None, active=False):
+        '''
+        Add an item, return its index.
+        '''
+        ind = len(self.texts)
+        self.texts.append(text)
+        self.values.append(value)
+        self.icons.append(icon)
+        self._index.setdefault(text, ind)
+        if active:
+            self.active.append(ind)
+        if icon:
+            self.have_icons = True
+        if ind:
+            self.payload += _RS
+        self.payload += row(text, icon, active).encode()
+        return ind
+
+    def append(self, item):
+        '''
+        Add an Item, return its index.
+        '''
+        return self.add(item.text, item.value, item.icon, item.active)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, ind):
+        return Item(self.texts[ind], self.values[ind], self.icons[ind],
+                    ind in self.active)
+
+    @property
+    def items(self):
+        '''
+        List of all items as Item.
+        '''
+        return [self[ind] for ind in range(len(self))]
+
+    async def fill(self):
+        '''
+        Add all items from source.
+        '''
+        if self.source is None:
+            return
+        async for item in self.source:
+            self.append(item)
+        self.source = None
+
     def index(self, text: str) -> int:
         '''
-        Return index of item with text or None
+        Return index of first item with text or None
         '''
-        for ind, item in enumerate(self.items):
-            if text == item.text:
-                return ind
-        return None
+        return self._index.get(text)
 
     def __str__(self):
-        return '\n'.join(map(str, self.items))
+        return '\n'.join(self.texts)
 
-NUL = '\x00'
-GS = '\x1d'                    # ascii group separator
-RS = '\x1e'                    # ascii record separator
-US = '\x1f'                    # ascii unit separator
 
+@dataclass
+class Payload:
+    '''
+    What is needed to show a menu.
+    '''
+    command: list[str]
+    '''The command line'''
+    data: bytes
+    '''The items as sent on stdin'''
+
+
+# Functions called with (Backend, Menu, list of Choice, start, seconds)
+# after each menu is shown, the start being the time.monotonic() of asking
+# for it.
+observers = list()
+
+
+class Backend(ABC):
+    '''
+    The interface to something that shows menus.
+
+    The spawned attribute holds the time.monotonic() when a menu was last
+    asked to be shown.
+    '''
+
+    spawned = None
+
+    @abstractmethod
+    def prepare(self, menu):
+        '''
+        Return a Payload to show menu with run().
+        '''
+
+    @abstractmethod
+    async def run(self, payload, menu):
+        '''
+        Show a prepared payload of menu and return list of Choice.
+        '''
+
+    @abstractmethod
+    async def stream(self, menu):
+        '''
+        Show menu while its source still gives items, return list of Choice.
+        '''
+
+    async def __call__(self, menu):
+        '''
+        Return list of Choice made from menu.
+        '''
+        start = time.monotonic()
+        if menu.source is not None:
+            got = await self.stream(menu)
+        else:
+            got = await self.run(self.prepare(menu), menu)
+        for observer in observers:
+            observer(self, menu, got, start, time.monotonic() - start)
+        return got
 
 
 @dataclass
-class Rofi:
+class Rofi(Backend):
     '''
     A menu implemented with rofi.
     '''
@@ -69,6 +219,11 @@ class Rofi:
     location: str = None
     multi_select: bool = False
     columns: int = None
+    program: str = "rofi"
+    pre_read: int = 25
+    '''Number of items rofi reads before showing a streamed menu'''
+    spawned: float = field(default=None, init=False, repr=False, compare=False)
+    '''The time.monotonic() when the program was last asked to start'''
 
     def monitor_options(self):
         option = {
@@ -98,7 +253,7 @@ class Rofi:
 
     def basic_command(self):
         # fixme: add support for monitor,location,width,font
-        cmd = ["rofi", "-i", "-dmenu", "-format", "s", "-sep", RS]
+        cmd = [self.program, "-i", "-dmenu", "-format", "i f", "-sep", RS]
         cmd += self.monitor_options()
         cmd += self.location_options()
         if not self.literal:
@@ -109,43 +264,237 @@ class Rofi:
             cmd += ["-columns", str(self.columns)]
         return cmd
 
-    async def __call__(self, menu):
+    def command(self, menu, icons=False):
         '''
-        Return list of selected text items.        
+        Return command line to show menu.
         '''
-
-        lines = list()
-        have_icons = False
-        for item in menu.items:
-            if item.icon:
-                have_icons = True
-                lines.append(f'{item.text}{NUL}icon{US}{item.icon}')
-            else:
-                lines.append(item.text)
-        content = RS.join(lines)
-
         cmd = self.basic_command()
         if menu.prompt:
             cmd += ['-p',menu.prompt]
         if menu.message:
             cmd += ['-mesg', menu.message]
-        if have_icons:
+        if icons:
             cmd.append("-show-icons")
+        return cmd
 
+    def prepare(self, menu):
+        '''
+        Return Payload to show menu, ready for run().
+        '''
+        cmd = self.command(menu, menu.have_icons)
+        if menu.active:
+            cmd += ['-selected-row', str(menu.active[0])]
+        return Payload(cmd, bytes(menu.payload))
+
+    async def _spawn(self, cmd):
+        self.spawned = time.monotonic()
         proc = await asyncio.create_subprocess_exec(
             *cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
-
         if not proc:
             cmdstr = ' '.join(cmd)
             raise RuntimeError(f'failed to run "{cmdstr}"')
+        return proc
 
-        out,err = await proc.communicate(content.encode())
+    @staticmethod
+    async def _close(proc):
+        # A cancelled menu takes its rofi down so the next one can show.
+        if proc.returncode is None:
+            proc.kill()
+        await proc.wait()
+
+    @staticmethod
+    def _selected(menu, out, err):
         if err:
             raise RuntimeError(err.strip())
-        out = out.decode().strip()
-        if not out:
-            return list()
-        return out.split("\n")
+        ret = list()
+        for line in out.decode().split("\n"):
+            if not line:
+                continue
+            ind, _, text = line.partition(" ")
+            ind = int(ind)
+            if 0 <= ind < len(menu):
+                ret.append(Choice(ind, menu.texts[ind]))
+            elif text.strip():
+                ret.append(Choice(None, text.strip()))
+        return ret
+
+    async def run(self, payload, menu):
+        '''
+        Show a prepared payload of menu and return list of Choice.
+        '''
+        proc = await self._spawn(payload.command)
+        try:
+            got = await proc.communicate(payload.data)
+        except asyncio.CancelledError:
+            await self._close(proc)
+            raise
+        return self._selected(menu, *got)
+
+    async def stream(self, menu):
+        '''
+        Show menu while its source still gives items.
+
+        Return list of Choice.  Items are written as they come and rofi
+        shows the first pre_read of them right away.  The source is left
+        partly read if a selection is made before it ends.
+        '''
+        cmd = self.command(menu, icons=True)
+        cmd += ['-async-pre-read', str(self.pre_read)]
+        proc = await self._spawn(cmd)
+        stdin = proc.stdin
+        stdin.write(bytes(menu.payload))
+        sent = len(menu.payload)
+        try:
+            try:
+                if menu.source is not None:
+                    async for item in menu.source:
+                        menu.append(item)
+                        stdin.write(bytes(menu.payload[sent:]))
+                        sent = len(menu.payload)
+                        await stdin.drain()
+                    menu.source = None
+            except (BrokenPipeError, ConnectionResetError):
+                log.debug('menu closed before all items were given')
+            finally:
+                stdin.close()
+            got = await proc.communicate()
+        except asyncio.CancelledError:
+            await self._close(proc)
+            raise
+        return self._selected(menu, *got)
+
+
+class Scripted(Backend):
+    '''
+    A headless menu giving answers from a script, for tests and benchmarks.
+
+    Each menu shown takes the next answer.  An answer is a list of item
+    texts or indices, a single one of those or a function of the Menu
+    returning one.  A text not in the menu is a choice of new text.  With
+    no answers left, nothing is chosen.
+    '''
+
+    def __init__(self, answers=()):
+        self.answers = deque(answers)
+        self.shown = list()
+        '''The menus shown, in order'''
+
+    def prepare(self, menu):
+        return Payload([], bytes(menu.payload))
+
+    def _answer(self, menu):
+        self.shown.append(menu)
+        answer = self.answers.popleft() if self.answers else []
+        if callable(answer):
+            answer = answer(menu)
+        if isinstance(answer, (str, int)):
+            answer = [answer]
+        ret = list()
+        for one in answer:
+            if isinstance(one, int):
+                ret.append(Choice(one, menu.texts[one]))
+            else:
+                ret.append(Choice(menu.index(one), one))
+        return ret
+
+    async def run(self, payload, menu):
+        self.spawned = time.monotonic()
+        return self._answer(menu)
+
+    async def stream(self, menu):
+        self.spawned = time.monotonic()
+        await menu.fill()
+        return self._answer(menu)
+
+
+class Ready:
+    '''
+    A menu kept prepared for showing.
+
+    The key is an async function returning something that changes when the
+    menu would.  The build is an async function of a key returning a Menu.
+    A rebuild in the background is requested with refresh().  Showing a
+    menu whose key changed since streams it while it is built.
+    '''
+
+    # Seconds to gather refresh requests before rebuilding.
+    delay = 0.05
+
+    def __init__(self, key, build, render):
+        self.key = key
+        self.build = build
+        self.render = render
+        self.built = None       # (key, menu, payload)
+        self.enabled = True     # if False, always build
+        self.builds = 0
+        self.hits = 0
+        self._task = None
+
+    async def get(self):
+        '''
+        Return (key, menu, payload), rebuilding if stale.
+        '''
+        key = await self.key()
+        if self.enabled and self.built and self.built[0] == key:
+            self.hits += 1
+            return self.built
+        return await self._build(key)
+
+    async def _build(self, key):
+        menu = await self.build(key)
+        await menu.fill()
+        self.builds += 1
+        self.built = (key, menu, self.render.prepare(menu))
+        return self.built
+
+    def refresh(self):
+        '''
+        Rebuild in the background soon, coalescing requests.
+        '''
+        if not self.enabled or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self):
+        await asyncio.sleep(self.delay)
+        try:
+            key = await self.key()
+            if not self.built or self.built[0] != key:
+                await self._build(key)
+        except Exception as err:
+            log.warning(f'menu rebuild failed: {err}')
+
+    async def show(self, empty=True):
+        '''
+        Show the menu, return (key, menu, list of Choice).
+
+        If not empty, a menu without items is not shown.
+        '''
+        key = await self.key()
+        if self.enabled and self.built and self.built[0] == key:
+            self.hits += 1
+            _, menu, payload = self.built
+            if not empty and not len(menu):
+                return key, menu, list()
+            return key, menu, await self.render.run(payload, menu)
+
+        # Stale, so show items as they are built.
+        menu = await self.build(key)
+        self.builds += 1
+        if not empty and not len(menu) and menu.source is not None:
+            source = aiter(menu.source)
+            try:
+                menu.append(await anext(source))
+            except StopAsyncIteration:
+                menu.source = None
+            else:
+                menu.source = source
+        if not empty and not len(menu):
+            return key, menu, list()
+        got = await self.render(menu)
+        if menu.source is None:
+            self.built = (key, menu, self.render.prepare(menu))
+        return key, menu, got
 
 
 async def example():
@@ -160,9 +509,9 @@ async def example():
 
     render = Rofi(multi_select=True)
 
-    for text in await render(menu):
-        ind = menu.index(text)
-        print(f'[{ind}] "{text}" ({menu.items[ind].value})')
+    for ind, text in await render(menu):
+        value = None if ind is None else menu.values[ind]
+        print(f'[{ind}] "{text}" ({value})')
 
     
 if '__main__' == __name__:
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+'''
+A content addressed cache of layout icons.
+
+An icon only shows the geometry of a layout so it is named by a hash of that
+geometry.  Layouts differing only in window IDs share one icon file.  Icons
+are found by the full path that is given to rofi.
+
+The cache lives in $XDG_RUNTIME_DIR/herbie/icons (usually a tmpfs) or else
+in $XDG_CACHE_HOME/herbie/icons.  Once an icon is known, asking for it again
+costs no parsing and no disk access.
+'''
+
+import os
+import hashlib
+from pathlib import Path
+from collections import OrderedDict
+from herbie.frames import parse
+from herbie.svg import render_icon
+import herbie.stats as stats
+
+import logging
+log = logging.getLogger("herbie")
+
+
+def cache_dir():
+    '''
+    Return default directory for cached icons.
+    '''
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if not base:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "herbie" / "icons"
+
+
+def geometry(tree):
+    '''
+    Return nested tuples of what svg.nested() draws for tree.
+    '''
+    if tree.ratio is None:
+        return ()
+    return (tree.orient, round(tree.ratio, 4),
+            tuple(geometry(child) for child in tree.children))
+
+
+def geometry_key(tree):
+    '''
+    Return a hash string of the geometry of tree.
+    '''
+    return hashlib.blake2b(repr(geometry(tree)).encode(),
+                           digest_size=10).hexdigest()
+
+
+class IconCache:
+    '''
+    Icon files by geometry with least recently used eviction.
+    '''
+
+    def __init__(self, path=None, capacity=512):
+        self.path = Path(path or cache_dir())
+        self.capacity = capacity
+        self.made = 0
+        self._keys = dict()     # sexp -> geometry key
+        self._lru = None        # geometry key -> file path, oldest first
+
+    def _scan(self):
+        # Learn what earlier runs left, oldest first.
+        self.path.mkdir(parents=True, exist_ok=True)
+        found = list()
+        for one in os.scandir(self.path):
+            if one.name.endswith(".svg"):
+                found.append((one.stat().st_mtime, one.name[:-4], one.path))
+        self._lru = OrderedDict((key, path) for _, key, path in sorted(found))
+
+    @stats.timed("icon")
+    def icon(self, sexp):
+        '''
+        Return path of icon file for layout sexp, making it if needed.
+        '''
+        if self._lru is None:
+            self._scan()
+        tree = None
+        key = self._keys.get(sexp)
+        if key is None:
+            tree = parse(sexp)
+            key = geometry_key(tree)
+            if len(self._keys) > 4 * self.capacity:
+                self._keys.clear()
+            self._keys[sexp] = key
+
+        path = self._lru.get(key)
+        if path is not None:
+            try:
+                # so the next run scans the files in the same order
+                os.utime(path)
+                self._lru.move_to_end(key)
+                return path
+            except FileNotFoundError:
+                del self._lru[key]
+
+        if tree is None:
+            tree = parse(sexp)
+        path = str(self.path / f'{key}.svg')
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as fp:
+            fp.write(render_icon(tree))
+        os.replace(tmp, path)
+        self.made += 1
+        self._lru[key] = path
+        self.evict()
+        return path
+
+    def evict(self):
+        '''
+        Remove least recently used icons beyond capacity.
+        '''
+        while len(self._lru) > self.capacity:
+            key, path = self._lru.popitem(last=False)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+_cache = None
+
+def cache():
+    '''
+    Return the shared IconCache.
+    '''
+    global _cache
+    if _cache is None:
+        _cache = IconCache()
+    return _cache
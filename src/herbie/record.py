@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+'''
+Record and replay herbie sessions.
+
+A recording is a file of JSON lines, gzip compressed if its name ends in
+".gz".  A line is either a header, starting each part of a recording, or a
+list of a kind, the seconds since the part started and what was seen:
+
+  ["hook", t, line]                     a line from herbstclient --idle
+  ["hc", t, args, status, output, dt]   a herbstclient call and its reply
+  ["menu", t, prompt, choices, dt]      a menu and the [index, text] chosen
+
+A herbie that reloads starts a new part appended to the same file.  A
+replay feeds the hooks to a Herbie at their recorded times, or as fast as
+its handlers allow, with herbstclient calls answered from the recording
+and menus with the recorded choices.  No window manager is needed.  Layouts
+saved or dropped and icons made during a replay go to copies of the layout
+store and icon cache which are thrown away after.
+'''
+
+import gzip
+import json
+import shutil
+import asyncio
+import tempfile
+from time import monotonic
+from pathlib import Path
+from contextlib import contextmanager
+from collections import defaultdict, deque
+import herbie.astluft as astluft
+import herbie.hmenu as hmenu
+import herbie.icons as icons
+import herbie.alayouts as alayouts
+from herbie.astluft import Reply, now, write_behind
+from herbie.hmenu import Scripted
+
+import logging
+log = logging.getLogger("herbie")
+
+
+def _open(path, mode):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+class Recorder:
+    '''
+    Write what a Herbie sees to a recording.
+    '''
+
+    def __init__(self, path):
+        import herbie
+        self.path = Path(path)
+        self.fp = _open(self.path, "at")
+        self.start = monotonic()
+        self.counts = defaultdict(int)
+        self._write(dict(herbie=herbie.__version__, time=now()))
+
+    def _write(self, obj):
+        self.fp.write(json.dumps(obj, separators=(',', ':')) + '\n')
+
+    def _time(self, when):
+        return round(when - self.start, 6)
+
+    def hook(self, line, received):
+        self.counts["hook"] += 1
+        line = line.decode(errors="replace").rstrip('\n')
+        self._write(["hook", self._time(received), line])
+
+    def call(self, args, reply, start, seconds):
+        self.counts["hc"] += 1
+        self._write(["hc", self._time(start), list(args),
+                     reply.status, reply.output, round(seconds, 6)])
+
+    def menu(self, render, menu, choices, start, seconds):
+        self.counts["menu"] += 1
+        self._write(["menu", self._time(start), menu.prompt,
+                     [list(choice) for choice in choices], round(seconds, 6)])
+
+    def install(self, herbie):
+        '''
+        Start recording what herbie sees.
+        '''
+        self.herbie = herbie
+        herbie.observers.append(self.hook)
+        herbie.on_reload.append(self.close)
+        astluft.observers.append(self.call)
+        hmenu.observers.append(self.menu)
+
+    def close(self):
+        '''
+        Stop recording and close the file.
+        '''
+        if self.fp.closed:
+            return
+        for observers, one in [(self.herbie.observers, self.hook),
+                               (self.herbie.on_reload, self.close),
+                               (astluft.observers, self.call),
+                               (hmenu.observers, self.menu)]:
+            if one in observers:
+                observers.remove(one)
+        self.fp.close()
+        log.info(f'recorded {dict(self.counts)} to {self.path}')
+
+
+def load(path):
+    '''
+    Return (header, list of records) of a recording.
+
+    The header is that of the first part and the times of later parts are
+    made relative to it.  A tail cut short, as when herbie was killed, is
+    left out.
+    '''
+    header = None
+    records = list()
+    offset = 0.0
+    with _open(path, "rt") as fp:
+        try:
+            for line in fp:
+                if not line.strip():
+                    continue
+                try:
+                    one = json.loads(line)
+                except json.JSONDecodeError:
+                    log.warning(f'{path} ends in a partial line')
+                    break
+                if isinstance(one, dict):
+                    if header is None:
+                        header = one
+                    else:
+                        offset = one["time"] - header["time"]
+                    continue
+                if offset:
+                    one[1] = round(one[1] + offset, 6)
+                records.append(one)
+        except (EOFError, gzip.BadGzipFile) as err:
+            log.warning(f'{path} is cut short: {err}')
+    return header or dict(), records
+
+
+class ReplayConnection:
+    '''
+    An astluft.Connection answering calls from recorded replies.
+
+    A call takes the earliest unused reply to the same arguments, else to
+    the same command, else an empty success.
+    '''
+
+    supported = True
+
+    def __init__(self, records):
+        self.by_args = defaultdict(deque)
+        self.by_command = defaultdict(deque)
+        self.used = set()
+        for ind, (_, _, args, status, output, _) in enumerate(
+                rec for rec in records if rec[0] == "hc"):
+            reply = (ind, Reply(status, output))
+            self.by_args[tuple(args)].append(reply)
+            self.by_command[args[0] if args else ""].append(reply)
+        self.calls = 0
+        self.exact = 0
+        self.missed = 0
+
+    def _take(self, replies):
+        while replies and replies[0][0] in self.used:
+            replies.popleft()
+        if not replies:
+            return None
+        ind, reply = replies.popleft()
+        self.used.add(ind)
+        return reply
+
+    async def call(self, *args):
+        self.calls += 1
+        await asyncio.sleep(0)
+        reply = self._take(self.by_args[args])
+        if reply is not None:
+            self.exact += 1
+            return reply
+        reply = self._take(self.by_command[args[0] if args else ""])
+        if reply is not None:
+            return reply
+        self.missed += 1
+        return Reply(0, '')
+
+    async def close(self):
+        pass
+
+
+def _answer(choices):
+    # Choose by text if the menu has it, the menu may have changed order.
+    def answer(menu):
+        ret = list()
+        for index, text in choices:
+            if index is None or menu.index(text) is not None:
+                ret.append(text)
+            elif index < len(menu):
+                ret.append(index)
+        return ret
+    return answer
+
+
+@contextmanager
+def _scratch(herbie):
+    '''
+    Point the layout store and icon cache of herbie at copies in a
+    temporary directory, restoring them after.
+    '''
+    store = herbie.store
+    saved = alayouts.base_path, alayouts._index, icons._cache
+    with tempfile.TemporaryDirectory(prefix="herbie-replay-") as tmp:
+        tmp = Path(tmp)
+        scratch = None
+        try:
+            if alayouts.base_path.exists():
+                shutil.copytree(alayouts.base_path, tmp / "layouts")
+            alayouts.base_path = tmp / "layouts"
+            alayouts._index = dict()
+            cache = icons.cache()
+            if cache.path.exists():
+                shutil.copytree(cache.path, tmp / "icons")
+            icons._cache = icons.IconCache(tmp / "icons", cache.capacity)
+            if store is not alayouts:       # the database store
+                scratch = store.connection(tmp / "herbie.db")
+                store.connection().backup(scratch)
+                saved_db, store._default = store._default, scratch
+            yield tmp
+        finally:
+            alayouts.base_path, alayouts._index, icons._cache = saved
+            if scratch is not None:
+                store._default = saved_db
+                scratch.close()
+
+
+async def replay(herbie, path, fast=False):
+    '''
+    Drive herbie from a recording, return dict of what happened.
+
+    Hooks are fed at their recorded times or, if fast, as soon as the
+    handlers of the one before are done.  The layout store and icon cache
+    are left as they were.
+    '''
+    header, records = load(path)
+    conn = ReplayConnection(records)
+    saved = astluft._connection, astluft.transport
+    astluft._connection = conn
+    astluft.transport = "pipe"
+    try:
+        with _scratch(herbie):
+            return await _replay(herbie, records, conn, fast)
+    finally:
+        astluft._connection, astluft.transport = saved
+
+
+async def _replay(herbie, records, conn, fast):
+    menus = Scripted([_answer(rec[3]) for rec in records if rec[0] == "menu"])
+    herbie.use_menus(lambda render: menus)
+
+    if herbie.focus_attrs:
+        try:
+            await astluft.init_my_focus_time()
+        except RuntimeError as err:
+            # a recording begun after herbie started lacks these calls
+            conn.missed += 1
+            log.warning(f'replay could not make focus times: {err}')
+    await herbie.state.load()
+
+    hooks = [rec for rec in records if rec[0] == "hook"]
+    lag = 0.0
+    start = monotonic()
+    for ind, (_, when, line) in enumerate(hooks):
+        if line == "reload":
+            continue
+        if not fast:
+            delay = when - (monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                lag = max(lag, -delay)
+        herbie.feed(line.encode() + b'\n')
+        if fast:
+            # give handlers up to the recorded gap to the next hook
+            gap = hooks[ind + 1][1] - when if ind + 1 < len(hooks) else None
+            join = asyncio.create_task(herbie.dispatcher.join())
+            await asyncio.wait([join], timeout=gap)
+            join.cancel()
+    await herbie.dispatcher.join()
+    await write_behind.flush()
+    elapsed = monotonic() - start
+
+    ret = dict(hooks=len(hooks), seconds=round(elapsed, 3),
+               recorded_seconds=hooks[-1][1] - hooks[0][1] if hooks else 0,
+               max_lag=round(lag, 3), calls=conn.calls, exact=conn.exact,
+               missed=conn.missed, menus=len(menus.shown),
+               recorded_menus=sum(rec[0] == "menu" for rec in records))
+    for lane, metrics in herbie.dispatcher.metrics().items():
+        ret[f'lane {lane}'] = (f'done={metrics["done"]} '
+                               f'failed={metrics["failed"]} '
+                               f'dropped={metrics["dropped"]} '
+                               f'lag_max={metrics["lag_max"]:.3g}')
+    await herbie.dispatcher.close()
+    return ret
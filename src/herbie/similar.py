@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+'''
+Rank stored layouts by how similar they are to a given layout.
+
+A layout is reduced to a shape of nested tuples:
+
+  ("split", orient, ratio, left, right)
+  ("clients", layout, number of windows)
+
+Two shapes are compared with a top-down tree edit distance.  Matching
+splits cost the difference in ratio plus one if their orientation differs.
+A split facing a clients frame is removed at the cost of the frames under
+one of its children.  Matching clients frames cost a little for a
+different layout algorithm or number of windows.
+
+Layouts with the same fingerprint (see frames.canonical) are at distance
+zero and so rank before any other.
+
+Shapes, canonical text and a short vector of features are kept per layout
+text so the collection is only parsed once.  When ranking for only the nearest few, the
+features select candidates and only those get the full distance.
+'''
+
+import heapq
+from herbie.frames import parse, layouts, canonical
+
+# Number of candidates to get the full distance when ranking with a limit.
+candidates = 256
+
+# Most layout texts to hold shapes and features of.
+capacity = 65536
+
+_shapes = dict()                # sexp -> (shape, features, canonical)
+
+
+def shape(tree):
+    '''
+    Return the shape of a tree of Frame.
+    '''
+    if tree.what == "split":
+        left, right = tree.children
+        return ("split", tree.orient, tree.ratio, shape(left), shape(right))
+    layout = "vertical"
+    for attr in tree.attrs:
+        key = attr.partition(":")[0]
+        if key in layouts:
+            layout = key
+            break
+    return ("clients", layout, len(tree.wids))
+
+
+def size(one):
+    '''
+    Return number of frames in a shape.
+    '''
+    if one[0] == "split":
+        return 1 + size(one[3]) + size(one[4])
+    return 1
+
+
+def features(one):
+    '''
+    Return tuple of numbers summarizing a shape.
+    '''
+    # frames, depth, vertical, horizontal, windows, max, grid, root ratio
+    feat = [0, 0, 0, 0, 0, 0, 0, one[2] if one[0] == "split" else 0.0]
+    stack = [(one, 1)]
+    while stack:
+        node, depth = stack.pop()
+        feat[0] += 1
+        feat[1] = max(feat[1], depth)
+        if node[0] == "split":
+            feat[2 if node[1] == "vertical" else 3] += 1
+            stack.append((node[3], depth + 1))
+            stack.append((node[4], depth + 1))
+            continue
+        feat[4] += node[2]
+        if node[1] == "max":
+            feat[5] += 1
+        elif node[1] == "grid":
+            feat[6] += 1
+    return tuple(feat)
+
+
+def distance(a, b):
+    '''
+    Return the edit distance between two shapes.
+    '''
+    if a[0] == "split":
+        if b[0] == "split":
+            return (abs(a[2] - b[2]) + (a[1] != b[1])
+                    + distance(a[3], b[3]) + distance(a[4], b[4]))
+        return 1 + min(distance(a[3], b) + size(a[4]),
+                       distance(a[4], b) + size(a[3]))
+    if b[0] == "split":
+        return distance(b, a)
+    return 0.5 * (a[1] != b[1]) + 0.1 * min(abs(a[2] - b[2]), 5)
+
+
+def _feature_distance(a, b):
+    return sum(abs(x - y) for x, y in zip(a, b))
+
+
+def indexed(sexp):
+    '''
+    Return (shape, features, canonical) of layout text, computing them once.
+    '''
+    got = _shapes.get(sexp)
+    if got is None:
+        tree = parse(sexp)
+        one = shape(tree)
+        got = (one, features(one), canonical(tree))
+        if len(_shapes) >= capacity:
+            _shapes.clear()
+        _shapes[sexp] = got
+    return got
+
+
+def rank(sexp, collection, limit=None):
+    '''
+    Return list of (distance, tag, Layout) nearest first.
+
+    The sexp is the layout to compare against and collection is a dict
+    mapping a tag to its list of Layout.  Layouts that fail to parse are
+    left out.  With limit, return at most that many, chosen from the
+    candidates with the nearest features and any with the same fingerprint.
+    '''
+    mine, myfeat, mytext = indexed(sexp)
+    entries = list()
+    for tag, lays in collection.items():
+        for lay in lays:
+            try:
+                one, feat, text = indexed(lay.sexp)
+            except ValueError:
+                continue
+            if text == mytext:
+                one = None
+                feat = 0
+            else:
+                feat = _feature_distance(myfeat, feat)
+            entries.append((feat, tag, lay, one))
+
+    if limit:
+        keep = max(candidates, limit)
+        if len(entries) > keep:
+            entries = heapq.nsmallest(keep, entries, key=lambda e: e[0])
+    ranked = [(0 if one is None else distance(mine, one), tag, lay)
+              for _, tag, lay, one in entries]
+    ranked.sort(key=lambda r: (r[0], r[1], r[2].name))
+    if limit:
+        ranked = ranked[:limit]
+    return ranked
@@ -0,0 +1,387 @@
+#!/usr/bin/env python
+'''
+A live mirror of herbstluftwm state.
+
+The mirror starts from one astluft.snapshot() and then follows hook events
+from herbie.events so that readers need no round trip to herbstluftwm.
+Hooks do not tell everything (eg, a window closing) so watched attributes
+trigger a resync and a periodic check compares the mirror against a fresh
+snapshot and resyncs on any drift.
+
+Clients are also indexed by the attributes that [window] config sections
+match on so that running windows are found without a scan.
+'''
+
+import asyncio
+from herbie.history import FocusHistory
+from herbie.astluft import (
+    Snapshot, Client, Tag, hc_batch, now, snapshot)
+
+import logging
+log = logging.getLogger("herbie")
+
+
+def winid(num):
+    '''
+    Return herbstluftwm window ID string from integer.
+    '''
+    return hex(num)
+
+
+class ClientIndex:
+    '''
+    Window IDs by the value of each matched attribute.
+    '''
+
+    # Rule condition name to Client attribute.
+    keys = {"class": "klass", "instance": "instance", "title": "title"}
+
+    def __init__(self, clients=()):
+        self.by = {key: dict() for key in self.keys}  # key -> value -> {wid}
+        self._values = dict()                          # wid -> values
+        for cli in clients:
+            self.update(cli)
+
+    def update(self, cli):
+        '''
+        Add a Client or refresh its values.
+        '''
+        self.remove(cli.winid)
+        values = tuple(getattr(cli, attr) for attr in self.keys.values())
+        self._values[cli.winid] = values
+        for key, value in zip(self.keys, values):
+            self.by[key].setdefault(value, dict())[cli.winid] = None
+
+    def remove(self, wid):
+        '''
+        Forget a window ID.
+        '''
+        values = self._values.pop(wid, None)
+        if values is None:
+            return
+        for key, value in zip(self.keys, values):
+            wids = self.by[key][value]
+            del wids[wid]
+            if not wids:
+                del self.by[key][value]
+
+    def find(self, match):
+        '''
+        Return list of window IDs with all values of match, a dict.
+
+        A condition on anything not indexed matches nothing.
+        '''
+        found = None
+        for key, value in match.items():
+            if key not in self.by:
+                return []
+            wids = self.by[key].get(value, ())
+            if found is not None:
+                wids = {wid: None for wid in found if wid in wids}
+            found = wids
+            if not found:
+                return []
+        return list(found or ())
+
+
+class Mirror:
+    '''
+    Hold a Snapshot and keep it current from hook events.
+    '''
+
+    # Hooks that the mirror follows.
+    follows = ("focus_changed", "tag_changed", "tag_added", "tag_removed",
+               "tag_renamed", "window_title_changed", "attribute_changed")
+
+    # Attributes to watch.  A change to any of these schedules a resync.
+    # The client count of each tag by name is watched too, it changes as
+    # windows open, close or move but not as tags are shown.  A new tag
+    # changes tags.count and the resync watches it, a renamed one is
+    # watched from the next periodic check.
+    watches = ("tags.count",)
+
+    # Seconds to wait after a change before a scheduled resync.
+    resync_delay = 0.2
+
+    def __init__(self):
+        self.snap = Snapshot()
+        self.history = FocusHistory()
+        self.loaded = False
+        # Counts changes, for readers that keep things derived from state.
+        self.version = 0
+        # Counts changes to tags or to which clients are on them, those
+        # that may change tag layouts, but not focus or title changes.
+        self.placement = 0
+        # Functions called with no arguments after each change.
+        self.listeners = list()
+        self._resync = None
+        self._buffer = None     # events arriving during a resync
+        self._matches = None    # (snap, ClientIndex) of that snap
+        self._watched = set()   # attributes we asked herbstluftwm to watch
+
+    @property
+    def focused_tag(self):
+        return self.snap.focused_tag
+
+    @property
+    def focused_wid(self):
+        return self.snap.focused_wid
+
+    def window_ids(self, tag=None):
+        '''
+        Return list of tuples (wid,tag), only those on tag if given.
+        '''
+        return [(c.winid, c.tag) for c in self.snap.windows(tag)]
+
+    def tag_times(self):
+        '''
+        Return list of tuples (tag,time) oldest focus first.
+        '''
+        return self.snap.tag_times()
+
+    @property
+    def matches(self):
+        '''
+        The ClientIndex of the current snapshot.
+        '''
+        if self._matches is None or self._matches[0] is not self.snap:
+            self._matches = (self.snap,
+                             ClientIndex(self.snap.clients.values()))
+        return self._matches[1]
+
+    def find_clients(self, match):
+        '''
+        Return list of window IDs of clients with all values of match.
+        '''
+        return self.matches.find(match)
+
+    def _indexed(self, cli):
+        if self._matches is not None and self._matches[0] is self.snap:
+            self._matches[1].update(cli)
+
+    def tag_status(self):
+        '''
+        Return dict mapping tag name to status character like tag_status.
+
+        Only "#" (focused), ":" (has clients) and "." (empty) are given.
+        '''
+        used = {c.tag for c in self.snap.clients.values()}
+        ret = dict()
+        for name in self.snap.tags:
+            if name == self.snap.focused_tag:
+                ret[name] = "#"
+            elif name in used:
+                ret[name] = ":"
+            else:
+                ret[name] = "."
+        return ret
+
+    async def load(self):
+        '''
+        Load state from herbstluftwm and start watching attributes.
+        '''
+        self.snap = await snapshot()
+        self.history = FocusHistory()
+        self.history.seed(self.snap.clients.values())
+        self.loaded = True
+        self.placement += 1
+        self.changed()
+        await self.watch_tags()
+        log.debug(f'mirror loaded {len(self.snap.clients)} clients '
+                  f'on {len(self.snap.tags)} tags')
+
+    async def watch_tags(self):
+        '''
+        Watch the attributes and the client count of tags not yet watched.
+        '''
+        want = [*self.watches, *(f'tags.by-name.{name}.client_count'
+                                 for name in self.snap.tags)]
+        want = [attr for attr in want if attr not in self._watched]
+        if not want:
+            return
+        async with hc_batch() as b:
+            for attr in want:
+                b.add('watch', attr)
+        self._watched.update(want)
+
+    def apply(self, event, time=None):
+        '''
+        Update state from one herbie.events object.
+        '''
+        if time is None:
+            time = now()
+        if self._buffer is not None:
+            self._buffer.append((event, time))
+        meth = getattr(self, f'_on_{type(event).__name__}', None)
+        if meth:
+            meth(event, time)
+            self.changed()
+
+    def changed(self):
+        '''
+        Note a change and tell the listeners.
+        '''
+        self.version += 1
+        for listener in self.listeners:
+            listener()
+
+    def _on_focus_changed(self, event, time):
+        if not event.winid:
+            self.snap.focused_wid = None
+            return
+        wid = winid(event.winid)
+        self.snap.focused_wid = wid
+        cli = self.snap.clients.get(wid)
+        if cli is None:         # a new window, get the rest later
+            cli = Client(wid, tag=self.snap.focused_tag)
+            self.snap.clients[wid] = cli
+            self.placement += 1
+            self.schedule_resync()
+        cli.title = event.title
+        cli.focus_time = time
+        self._indexed(cli)
+        self.history.touch(wid, cli.tag, time)
+
+    def _on_window_title_changed(self, event, time):
+        cli = self.snap.clients.get(winid(event.winid))
+        if cli:
+            cli.title = event.title
+            self._indexed(cli)
+
+    def _on_tag_changed(self, event, time):
+        self.placement += 1
+        self.snap.focused_tag = event.tag
+        tag = self.snap.tags.get(event.tag)
+        if tag:
+            tag.focus_time = time
+        for mon in self.snap.monitors:
+            if mon.index == event.monitor:
+                mon.tag = event.tag
+
+    def _on_tag_added(self, event, time):
+        self.placement += 1
+        if event.tag not in self.snap.tags:
+            self.snap.tags[event.tag] = Tag(event.tag, len(self.snap.tags),
+                                            focus_time=time)
+
+    def _on_tag_removed(self, event, time):
+        self.placement += 1
+        self.snap.tags.pop(event.tag, None)
+        for ind, tag in enumerate(self.snap.tags.values()):
+            tag.index = ind
+        # merge_tag moves the clients to the now current tag
+        self.history.rename_tag(event.tag, event.now)
+        for cli in self.snap.clients.values():
+            if cli.tag == event.tag:
+                cli.tag = event.now
+        if self.snap.focused_tag == event.tag:
+            self.snap.focused_tag = event.now
+
+    def _on_tag_renamed(self, event, time):
+        self.placement += 1
+        self.snap.tags = {(event.new if name == event.old else name): tag
+                          for name, tag in self.snap.tags.items()}
+        tag = self.snap.tags.get(event.new)
+        if tag:
+            tag.name = event.new
+        self.history.rename_tag(event.old, event.new)
+        for cli in self.snap.clients.values():
+            if cli.tag == event.old:
+                cli.tag = event.new
+        if self.snap.focused_tag == event.old:
+            self.snap.focused_tag = event.new
+
+    def _on_attribute_changed(self, event, time):
+        if event.path in self._watched:
+            self.schedule_resync()
+            return
+        kind, _, rest = event.path.partition('.')
+        name, _, key = rest.rpartition('.')
+        if kind == "clients" and name in self.snap.clients:
+            self.snap.clients[name].attrs[key] = event.newvalue
+        elif kind == "tags" and name.startswith("by-name."):
+            tag = self.snap.tags.get(name[len("by-name."):])
+            if tag:
+                tag.attrs[key] = event.newvalue
+
+    def drift(self, other):
+        '''
+        Return list of differences between mirror and other Snapshot.
+        '''
+        mine = self.snap
+        diffs = list()
+        if mine.focused_tag != other.focused_tag:
+            diffs.append(f'focused tag {mine.focused_tag} != {other.focused_tag}')
+        if list(mine.tags) != list(other.tags):
+            diffs.append(f'tags {list(mine.tags)} != {list(other.tags)}')
+        for wid in set(mine.clients).symmetric_difference(other.clients):
+            diffs.append(f'client {wid} only in '
+                         + ('mirror' if wid in mine.clients else 'herbstluftwm'))
+        for wid in set(mine.clients).intersection(other.clients):
+            a, b = mine.clients[wid], other.clients[wid]
+            if (a.tag, a.title) != (b.tag, b.title):
+                diffs.append(f'client {wid} {(a.tag, a.title)} != {(b.tag, b.title)}')
+        return diffs
+
+    async def resync(self):
+        '''
+        Replace state with a fresh snapshot, return list of differences.
+
+        Events applied while the snapshot is in flight are applied again
+        on top of it.
+        '''
+        self._buffer = list()
+        try:
+            fresh = await snapshot()
+        finally:
+            buffered, self._buffer = self._buffer, None
+        diffs = self.drift(fresh)
+        # keep our notion of focus times, herbstluftwm may lag behind
+        for wid, cli in fresh.clients.items():
+            old = self.snap.clients.get(wid)
+            if old:
+                cli.focus_time = max(cli.focus_time, old.focus_time)
+        for name, tag in fresh.tags.items():
+            old = self.snap.tags.get(name)
+            if old:
+                tag.focus_time = max(tag.focus_time, old.focus_time)
+        self.snap = fresh
+        self.placement += 1
+        self.history.sync(fresh.clients)
+        for event, time in buffered:
+            self.apply(event, time)
+        self.changed()
+        await self.watch_tags()
+        return diffs
+
+    def schedule_resync(self):
+        '''
+        Resync in the background after resync_delay, coalescing requests.
+        '''
+        if self._resync and not self._resync.done():
+            return
+        self._resync = asyncio.create_task(self._delayed_resync())
+
+    async def _delayed_resync(self):
+        await asyncio.sleep(self.resync_delay)
+        await self.resync()
+
+    async def check(self):
+        '''
+        Compare against herbstluftwm, resync and log if drifted.
+        '''
+        diffs = await self.resync()
+        for diff in diffs:
+            log.info(f'mirror drift: {diff}')
+        return diffs
+
+    async def watch(self, interval=60):
+        '''
+        Run check() every interval seconds, forever.
+        '''
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check()
+            except Exception as err:
+                log.warning(f'mirror check failed: {err}')
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+'''
+Latency histograms and counters of where herbie spends its time.
+
+Each measure is keyed by what was measured (eg "hook", "hc", "menu",
+"store.read", "parse") and by the handler it happened under.  The handler
+is taken from a context variable that the dispatcher sets for each hook it
+runs, so tasks a handler starts count for it too.  Histograms have fixed
+buckets so an observation costs a bisect and a few additions.
+
+The measures are kept in this module.  They may be saved as JSON, read
+back, shown as text or written as a Prometheus textfile.
+'''
+
+import os
+import json
+import bisect
+import asyncio
+import functools
+import contextvars
+from pathlib import Path
+from time import monotonic
+
+# Name of the handler being run, "" outside of any.
+handler = contextvars.ContextVar("handler", default="")
+
+# Upper bounds of histogram buckets in seconds, one more for above all.
+bounds = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+          0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+# Set False to collect nothing.
+enabled = True
+
+
+class Histogram:
+    '''
+    Counts of seconds in buckets.
+    '''
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self, counts=None, total=0.0, most=0.0):
+        self.counts = list(counts or [0] * (len(bounds) + 1))
+        self.count = sum(self.counts)
+        self.sum = total
+        self.max = most
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        '''
+        Return upper bound of the bucket holding quantile q.
+        '''
+        want = q * self.count
+        seen = 0
+        for bound, num in zip(bounds, self.counts):
+            seen += num
+            if seen >= want and num:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        '''
+        Return dict of count, mean, quantiles and max.
+        '''
+        return dict(count=self.count,
+                    mean=self.sum / self.count if self.count else 0.0,
+                    p50=self.quantile(0.5), p90=self.quantile(0.9),
+                    p99=self.quantile(0.99), max=self.max)
+
+
+histograms = dict()             # (what, handler) -> Histogram
+counters = dict()               # (what, handler) -> int
+
+# Functions called with (what, start, seconds, args) after each span, the
+# start being its time.monotonic() and args a dict or None.
+spans = list()
+
+
+def observe(what, seconds, who=None):
+    '''
+    Add seconds to the histogram of what under the current handler.
+    '''
+    if not enabled:
+        return
+    key = (what, handler.get() if who is None else who)
+    hist = histograms.get(key)
+    if hist is None:
+        hist = histograms[key] = Histogram()
+    hist.observe(seconds)
+
+
+def count(what, num=1, who=None):
+    '''
+    Add num to the counter of what under the current handler.
+    '''
+    if not enabled:
+        return
+    key = (what, handler.get() if who is None else who)
+    counters[key] = counters.get(key, 0) + num
+
+
+def span(what, start, seconds, args=None):
+    '''
+    Observe seconds of what begun at start and tell the span observers.
+    '''
+    observe(what, seconds)
+    for one in spans:
+        one(what, start, seconds, args)
+
+
+def timed(what):
+    '''
+    Decorate a function or coroutine function to observe its duration.
+    '''
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwds):
+                start = monotonic()
+                try:
+                    return await func(*args, **kwds)
+                finally:
+                    span(what, start, monotonic() - start)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwds):
+                start = monotonic()
+                try:
+                    return func(*args, **kwds)
+                finally:
+                    span(what, start, monotonic() - start)
+        return wrapper
+    return decorate
+
+
+def on_call(args, reply, start, seconds):
+    '''
+    An astluft observer of herbstclient calls.
+    '''
+    observe("hc", seconds)
+    if reply.status:
+        count("hc.failed")
+
+
+def on_menu(render, menu, choices, start, seconds):
+    '''
+    An hmenu observer of menus shown.
+    '''
+    observe("menu", seconds)
+    if render.spawned is not None and render.spawned >= start:
+        observe("menu.start", render.spawned - start)
+
+
+def reset():
+    histograms.clear()
+    counters.clear()
+
+
+def dump():
+    '''
+    Return the measures as a JSON-able dict.
+    '''
+    return dict(
+        bounds=bounds,
+        histograms=[dict(what=what, handler=who, counts=hist.counts,
+                         sum=hist.sum, max=hist.max)
+                    for (what, who), hist in sorted(histograms.items())],
+        counters=[dict(what=what, handler=who, value=value)
+                  for (what, who), value in sorted(counters.items())])
+
+
+def undump(data):
+    '''
+    Return (histograms, counters) from what dump() gave.
+    '''
+    hists = {(one["what"], one["handler"]):
+             Histogram(one["counts"], one["sum"], one["max"])
+             for one in data.get("histograms", ())}
+    counts = {(one["what"], one["handler"]): one["value"]
+              for one in data.get("counters", ())}
+    return hists, counts
+
+
+def lines(hists=None, counts=None):
+    '''
+    Return list of lines of text summarizing the measures.
+    '''
+    hists = histograms if hists is None else hists
+    counts = counters if counts is None else counts
+    ret = list()
+    for (what, who), hist in sorted(hists.items()):
+        one = hist.summary()
+        ret.append(f'{what} {who or "-"}: n={one["count"]} '
+                   + ' '.join(f'{key}={1e3 * one[key]:.3g}ms'
+                              for key in ("mean", "p50", "p90", "p99", "max")))
+    for (what, who), value in sorted(counts.items()):
+        ret.append(f'{what} {who or "-"}: {value}')
+    return ret
+
+
+def prometheus(hists=None, counts=None):
+    '''
+    Return the measures in the Prometheus text format.
+    '''
+    hists = histograms if hists is None else hists
+    counts = counters if counts is None else counts
+    out = ['# HELP herbie_seconds Time spent by herbie.',
+           '# TYPE herbie_seconds histogram']
+    for (what, who), hist in sorted(hists.items()):
+        labels = f'what="{what}",handler="{who}"'
+        seen = 0
+        for bound, num in zip(bounds, hist.counts):
+            seen += num
+            out.append(f'herbie_seconds_bucket{{{labels},le="{bound}"}} {seen}')
+        out.append(f'herbie_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+        out.append(f'herbie_seconds_sum{{{labels}}} {hist.sum:.6f}')
+        out.append(f'herbie_seconds_count{{{labels}}} {hist.count}')
+    out += ['# HELP herbie_events_total Things counted by herbie.',
+            '# TYPE herbie_events_total counter']
+    for (what, who), value in sorted(counts.items()):
+        out.append(f'herbie_events_total{{what="{what}",handler="{who}"}} '
+                   f'{value}')
+    return '\n'.join(out) + '\n'
+
+
+def default_path():
+    '''
+    Return where the running herbie saves its measures.
+    '''
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if not base:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "herbie" / "stats.json"
+
+
+def write(path, text):
+    '''
+    Replace file at path with text at once.
+    '''
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def save(path=None):
+    '''
+    Save the measures as JSON, to default_path() if no path.
+    '''
+    write(path or default_path(), json.dumps(dump()))
@@ -6,7 +6,7 @@ import shlex
 import subprocess
 from collections import namedtuple
 
-from herbie.util import make_tree
+import herbie.frames as frames
 
 TagInfo = namedtuple("TagInfo","name index status")
 
@@ -216,10 +216,7 @@ class WM:
             dump = self(f'dump {tag}')
         else:
             dump = self('substitute T tags.focus.name dump T')
-        tree = make_tree(dump)
-        nodes = [tree] + list(tree.descendants)
-        wids = [x.wids for x in nodes if hasattr(x, 'wids')]
-        return [w for ww in wids for w in ww]
+        return frames.wids(frames.parse(dump))
     
     def events(self, *wants):
         '''
@@ -66,17 +66,24 @@ def nested(tree, x, y, w, h, strokewidth=1):
     return lines
         
 
-def make_icon(name, tree, width = 100, height = 100, fill='#66FF66'):
+def render_icon(tree, width = 100, height = 100, fill='#66FF66'):
     '''
-    Generate icon representing tree, return filename.
-
-    File is named so that "name" can be used to name the icon to rofi.
+    Return SVG text of icon representing tree.
     '''
     lines = [ header(width, height) ]
     lines += [ rectangle(width, height, fill=fill) ]
     lines += nested(tree, 0, 0, width, height, 10)
     lines += [ trailer() ]
-    text = '\n'.join(lines)
+    return '\n'.join(lines)
+
+
+def make_icon(name, tree, width = 100, height = 100, fill='#66FF66'):
+    '''
+    Generate icon representing tree, return filename.
+
+    File is named so that "name" can be used to name the icon to rofi.
+    '''
+    text = render_icon(tree, width, height, fill)
 
     # fixme: use xdg standards
     base = os.environ['HOME']
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+'''
+Write a timeline of what herbie does as Chrome trace events.
+
+The file may be opened in chrome://tracing or https://ui.perfetto.dev.  It
+holds a span for each hook handled, each herbstclient call, each menu shown
+and each timed function (see stats.timed) such as layout store reads and
+writes, parsing and icon making.  Spans are put on one track per asyncio
+task so calls made one after the other show up as a staircase on one track
+and calls made together as spans on tracks side by side.
+
+Events are written as they happen as a JSON array which is closed when
+tracing stops.  A trace cut short still loads.  A trace already at the path,
+as from before herbie reloaded, is kept by renaming it with a number.
+'''
+
+import os
+import json
+import asyncio
+import itertools
+from time import monotonic
+from pathlib import Path
+import herbie.astluft as astluft
+import herbie.hmenu as hmenu
+import herbie.stats as stats
+
+import logging
+log = logging.getLogger("herbie")
+
+
+def rotate(path):
+    '''
+    Move a file at path out of the way to the first free numbered name.
+    '''
+    if not path.exists():
+        return None
+    for num in itertools.count(1):
+        old = path.with_name(f'{path.stem}.{num}{path.suffix}')
+        if not old.exists():
+            path.rename(old)
+            return old
+
+
+class Tracer:
+    '''
+    Write spans of what a Herbie does to a trace file.
+    '''
+
+    def __init__(self, path):
+        self.path = Path(path)
+        old = rotate(self.path)
+        if old:
+            log.info(f'moved earlier trace to {old}')
+        # Line buffered so what is traced is on disk should herbie die.
+        self.fp = open(self.path, "w", buffering=1)
+        self.start = monotonic()
+        self.pid = os.getpid()
+        self.tracks = dict()    # running asyncio task -> track id
+        self._tids = itertools.count(1)
+        self.count = 0
+        self.herbie = None
+        self.fp.write('[\n')
+        self._write(dict(ph="M", pid=self.pid, tid=0, name="process_name",
+                         args=dict(name="herbie")))
+        self._write(dict(ph="M", pid=self.pid, tid=0, name="thread_name",
+                         args=dict(name="main")))
+
+    def _write(self, event):
+        self.fp.write(json.dumps(event, separators=(',', ':')) + ',\n')
+
+    def _track(self):
+        # Track of the current task, naming it when first seen.
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            return 0
+        tid = self.tracks.get(task)
+        if tid is None:
+            tid = self.tracks[task] = next(self._tids)
+            coro = task.get_coro()
+            name = getattr(coro, "__qualname__", "task")
+            who = stats.handler.get()
+            name = f'{who or "-"} {name} {task.get_name()}'
+            self._write(dict(ph="M", pid=self.pid, tid=tid,
+                             name="thread_name", args=dict(name=name)))
+            task.add_done_callback(self.tracks.pop)
+        return tid
+
+    def span(self, name, cat, start, seconds, args=None):
+        '''
+        Write a span that began at time.monotonic() start.
+        '''
+        self.count += 1
+        event = dict(ph="X", pid=self.pid, tid=self._track(), name=name,
+                     cat=cat, ts=round(1e6 * (start - self.start), 1),
+                     dur=round(1e6 * seconds, 1))
+        if args:
+            event["args"] = args
+        self._write(event)
+
+    def timed(self, what, start, seconds, args):
+        who = stats.handler.get()
+        if what == "hook":
+            self.span(who, "hook", start, seconds, args)
+            return
+        args = dict(args or (), handler=who)
+        self.span(what, what.split('.')[0], start, seconds, args)
+
+    def call(self, args, reply, start, seconds):
+        self.span(f'hc {args[0] if args else ""}', "hc", start, seconds,
+                  dict(args=' '.join(args)[:200], status=reply.status,
+                       handler=stats.handler.get()))
+
+    def menu(self, render, menu, choices, start, seconds):
+        args = dict(prompt=menu.prompt, items=len(menu), chosen=len(choices),
+                    handler=stats.handler.get())
+        if render.spawned is not None and render.spawned >= start:
+            args["start_ms"] = round(1e3 * (render.spawned - start), 3)
+        self.span(f'menu {type(render).__name__}', "menu", start, seconds,
+                  args)
+
+    def install(self, herbie=None):
+        '''
+        Start tracing.
+        '''
+        self.herbie = herbie
+        if herbie is not None:
+            herbie.on_reload.append(self.close)
+        stats.spans.append(self.timed)
+        astluft.observers.append(self.call)
+        hmenu.observers.append(self.menu)
+
+    def close(self):
+        '''
+        Stop tracing and close the file.
+        '''
+        if self.fp.closed:
+            return
+        if self.herbie is not None and self.close in self.herbie.on_reload:
+            self.herbie.on_reload.remove(self.close)
+        for observers, one in [(stats.spans, self.timed),
+                               (astluft.observers, self.call),
+                               (hmenu.observers, self.menu)]:
+            if one in observers:
+                observers.remove(one)
+        # Trailing metadata so the array need not end in a comma.
+        self.fp.write(json.dumps(dict(ph="M", pid=self.pid, tid=0,
+                                      name="process_labels",
+                                      args=dict(labels=f'{self.count} spans')),
+                                 separators=(',', ':')) + '\n]\n')
+        self.fp.close()
+        log.info(f'traced {self.count} spans to {self.path}')
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+'''
+Micro-benchmark of hook parse and dispatch.
+
+  $ python test/bench_events.py -n 200000
+
+Compares the compiled herbie.events.Table with the older path of decoding
+and splitting every line, looking up a handler by name and parsing.
+'''
+import time
+import random
+import argparse
+from herbie.events import Table, parse
+
+lines = [
+    b'focus_changed\t0x140000b\therbstclient -i ~/d/herbie\n',
+    b'window_title_changed\t0x140000b\t~/d/herbie\n',
+    b'tag_changed\tohai\t0\n',
+    b'tag_flags\n',
+    b'urgent\ton\t0x140000b\n',
+    b'window_jump_any\n',
+    b'some_other_tool\tfoo\tbar\n',
+]
+
+
+class Handlers:
+    async def focus_changed(self, event):
+        pass
+    async def tag_changed(self, event):
+        pass
+    async def window_jump_any(self, event):
+        pass
+
+
+def legacy(stream, obj):
+    count = 0
+    for line in stream:
+        line = line.decode().strip()
+        parts = line.split("\t")
+        meth = getattr(obj, parts[0], None)
+        if not meth:
+            continue
+        event = parse(line)
+        count += 1
+    return count
+
+
+def compiled(stream, table):
+    count = 0
+    for line in stream:
+        got = table.lookup(line)
+        if got is None:
+            continue
+        event, handler = got
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    stream = [random.choice(lines) for _ in range(args.number)]
+    obj = Handlers()
+    table = Table({name: getattr(obj, name)
+                   for name in ("focus_changed", "tag_changed", "window_jump_any")})
+
+    for name, func, arg in [("legacy", legacy, obj),
+                            ("compiled", compiled, table)]:
+        t0 = time.perf_counter()
+        count = func(stream, arg)
+        dt = time.perf_counter() - t0
+        print(f'{name:8} {args.number} lines, {count} dispatched: '
+              f'{args.number/dt/1e3:.0f} klines/s, {1e9*dt/args.number:.0f} ns/line')
+
+
+if '__main__' == __name__:
+    main()
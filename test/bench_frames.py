@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+'''
+Benchmark of parsing and rendering "hc dump" layouts.
+
+  $ python test/bench_frames.py -d 10 -n 200
+
+Compares herbie.frames with herbie.util.make_tree() and render_split()
+which go through sexpdata and anytree.
+'''
+import time
+import random
+import argparse
+import herbie.frames as frames
+from herbie.util import make_tree, render_split
+
+
+def dump(depth, rng):
+    '''
+    Return a random dump with frames nested up to depth.
+    '''
+    if depth == 0:
+        wids = ' '.join(hex(rng.randrange(1 << 24)) for _ in range(rng.randrange(4)))
+        return f'(clients {rng.choice(["vertical", "max", "grid"])}:0 {wids})'
+    orient = rng.choice(["vertical", "horizontal"])
+    return (f'(split {orient}:{rng.random():.6f}:{rng.randrange(2)} '
+            f'{dump(depth - 1, rng)} {dump(depth - 1, rng)})')
+
+
+def timeit(func, items):
+    t0 = time.perf_counter()
+    for item in items:
+        func(item)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=200,
+                        help="number of layouts")
+    parser.add_argument("-d", "--depth", type=int, default=8,
+                        help="depth of splits, 2**depth leaf frames")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    dumps = [dump(args.depth, rng) for _ in range(args.number)]
+    size = sum(map(len, dumps)) / len(dumps)
+    print(f'{args.number} layouts of {2**args.depth} frames, {size:.0f} bytes each')
+
+    old = [make_tree(d) for d in dumps]
+    new = [frames.parse(d) for d in dumps]
+    for what, func, items in [
+            ("parse  sexpdata", make_tree, dumps),
+            ("parse  frames", frames.parse, dumps),
+            ("render anytree", render_split, old),
+            ("render frames", frames.render, new),
+            ("wids   anytree", lambda t: [w for n in [t] + list(t.descendants)
+                                          for w in getattr(n, "wids", ())], old),
+            ("wids   frames", frames.wids, new)]:
+        dt = timeit(func, items)
+        print(f'{what:16} {1e6*dt/args.number:10.1f} us/layout')
+
+
+if '__main__' == __name__:
+    main()
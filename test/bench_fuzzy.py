@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+'''
+Benchmark of fuzzy matching menu texts in-process.
+
+  $ python test/bench_fuzzy.py -n 20000 -l 50
+
+Times making a Matcher and ranking random window titles for a few queries,
+in full and for the best few, and selecting a new Menu from the best.
+'''
+import time
+import random
+import argparse
+import herbie.fuzzy as fuzzy
+from herbie.hmenu import Menu
+
+words = ["firefox", "xterm", "emacs", "herbie", "mail", "rofi", "python",
+         "README.org", "~/dev", "htop", "Mozilla", "inbox", "make", "git"]
+
+
+def title(rng):
+    '''
+    Return a random window title like those given to window menus.
+    '''
+    return (f'{rng.randrange(10)} {rng.choice(["term", "web", "edit"])} '
+            + ' '.join(rng.choice(words) for _ in range(rng.randrange(2, 6))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=20000,
+                        help="number of menu items")
+    parser.add_argument("-l", "--limit", type=int, default=50,
+                        help="number of best for a limited ranking")
+    parser.add_argument("queries", nargs="*",
+                        default=["f", "fox", "emacsreadme", "zq"],
+                        help="queries to rank for")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    menu = Menu()
+    for ind in range(args.number):
+        menu.add(title(rng), value=ind)
+
+    t0 = time.perf_counter()
+    matcher = fuzzy.Matcher(menu.texts)
+    dt = time.perf_counter() - t0
+    print(f'{"matcher":22} {len(menu):6} items: {1e3*dt:8.1f} ms')
+
+    for query in args.queries:
+        for limit in (None, args.limit):
+            t0 = time.perf_counter()
+            got = matcher.rank(query, limit)
+            dt = time.perf_counter() - t0
+            what = f'rank {query!r}' + (f' best {limit}' if limit else '')
+            print(f'{what:22} {len(menu):6} -> {len(got):6}: {1e3*dt:8.1f} ms '
+                  f'{len(menu)/dt/1e6:6.2f} M items/s')
+        t0 = time.perf_counter()
+        got = fuzzy.select(menu, query, args.limit)
+        dt = time.perf_counter() - t0
+        what = f'select {query!r}'
+        print(f'{what:22} {len(menu):6} -> {len(got):6}: {1e3*dt:8.1f} ms')
+
+
+if '__main__' == __name__:
+    main()
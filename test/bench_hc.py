@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+'''
+Compare herbstclient transports against the fakehc stand-in.
+
+  $ python test/bench_hc.py -n 500 --connect 0.002
+
+The --connect time emulates the cost of a herbstclient connecting to the X
+server which the "exec" transport pays on every call.
+'''
+import os
+import time
+import asyncio
+import argparse
+from pathlib import Path
+import herbie.astluft as astluft
+
+
+async def sequential(n):
+    for ind in range(n):
+        await astluft.hc('echo', str(ind))
+
+
+async def concurrent(n):
+    await asyncio.gather(*[astluft.hc('echo', str(ind)) for ind in range(n)])
+
+
+async def bench(transport, how, n):
+    astluft.transport = transport
+    astluft._connection = None
+    if transport == "pipe":     # do not count process startup
+        await astluft.connection().start()
+    t0 = time.perf_counter()
+    await how(n)
+    dt = time.perf_counter() - t0
+    if astluft._connection:
+        await astluft._connection.close()
+    return dt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=200)
+    parser.add_argument("--connect", default="0",
+                        help="seconds each fakehc sleeps at startup")
+    args = parser.parse_args()
+
+    astluft.herbstclient = str(Path(__file__).parent / "fakehc")
+    os.environ["FAKEHC_CONNECT"] = args.connect
+
+    for how in (sequential, concurrent):
+        for transport in ("exec", "pipe"):
+            dt = asyncio.run(bench(transport, how, args.number))
+            print(f'{how.__name__:10} {transport:4} {args.number} calls: '
+                  f'{dt:.3f} s, {1e3*dt/args.number:.3f} ms/call')
+
+
+if '__main__' == __name__:
+    main()
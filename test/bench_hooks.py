@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+'''
+Benchmark of every hook handler against a fake herbstluftwm.
+
+  $ python test/bench_hooks.py -c 200 -t 10 -L 0.0005 -n 10
+  $ python test/bench_hooks.py --save hooks.jsonl
+  $ python test/bench_hooks.py --compare hooks.jsonl
+
+Each case feeds one hook line to a Herbie whose herbstclient calls go to
+fakewm.FakeConnection and whose menus are hmenu.Scripted.  The time is from
+feeding the line to its handler finishing.  Calls are round trips to the
+fake herbstluftwm and commands are what they held, counting deferred
+attribute writes.  Each run starts from a fresh fake with the given number
+of tags and clients.
+
+With --save the results are appended as one JSON line tagged with the
+current commit.  With --compare they are shown against the last saved
+results of another commit.
+'''
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+import herbie.astluft as astluft
+import herbie.alayouts as alayouts
+from herbie.astluft import write_behind
+from herbie.hmenu import Scripted
+from herbie.aherbie import Herbie
+from fakewm import FakeWM, FakeConnection
+
+here = Path(__file__).parent
+
+config = '''
+[herbie]
+task_timeout = 1
+[tasks]
+dev = (split horizontal:0.5:0 (split vertical:0.5:0 (clients max:0 window:term) (clients max:0 window:edit)) (clients max:0 window:web))
+[window term]
+class = Xterm
+command = xterm
+[window edit]
+class = Emacs
+command = emacs
+[window web]
+class = Firefox
+command = firefox
+'''
+
+# (name, hook line, menu answers)
+cases = [
+    ("focus_changed", "focus_changed\t0x1000002\ttitle", None),
+    ("tag_changed", "tag_changed\ttag1\t0", None),
+    ("tag_added", "tag_added\tnew", None),
+    ("rule", "rule\tnobody\t0x1000002", None),
+    ("last_window", "last_window", None),
+    ("herbie_stats", "herbie_stats", None),
+    ("reinit_idle", "reinit_idle", None),
+    ("window_menu", "window_menu", ["Toggle fullscreen"]),
+    ("window_jump_tag", "window_jump_tag", [0]),
+    ("window_jump_any", "window_jump_any", [0]),
+    ("window_jump_any query", "window_jump_any\tfox", [0]),
+    ("layout_load", "layout_load", [0]),
+    ("layout_load_any", "layout_load_any", [0]),
+    ("layout_save", "layout_save", ["saved"]),
+    ("layout_drop", "layout_drop", [0]),
+    ("task_start", "task_start", ["dev"]),
+    ("task_clear", "task_clear", [[1, 2]]),
+]
+
+
+def make_herbie(args):
+    home = Path(tempfile.mkdtemp())
+    os.environ["HOME"] = str(home)
+    os.environ["XDG_RUNTIME_DIR"] = str(home)
+    alayouts.base_path = home / "layouts"
+    for tag in range(args.tags):
+        for ind in range(args.layouts):
+            alayouts.add_store(alayouts.Layout(
+                f'lay{ind}', f'(split vertical:0.{ind % 9 + 1}:0 '
+                f'(clients max:0) (clients grid:0))'), f'tag{tag}')
+    cfg = home / "herbie.cfg"
+    cfg.write_text(config)
+    herbie = Herbie(cfg)
+    menus = Scripted()
+    herbie.use_menus(lambda render: menus)
+    return herbie, menus
+
+
+async def run_case(herbie, menus, args, line, answers):
+    '''
+    Return (seconds, calls, commands) of one hook on a fresh fake.
+    '''
+    wm = FakeWM(tags=args.tags, clients=args.clients,
+                spawn_delay=args.spawn_delay)
+    wm.listeners.append(herbie.feed)
+    conn = FakeConnection(wm, latency=args.latency)
+    astluft._connection = conn
+    await herbie.state.load()
+    await asyncio.sleep(0.1)    # let ready menus settle
+    menus.answers.clear()
+    menus.answers.extend(answers or ())
+
+    calls, commands = conn.calls, wm.commands
+    t0 = time.perf_counter()
+    herbie.feed(line.encode() + b'\n')
+    await herbie.dispatcher.join()
+    dt = time.perf_counter() - t0
+    await write_behind.flush()
+    return dt, conn.calls - calls, wm.commands - commands
+
+
+async def bench(args):
+    herbie, menus = make_herbie(args)
+    ret = dict()
+    for name, line, answers in cases:
+        if args.only and name not in args.only:
+            continue
+        times = list()
+        for _ in range(args.number):
+            dt, calls, commands = await run_case(herbie, menus, args,
+                                                 line, answers)
+            times.append(dt)
+        ret[name] = dict(ms=1e3 * statistics.median(times),
+                         max_ms=1e3 * max(times),
+                         calls=calls, commands=commands)
+    await herbie.dispatcher.close()
+    return ret
+
+
+def commit():
+    '''
+    Return short hash of HEAD, marked if the tree has changes.
+    '''
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             cwd=here, capture_output=True, text=True,
+                             check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "-uno"],
+                               cwd=here, capture_output=True,
+                               text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return rev + ("-dirty" if dirty else "")
+
+
+def last_other(path, rev):
+    '''
+    Return the last saved record in path not of rev, or None.
+    '''
+    ret = None
+    if not Path(path).exists():
+        return ret
+    for line in Path(path).read_text().splitlines():
+        record = json.loads(line)
+        if record["commit"] != rev:
+            ret = record
+    return ret
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--number", type=int, default=10,
+                        help="number of hooks per handler")
+    parser.add_argument("-c", "--clients", type=int, default=200)
+    parser.add_argument("-t", "--tags", type=int, default=10)
+    parser.add_argument("-l", "--layouts", type=int, default=30,
+                        help="number of stored layouts per tag")
+    parser.add_argument("-L", "--latency", type=float, default=0.0005,
+                        help="seconds per call to herbstluftwm")
+    parser.add_argument("-s", "--spawn-delay", type=float, default=0.02,
+                        help="seconds for a spawned window to appear")
+    parser.add_argument("--only", nargs="*", help="only run these cases")
+    parser.add_argument("--save", help="append results to this file")
+    parser.add_argument("--compare", help="compare with results in this file")
+    args = parser.parse_args()
+
+    got = asyncio.run(bench(args))
+    rev = commit()
+    old = last_other(args.compare, rev) if args.compare else None
+    if old:
+        print(f'compared with {old["commit"]} of {old["date"]}')
+    for name, one in got.items():
+        text = (f'{name:22} median {one["ms"]:8.2f} ms  max {one["max_ms"]:8.2f} ms'
+                f'  calls {one["calls"]:4}  commands {one["commands"]:5}')
+        was = old and old["results"].get(name)
+        if was:
+            text += (f'  was {was["ms"]:8.2f} ms {was["calls"]:4} calls'
+                     f' ({one["ms"] / was["ms"]:5.2f}x)' if was["ms"] else '')
+        print(text)
+
+    if args.save:
+        record = dict(commit=rev, date=time.strftime("%Y-%m-%d %H:%M:%S"),
+                      args={k: v for k, v in vars(args).items()
+                            if k in ("number", "clients", "tags", "layouts",
+                                     "latency", "spawn_delay")},
+                      results=got)
+        with open(args.save, "a") as fp:
+            fp.write(json.dumps(record) + '\n')
+
+
+if '__main__' == __name__:
+    main()
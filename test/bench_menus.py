@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+'''
+Benchmark of the time from a hook to the start of rofi.
+
+  $ python test/bench_menus.py -c 200 -l 300 -n 20
+
+Runs the menu hook handlers of a Herbie with fakehc in place of herbstclient
+and fakerofi in place of rofi.  Menus are built on each hook ("build") or
+kept ready as herbie does by default ("ready").  The time is from calling
+the handler to asking for the fake rofi process to start.  The layout_load
+menu still asks herbstclient for the current layout on each hook.
+'''
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+import herbie.astluft as astluft
+import herbie.alayouts as alayouts
+from herbie.astluft import Snapshot, Client, Tag
+from herbie.aherbie import Herbie
+
+here = Path(__file__).parent
+hooks = ("window_jump_tag", "window_jump_any", "window_menu", "layout_load")
+
+
+def make_herbie(nclients, ntags):
+    cfg = Path(tempfile.mkdtemp()) / "herbie.cfg"
+    cfg.write_text("[herbie]\n")
+    herbie = Herbie(cfg)
+    snap = Snapshot(focused_tag="tag0")
+    for ind in range(ntags):
+        snap.tags[f'tag{ind}'] = Tag(f'tag{ind}', ind, focus_time=ind)
+    for ind in range(nclients):
+        wid = hex(0x1000000 + ind)
+        snap.clients[wid] = Client(wid, f'tag{ind % ntags}', f'window {ind}',
+                                   "XTerm", "xterm", focus_time=ind)
+    herbie.state.snap = snap
+    for ready in herbie.ready.values():
+        ready.render.program = str(here / "fakerofi")
+    return herbie
+
+
+async def bench(herbie, how, number):
+    for ready in herbie.ready.values():
+        ready.enabled = how == "ready"
+    ret = dict()
+    for hook in hooks:
+        handler = getattr(herbie, hook)
+        ready = herbie.ready[hook]
+        times = list()
+        for _ in range(number):
+            # a state change, the ready menu is rebuilt in the background
+            herbie.state.changed()
+            ready.refresh()
+            await asyncio.sleep(2 * ready.delay)
+            t0 = time.monotonic()
+            await handler(None)
+            times.append(ready.render.spawned - t0)
+        ret[hook] = times
+    await astluft.connection().close()
+    return ret
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=20,
+                        help="number of hooks per handler")
+    parser.add_argument("-c", "--clients", type=int, default=200)
+    parser.add_argument("-t", "--tags", type=int, default=10)
+    parser.add_argument("-l", "--layouts", type=int, default=300,
+                        help="number of stored layouts on the tag")
+    args = parser.parse_args()
+
+    astluft.herbstclient = str(here / "fakehc")
+    os.environ["FAKEHC_DUMP"] = \
+        '(split horizontal:0.5:0 (clients vertical:0 0x1) (clients max:0))'
+    alayouts.base_path = Path(tempfile.mkdtemp())
+    os.environ["XDG_RUNTIME_DIR"] = tempfile.mkdtemp()
+    for ind in range(args.layouts):
+        alayouts.add_store(alayouts.Layout(
+            f'lay{ind}', f'(split vertical:0.{ind % 9 + 1}:0 (clients max:0)'
+            f' (clients grid:0))'), "tag0")
+
+    herbie = make_herbie(args.clients, args.tags)
+    for how in ("build", "ready"):
+        got = asyncio.run(bench(herbie, how, args.number))
+        for hook, times in got.items():
+            print(f'{how:5} {hook:16} hook to spawn: '
+                  f'median {1e3*statistics.median(times):7.2f} ms, '
+                  f'max {1e3*max(times):7.2f} ms')
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+'''
+Benchmark of ranking stored layouts by similarity.
+
+  $ python test/bench_similar.py -n 10000 -t 20
+
+Times ranking a collection of random layouts spread over tags, cold (shapes
+not yet indexed) and warm, in full and for the nearest few.
+'''
+import time
+import random
+import argparse
+import herbie.similar as similar
+from herbie.alayouts import Layout
+
+
+def dump(depth, rng):
+    '''
+    Return a random layout with splits nested up to depth.
+    '''
+    if depth == 0 or rng.random() < 0.3:
+        wids = ' '.join(hex(rng.randrange(1 << 24)) for _ in range(rng.randrange(4)))
+        return f'(clients {rng.choice(["vertical", "max", "grid"])}:0 {wids})'
+    orient = rng.choice(["vertical", "horizontal"])
+    return (f'(split {orient}:{rng.choice([0.3, 0.5, 0.6, 0.75]):.6f}:0 '
+            f'{dump(depth - 1, rng)} {dump(depth - 1, rng)})')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=10000,
+                        help="number of stored layouts")
+    parser.add_argument("-t", "--tags", type=int, default=20,
+                        help="number of tags to spread them over")
+    parser.add_argument("-d", "--depth", type=int, default=5,
+                        help="most depth of splits")
+    parser.add_argument("-l", "--limit", type=int, default=100,
+                        help="number of nearest for a limited ranking")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    collection = dict()
+    for n in range(args.number):
+        tag = f'tag{n % args.tags}'
+        collection.setdefault(tag, list()).append(
+            Layout(f'lay{n}', dump(args.depth, rng)))
+    one_tag = {"tag0": collection["tag0"]}
+    cur = dump(args.depth, rng)
+
+    for what, coll, limit in [("cold all tags", collection, args.limit),
+                              ("warm all tags", collection, args.limit),
+                              ("warm all tags, full", collection, None),
+                              ("warm one tag, full", one_tag, None)]:
+        t0 = time.perf_counter()
+        got = similar.rank(cur, coll, limit)
+        dt = time.perf_counter() - t0
+        size = sum(map(len, coll.values()))
+        print(f'{what:22} {size:6} layouts -> {len(got):6}: {1e3*dt:8.1f} ms')
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+'''
+Stress the write-behind of focus times with synthetic focus events.
+
+  $ python test/bench_writeback.py --rate 5000 --seconds 2 --window 0.1
+
+Events go through the fakehc stand-in over the binary pipe.  Reported lag
+is from the first pending write of an attribute to its flush completing.
+'''
+import os
+import time
+import random
+import asyncio
+import argparse
+from pathlib import Path
+import herbie.astluft as astluft
+
+
+async def stress(rate, seconds, nwindows, window):
+    wb = astluft.WriteBehind(window)
+    wids = [hex(0x1200000 + n) for n in range(nwindows)]
+    await astluft.connection().start()
+
+    nevents = int(rate * seconds)
+    tick = 0.01                 # feed events in bursts of this period
+    per_tick = max(1, int(rate * tick))
+    t0 = time.perf_counter()
+    sent = 0
+    while sent < nevents:
+        for _ in range(min(per_tick, nevents - sent)):
+            wid = random.choice(wids)
+            wb.set(f'clients.{wid}.my_focus_time', astluft.now())
+            sent += 1
+        await asyncio.sleep(tick)
+    await asyncio.sleep(2 * window)
+    await wb.flush()
+    dt = time.perf_counter() - t0
+    await astluft.connection().close()
+    return dt, wb.metrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=5000,
+                        help="focus events per second")
+    parser.add_argument("--seconds", type=float, default=2)
+    parser.add_argument("--windows", type=int, default=50)
+    parser.add_argument("--window", type=float, default=0.1,
+                        help="coalescing window in seconds")
+    parser.add_argument("--latency", default="0.0005",
+                        help="seconds fakehc takes per command")
+    args = parser.parse_args()
+
+    astluft.herbstclient = str(Path(__file__).parent / "fakehc")
+    os.environ["FAKEHC_LATENCY"] = args.latency
+
+    dt, m = asyncio.run(stress(args.rate, args.seconds,
+                               args.windows, args.window))
+    print(f'{m["writes"]} events in {dt:.2f} s '
+          f'({m["writes"]/dt:.0f}/s) with {args.windows} windows')
+    print(f'{m["flushes"]} flushes writing {m["flushed"]} attributes, '
+          f'{m["writes"]/max(1, m["flushes"]):.0f} events per flush')
+    print(f'lag mean {1e3*m["lag_mean"]:.1f} ms, max {1e3*m["lag_max"]:.1f} ms')
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,16 @@
+import pytest
+from pathlib import Path
+import herbie.astluft as astluft
+
+fakehc = str(Path(__file__).parent / "fakehc")
+
+
+@pytest.fixture(autouse=True)
+def herbstclient(monkeypatch):
+    '''
+    Talk to fakehc over a fresh pipe, restoring astluft after the test.
+    '''
+    monkeypatch.setattr(astluft, "herbstclient", fakehc)
+    monkeypatch.setattr(astluft, "transport", "pipe")
+    monkeypatch.setattr(astluft, "_connection", None)
+    return fakehc
@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+'''
+A fake herbstluftwm for tests and benchmarks.
+
+FakeWM holds tags with layouts, clients and monitors in memory and runs
+herbstclient commands against them: the attribute tree (attr, get_attr,
+set_attr, new_attr, complete), foreach, sprintf, substitute, chain/and/or,
+dump/load, tag_status, add/use/merge_tag, close/jumpto/move, rules and
+spawn.  Hooks it emits go to each of its listeners as the bytes that
+"herbstclient --idle" would print.
+
+In-process, FakeConnection stands in for astluft.Connection with a per
+call latency and counts of calls and commands:
+
+  wm = FakeWM(tags=10, clients=200)
+  astluft._connection = FakeConnection(wm, latency=0.0005)
+
+Run as a program it is a herbstclient.  A --binary-pipe process keeps one
+model for its life and appends its hooks to $FAKEWM_IDLE if set, which
+an --idle process follows.  Environment variables:
+
+FAKEWM_TAGS :: number of tags to start with.
+FAKEWM_CLIENTS :: number of clients to start with.
+FAKEWM_LATENCY :: seconds to sleep per call.
+FAKEWM_IDLE :: file to pass hooks through.
+'''
+import os
+import re
+import sys
+import time
+import asyncio
+import itertools
+from pathlib import Path
+from collections import Counter
+import herbie.frames as frames
+from herbie.astluft import Reply
+
+classes = [("XTerm", "xterm"), ("Emacs", "emacs"), ("firefox", "Navigator"),
+           ("kitty", "kitty"), ("mpv", "gl")]
+
+
+class FakeWM:
+    '''
+    An in-memory herbstluftwm.
+    '''
+
+    def __init__(self, tags=4, clients=8, monitors=1, spawn_delay=0.0):
+        self.tags = dict()      # name -> attrs, in index order
+        self.trees = dict()     # name -> root Frame
+        self.clients = dict()   # winid -> attrs
+        self.monitors = [dict(index=i, tag="") for i in range(monitors)]
+        self.focused_monitor = 0
+        self.focused_wid = None
+        self.rules = list()
+        self.watched = dict()   # path -> value last seen
+        self.listeners = list()
+        # Seconds from spawn to the window appearing.
+        self.spawn_delay = spawn_delay
+        self.commands = 0
+        self._wids = itertools.count(0x1000001)
+
+        for ind in range(max(tags, 1)):
+            self._add_tag(f'tag{ind}')
+        names = list(self.tags)
+        for ind, mon in enumerate(self.monitors):
+            mon["tag"] = names[ind % len(names)]
+        for ind in range(clients):
+            klass, instance = classes[ind % len(classes)]
+            self.new_client(names[ind % len(names)], klass, instance,
+                            f'{instance} window {ind}')
+        if self.clients:
+            self.focused_wid = next(iter(self.clients))
+
+    # model
+
+    def _add_tag(self, name):
+        self.tags[name] = dict(name=name)
+        self.trees[name] = frames.parse("(clients vertical:0)")
+
+    @property
+    def focused_tag(self):
+        return self.monitors[self.focused_monitor]["tag"]
+
+    def leaves(self, tag):
+        return [node for node in self.trees[tag].walk()
+                if node.what == "clients"]
+
+    def place(self, wid, tag, index=None):
+        '''
+        Put a client in the frame at index of tag, else its first frame.
+        '''
+        self.unplace(wid)
+        tree = self.trees[tag]
+        node = tree.get(index) if index is not None else None
+        if node is None or node.what != "clients":
+            node = self.leaves(tag)[0]
+        if not node.wids:
+            node.wids = list()
+        node.wids.append(wid)
+        self.sync(node)
+        self.clients[wid]["tag"] = tag
+
+    def unplace(self, wid):
+        tag = self.clients[wid].get("tag")
+        if tag not in self.trees:
+            return
+        for node in self.leaves(tag):
+            if wid in node.wids:
+                node.wids.remove(wid)
+                self.sync(node)
+
+    @staticmethod
+    def sync(node):
+        '''
+        Make the terms of a frame hold its window IDs for dump.
+        '''
+        node.attrs = [term for term in node.attrs
+                      if not term.startswith("0x")] + list(node.wids)
+
+    def new_client(self, tag, klass, instance, title):
+        wid = hex(next(self._wids))
+        self.clients[wid] = {"winid": wid, "tag": tag, "title": title,
+                             "class": klass, "instance": instance,
+                             "visible": True, "minimized": False}
+        self.place(wid, tag)
+        return wid
+
+    def emit(self, *args):
+        '''
+        Give a hook to the listeners.
+        '''
+        line = '\t'.join(map(str, args)).encode() + b'\n'
+        for listener in self.listeners:
+            listener(line)
+
+    # attribute tree
+
+    def objects(self):
+        '''
+        Return dict of object path to its attributes.
+        '''
+        ret = dict()
+        for wid, attrs in self.clients.items():
+            ret[f'clients.{wid}'] = attrs
+        if self.focused_wid in self.clients:
+            ret['clients.focus'] = self.clients[self.focused_wid]
+        counts = Counter(cli["tag"] for cli in self.clients.values())
+        for ind, (name, attrs) in enumerate(self.tags.items()):
+            attrs["index"] = ind
+            attrs["client_count"] = counts[name]
+            ret[f'tags.{ind}'] = ret[f'tags.by-name.{name}'] = attrs
+        ret['tags.focus'] = self.tags[self.focused_tag]
+        ret['tags'] = dict(count=len(self.tags))
+        for mon in self.monitors:
+            ret[f'monitors.{mon["index"]}'] = mon
+        ret['monitors.focus'] = self.monitors[self.focused_monitor]
+        return ret
+
+    def children(self, path):
+        '''
+        Return paths of objects just under path.
+        '''
+        path = path.rstrip('.')
+        depth = path.count('.') + 1
+        ret = list()
+        for one in self.objects():
+            if one.startswith(path + '.') and one.count('.') == depth:
+                ret.append(one)
+        if path == "tags":
+            ret.append("tags.by-name")
+        return ret
+
+    def get_attr(self, path):
+        obj, _, key = path.rpartition('.')
+        attrs = self.objects().get(obj)
+        if attrs is None or key not in attrs:
+            return None
+        return attrs[key]
+
+    @staticmethod
+    def show(value):
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        return str(value)
+
+    def attr(self, path):
+        path = path.rstrip('.')
+        attrs = self.objects().get(path)
+        if attrs is None:
+            if path == "tags.by-name":
+                return 0, f'{len(self.tags)} children.\n0 attributes.\n'
+            return 1, f'No such object {path}\n'
+        lines = [f'0 children.', f'{len(attrs)} attributes:',
+                 ' .---- type', ' | .-- writable', ' V V V']
+        for key, value in attrs.items():
+            if isinstance(value, bool):
+                kind = "b"
+            elif isinstance(value, int):
+                kind = "u" if key == "index" else "i"
+            else:
+                kind = "s"
+                value = f'"{value}"'
+            lines.append(f' {kind} w - {key} = {self.show(value)}')
+        return 0, '\n'.join(lines) + '\n'
+
+    def set_attr(self, path, value, new=False):
+        obj, _, key = path.rpartition('.')
+        attrs = self.objects().get(obj)
+        if attrs is None or (key in attrs) == new:
+            return 1, ''
+        old = attrs.get(key)
+        attrs[key] = value == "true" if isinstance(old, bool) else value
+        if key == "title" and obj.startswith("clients."):
+            self.emit("window_title_changed", attrs["winid"], value)
+        self.notify()
+        return 0, ''
+
+    def notify(self):
+        '''
+        Emit attribute_changed for each watched attribute that changed.
+        '''
+        for path in self.watched:
+            value = self.get_attr(path)
+            value = None if value is None else self.show(value)
+            old = self.watched[path]
+            if value != old:
+                self.watched[path] = value
+                if old is not None and value is not None:
+                    self.emit("attribute_changed", path, old, value)
+
+    # commands
+
+    def call(self, args):
+        '''
+        Return (status, output) of one top level command, like a call to
+        herbstclient, and emit changes to watched attributes.
+        '''
+        ret = self.run(args)
+        self.notify()
+        return ret
+
+    def run(self, args):
+        '''
+        Return (status, output) of one command.
+        '''
+        if not args:
+            return 1, ''
+        cmd, rest = args[0], args[1:]
+        meth = getattr(self, 'cmd_' + cmd.replace('-', '_'), None)
+        if meth is None:
+            return 1, f'unknown command "{cmd}"\n'
+        self.commands += 1
+        try:
+            return meth(*rest)
+        except (TypeError, ValueError, KeyError, IndexError) as err:
+            return 1, f'{cmd}: {err}\n'
+
+    def _groups(self, rest):
+        sep, rest = rest[0], rest[1:]
+        groups = [[]]
+        for arg in rest:
+            if arg == sep:
+                groups.append([])
+            else:
+                groups[-1].append(arg)
+        return groups
+
+    def cmd_chain(self, *rest):
+        status, output = 0, ''
+        for group in self._groups(rest):
+            status, got = self.run(group)
+            output += got
+        return status, output
+
+    def cmd_and(self, *rest):
+        status, output = 0, ''
+        for group in self._groups(rest):
+            status, got = self.run(group)
+            output += got
+            if status:
+                break
+        return status, output
+
+    def cmd_or(self, *rest):
+        status, output = 1, ''
+        for group in self._groups(rest):
+            status, got = self.run(group)
+            output += got
+            if not status:
+                break
+        return status, output
+
+    def cmd_true(self):
+        return 0, ''
+
+    def cmd_false(self):
+        return 1, ''
+
+    def cmd_echo(self, *rest):
+        return 0, ' '.join(rest) + '\n'
+
+    def cmd_foreach(self, var, path, *command):
+        status, output = 0, ''
+        for child in self.children(path):
+            status, got = self.run([child if a == var else a for a in command])
+            output += got
+        return status, output
+
+    def cmd_sprintf(self, var, fmt, *rest):
+        count = len(re.findall('%s', fmt))
+        values = [self.show(self.get_attr(path)) for path in rest[:count]]
+        text = fmt.replace('%%', '\0') % tuple(values)
+        text = text.replace('\0', '%')
+        return self.run([text if a == var else a for a in rest[count:]])
+
+    def cmd_substitute(self, var, path, *command):
+        value = self.get_attr(path)
+        if value is None:
+            return 1, f'No such attribute {path}\n'
+        value = self.show(value)
+        return self.run([value if a == var else a for a in command])
+
+    def cmd_attr(self, path=""):
+        return self.attr(path)
+
+    def cmd_get_attr(self, path):
+        value = self.get_attr(path)
+        if value is None:
+            return 1, f'No such attribute {path}\n'
+        return 0, self.show(value)
+
+    def cmd_set_attr(self, path, value):
+        return self.set_attr(path, value)
+
+    def cmd_new_attr(self, kind, path, value=""):
+        return self.set_attr(path, value, new=True)
+
+    def cmd_complete(self, pos, cmd, prefix=""):
+        if cmd != "attr":
+            return 0, ''
+        paths = [path + '.' for path in self.objects()]
+        paths.append('tags.by-name.')
+        return 0, ''.join(path + '\n' for path in sorted(set(paths))
+                          if path.startswith(prefix)
+                          and path.count('.') == prefix.count('.') + 1)
+
+    def cmd_watch(self, path):
+        value = self.get_attr(path)
+        self.watched[path] = None if value is None else self.show(value)
+        return 0, ''
+
+    def cmd_emit_hook(self, *rest):
+        self.emit(*rest)
+        return 0, ''
+
+    def cmd_tag_status(self, monitor=None):
+        used = {cli["tag"] for cli in self.clients.values()}
+        parts = list()
+        for name in self.tags:
+            if name == self.focused_tag:
+                parts.append('#' + name)
+            elif name in used:
+                parts.append(':' + name)
+            else:
+                parts.append('.' + name)
+        return 0, '\t' + '\t'.join(parts) + '\t'
+
+    def cmd_dump(self, tag=None):
+        return 0, frames.render(self.trees[tag or self.focused_tag]) + '\n'
+
+    def cmd_load(self, *rest):
+        tag, sexp = rest if len(rest) == 2 else (self.focused_tag, rest[0])
+        tree = frames.parse(sexp)
+        have = frames.wids(self.trees[tag])
+        for node in tree.walk():
+            node.windows = ()
+            node.wids = [wid for wid in node.wids if wid in have]
+        self.trees[tag] = tree
+        placed = set(frames.wids(tree))
+        first = self.leaves(tag)[0]
+        first.wids = list(first.wids)
+        first.wids += [wid for wid in have if wid not in placed]
+        for node in tree.walk():
+            self.sync(node)
+        return 0, ''
+
+    def cmd_add(self, tag):
+        if tag not in self.tags:
+            self._add_tag(tag)
+            self.emit("tag_added", tag)
+        return 0, ''
+
+    def cmd_use(self, tag):
+        if tag not in self.tags:
+            return 1, f'use: Tag "{tag}" not found\n'
+        mon = self.monitors[self.focused_monitor]
+        if mon["tag"] != tag:
+            mon["tag"] = tag
+            self.emit("tag_changed", tag, self.focused_monitor)
+        return 0, ''
+
+    def cmd_focus_monitor(self, index):
+        self.focused_monitor = int(index)
+        return 0, ''
+
+    def cmd_merge_tag(self, tag, target=None):
+        target = target or self.focused_tag
+        if tag not in self.tags or target not in self.tags or tag == target:
+            return 1, f'merge_tag: can not merge {tag} into {target}\n'
+        if any(mon["tag"] == tag for mon in self.monitors):
+            return 1, f'merge_tag: tag {tag} is shown\n'
+        for wid, cli in self.clients.items():
+            if cli["tag"] == tag:
+                self.place(wid, target)
+        del self.tags[tag]
+        del self.trees[tag]
+        self.emit("tag_removed", tag, target)
+        return 0, ''
+
+    def cmd_close(self, wid=None):
+        wid = wid or self.focused_wid
+        if wid not in self.clients:
+            return 1, f'close: no window {wid}\n'
+        self.unplace(wid)
+        del self.clients[wid]
+        if self.focused_wid == wid:
+            self.focused_wid = None
+        return 0, ''
+
+    def cmd_jumpto(self, wid):
+        if wid not in self.clients:
+            return 1, f'jumpto: no window {wid}\n'
+        self.cmd_use(self.clients[wid]["tag"])
+        self.focused_wid = wid
+        self.emit("focus_changed", wid, self.clients[wid]["title"])
+        return 0, ''
+
+    def cmd_move(self, tag):
+        if tag not in self.tags or self.focused_wid is None:
+            return 1, ''
+        self.place(self.focused_wid, tag)
+        return 0, ''
+
+    def cmd_fullscreen(self, *rest):
+        return 0, ''
+
+    def cmd_pseudotile(self, *rest):
+        return 0, ''
+
+    def cmd_rule(self, *rest):
+        rule = dict(once=False, label=None, match={}, then={})
+        for arg in rest:
+            if arg == "once":
+                rule["once"] = True
+                continue
+            key, _, value = arg.partition('=')
+            if key == "label":
+                rule["label"] = value
+            elif key in ("class", "instance", "title"):
+                rule["match"][key] = value
+            elif key in ("tag", "index", "hook"):
+                rule["then"][key] = value
+        self.rules.append(rule)
+        return 0, ''
+
+    def cmd_unrule(self, label):
+        keep = [rule for rule in self.rules if rule["label"] != label]
+        if len(keep) == len(self.rules):
+            return 1, f'unrule: no rule {label}\n'
+        self.rules = keep
+        return 0, ''
+
+    def apply_rules(self, wid):
+        cli = self.clients[wid]
+        for rule in list(self.rules):
+            if any(cli.get(key) != value
+                   for key, value in rule["match"].items()):
+                continue
+            then = rule["then"]
+            if then.get("tag") in self.tags:
+                self.place(wid, then["tag"], then.get("index"))
+            if "hook" in then:
+                self.emit("rule", then["hook"], wid)
+            if rule["once"]:
+                self.rules.remove(rule)
+
+    def cmd_apply_rules(self, wid):
+        if wid not in self.clients:
+            return 1, ''
+        self.apply_rules(wid)
+        return 0, ''
+
+    def cmd_spawn(self, program, *rest):
+        # a window of class and instance named after the program appears
+        name = os.path.basename(program)
+
+        def appear():
+            wid = self.new_client(self.focused_tag, name.capitalize(), name,
+                                  ' '.join([name, *rest]))
+            self.apply_rules(wid)
+            self.notify()
+
+        if self.spawn_delay:
+            asyncio.get_running_loop().call_later(self.spawn_delay, appear)
+        else:
+            appear()
+        return 0, ''
+
+
+class FakeConnection:
+    '''
+    An astluft.Connection calling a FakeWM in-process.
+    '''
+
+    supported = True
+
+    def __init__(self, wm, latency=0.0):
+        self.wm = wm
+        self.latency = latency
+        self.calls = 0
+
+    async def call(self, *args):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        else:
+            await asyncio.sleep(0)
+        return Reply(*self.wm.call(list(args)))
+
+    async def close(self):
+        pass
+
+
+def make_wm():
+    wm = FakeWM(tags=int(os.environ.get("FAKEWM_TAGS", "4")),
+                clients=int(os.environ.get("FAKEWM_CLIENTS", "8")))
+    idle = os.environ.get("FAKEWM_IDLE")
+    if idle:
+        fp = open(idle, "ab", buffering=0)
+        wm.listeners.append(fp.write)
+    return wm
+
+
+def call(wm, args):
+    latency = float(os.environ.get("FAKEWM_LATENCY", "0"))
+    if latency:
+        time.sleep(latency)
+    return wm.call(args)
+
+
+def binary_pipe(wm):
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    buf = b''
+    while True:
+        chunk = os.read(stdin.fileno(), 65536)
+        if not chunk:
+            return
+        buf += chunk
+        *requests, buf = buf.split(b'\0')
+        for req in requests:
+            status, output = call(wm, req.decode().split('\n'))
+            stdout.write(f'{status}\n{output}\0'.encode())
+        stdout.flush()
+
+
+def idle(regex=None):
+    path = os.environ.get("FAKEWM_IDLE")
+    if not path:
+        return 1
+    Path(path).touch()
+    regex = re.compile(regex) if regex else None
+    with open(path, "rb") as fp:
+        fp.seek(0, os.SEEK_END)
+        while True:
+            line = fp.readline()
+            if not line:
+                time.sleep(0.01)
+                continue
+            if regex is None or regex.search(line.decode()):
+                sys.stdout.buffer.write(line)
+                sys.stdout.buffer.flush()
+
+
+def main(argv):
+    if argv[:1] == ['--idle']:
+        return idle(argv[1] if len(argv) > 1 else None)
+    wm = make_wm()
+    if argv[:1] == ['--binary-pipe']:
+        binary_pipe(wm)
+        return 0
+    status, output = call(wm, argv)
+    sys.stdout.write(output)
+    return status
+
+
+if '__main__' == __name__:
+    sys.exit(main(sys.argv[1:]))
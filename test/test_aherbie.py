@@ -0,0 +1,155 @@
+#!/usr/bin/env pytest
+import asyncio
+import herbie.astluft as astluft
+import herbie.events as events
+import herbie.aherbie as aherbie
+from herbie.astluft import Client
+from herbie.hmenu import Scripted
+from herbie.aherbie import Herbie
+from fakewm import FakeWM, FakeConnection
+
+
+def make_herbie(tmp_path, text="[herbie]\nready_menus = no\n"):
+    cfgfile = tmp_path / "herbie.cfg"
+    cfgfile.write_text(text)
+    return Herbie(cfgfile)
+
+
+def test_spawn_placed(tmp_path):
+    herbie = make_herbie(tmp_path)
+    herbie.task_timeout = 0.3
+    spawns = [("term", "0", ["class=XTerm"], "true"),
+              ("web", "1", ["class=Firefox"], "true"),
+              ("lost", "1", ["class=Nope"], "true")]
+
+    async def appear():
+        # windows appear in their own time, the last never
+        while len(herbie.placing) < 3:
+            await asyncio.sleep(0.01)
+        names = sorted(herbie.placing, key=lambda n: int(n.rsplit("-", 1)[1]))
+        await asyncio.sleep(0.05)
+        await herbie.rule(events.rule(names[1], "0x2"))
+        await herbie.rule(events.rule("someone-else", "0x3"))
+        await herbie.rule(events.rule(names[0], "0x1"))
+
+    async def run():
+        task = asyncio.create_task(appear())
+        got = await herbie.spawn_placed("dev", spawns)
+        await task
+        return got
+
+    got = asyncio.run(run())
+    assert [window for window, _ in got] == ["term", "web", "lost"]
+    term, web, lost = [dt for _, dt in got]
+    assert 0.05 <= web <= term < 0.3
+    assert lost is None
+    assert herbie.placing == {}
+
+
+def test_task_start_reuses(tmp_path, monkeypatch):
+    herbie = make_herbie(tmp_path, '''
+[herbie]
+ready_menus = no
+task_timeout = 0.1
+[tasks]
+dev = (split horizontal:0.5:0 (clients max:0 window:term) (clients max:0 window:web))
+[window term]
+class = XTerm
+command = xterm
+[window web]
+class = Firefox
+command = firefox
+''')
+    herbie.state.snap.clients["0x5"] = Client("0x5", tag="other", klass="XTerm")
+    herbie.use_menus(lambda render: Scripted(["dev"]))
+    monkeypatch.setenv("FAKEHC_DUMP",
+                       "(split horizontal:0.5:0 (clients max:0) (clients max:0))")
+    sent = list()
+
+    class Batch(astluft.Batch):
+        async def flush(self):
+            sent.extend(self.commands)
+            return await super().flush()
+
+    monkeypatch.setattr(aherbie, "hc_batch", Batch)
+
+    asyncio.run(herbie.task_start(None))
+    sent = [' '.join(cmd) for cmd in sent]
+    moved = [cmd for cmd in sent if "apply_rules" in cmd or "class=XTerm" in cmd]
+    assert moved[0].startswith("rule label=herbie-dev-1 class=XTerm tag=dev index=0")
+    assert moved[1] == "apply_rules 0x5"
+    assert "spawn firefox" in sent and "spawn xterm" not in sent
+    assert "unrule herbie-dev-0" in sent      # firefox never appeared
+
+
+def test_task_start_fakewm(tmp_path, monkeypatch):
+    herbie = make_herbie(tmp_path, '''
+[herbie]
+ready_menus = no
+task_timeout = 1
+[tasks]
+dev = (split horizontal:0.5:0 (clients max:0 window:term) (clients max:0 window:edit))
+[window term]
+class = Xterm
+command = xterm
+[window edit]
+class = Emacs
+command = emacs
+''')
+    wm = FakeWM(tags=2, clients=2, spawn_delay=0.01)
+    wm.listeners.append(herbie.feed)
+    monkeypatch.setattr(astluft, "_connection", FakeConnection(wm))
+    herbie.use_menus(lambda render: Scripted(["dev"]))
+
+    async def run():
+        await herbie.state.load()
+        herbie.feed(b'task_start\n')
+        await herbie.dispatcher.join()
+        await herbie.dispatcher.close()
+
+    asyncio.run(run())
+    # the running Emacs is moved, xterm is spawned and appears in place
+    assert wm.focused_tag == "dev"
+    tree = wm.trees["dev"]
+    edit, = tree.get("1").wids
+    term, = tree.get("0").wids
+    assert wm.clients[edit]["class"] == "Emacs" and edit == "0x1000002"
+    assert wm.clients[term]["class"] == "Xterm"
+    assert wm.rules == []
+    assert herbie.placing == {}
+
+
+def test_ready_menus_focus(tmp_path, monkeypatch):
+    herbie = make_herbie(tmp_path, "[herbie]\nready_menus = yes\n")
+    wm = FakeWM(tags=2, clients=4)
+    dumps = list()
+
+    class Counting(FakeConnection):
+        async def call(self, *args):
+            if args[0] == "dump":
+                dumps.append(args)
+            return await super().call(*args)
+
+    monkeypatch.setattr(astluft, "_connection", Counting(wm))
+
+    async def run():
+        await herbie.state.load()
+        await asyncio.sleep(0.1)
+        loaded = len(dumps)
+        # focus and titles do not move windows between tags
+        for wid in list(wm.clients)[:2] * 5:
+            herbie.feed(f'focus_changed\t{wid}\ttitle {wid}\n'.encode())
+            await asyncio.sleep(0.07)
+        await herbie.dispatcher.join()
+        focused = len(dumps) - loaded
+        herbie.feed(b'tag_changed\ttag1\t0\n')
+        await asyncio.sleep(0.1)
+        await herbie.dispatcher.join()
+        await herbie.dispatcher.close()
+        await astluft.write_behind.flush()
+        return loaded, focused, len(dumps) - loaded - focused
+
+    loaded, focused, tagged = asyncio.run(run())
+    assert loaded == 1
+    assert focused == 0
+    assert tagged == 1
@@ -0,0 +1,49 @@
+#!/usr/bin/env pytest
+import herbie.alayouts as layouts
+
+sexp = '(split horizontal:0.44:1 (clients vertical:0) (clients max:1))'
+
+
+def test_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(layouts, "base_path", tmp_path)
+    monkeypatch.setattr(layouts, "_index", dict())
+    for n in range(300):
+        layouts.add_store(layouts.Layout(f'lay{n}', sexp), "dev")
+    scans = layouts.io["scans"]
+    lays = layouts.read_store("dev")
+    assert len(lays) == 300
+    assert layouts.io["scans"] == scans + 1
+
+    # repeated reads and our own writes do not rescan
+    layouts.del_store(lays[0], "dev")
+    layouts.add_store(layouts.Layout('new', sexp), "dev")
+    for _ in range(10):
+        lays = layouts.read_store("dev")
+    assert len(lays) == 300
+    assert "new" in [lay.name for lay in lays]
+    assert layouts.io["scans"] == scans + 1
+
+    # changes from outside are seen
+    (tmp_path / "dev" / "other.layout").write_text(sexp + "\n")
+    assert len(layouts.read_store("dev")) == 301
+    assert layouts.read_store("nope") == []
+
+
+def test_find(tmp_path, monkeypatch):
+    monkeypatch.setattr(layouts, "base_path", tmp_path)
+    monkeypatch.setattr(layouts, "_index", dict())
+    other = '(split vertical:0.5:0 (clients max:0) (clients max:0))'
+    layouts.add_store(layouts.Layout('a', sexp), "dev")
+    layouts.add_store(layouts.Layout('b', other), "dev")
+    layouts.add_store(layouts.Layout('c', sexp.replace(':1', ':0')), "dev")
+    assert layouts.find_store('(split horizontal:0.440000:0 (clients vertical:0 0x1)'
+                              ' (clients max:0 0x2))', "dev") == [
+        layouts.Layout('a', sexp), layouts.Layout('c', sexp.replace(':1', ':0'))]
+
+    # overwriting and removing keep the index current
+    layouts.add_store(layouts.Layout('a', other), "dev")
+    assert [lay.name for lay in layouts.find_store(other, "dev")] == ['a', 'b']
+    layouts.del_store(layouts.Layout('b', other), "dev")
+    assert [lay.name for lay in layouts.find_store(other, "dev")] == ['a']
+    assert [lay.name for lay in layouts.find_store(sexp, "dev")] == ['c']
+    assert layouts.find_store(sexp, "nope") == []
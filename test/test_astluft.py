@@ -0,0 +1,232 @@
+#!/usr/bin/env pytest
+import asyncio
+from pathlib import Path
+import herbie.astluft as astluft
+from fakewm import FakeWM, FakeConnection
+
+fakehc = str(Path(__file__).parent / "fakehc")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_exec_call():
+    r = run(astluft.exec_call("echo", "ohai"))
+    assert r == astluft.Reply(0, "ohai\n")
+    r = run(astluft.exec_call("false"))
+    assert r.status == 1
+
+
+def test_pipe_call():
+    async def doit():
+        conn = astluft.Connection(fakehc)
+        got = await asyncio.gather(*[conn.call("echo", str(n))
+                                     for n in range(100)])
+        await conn.close()
+        return got
+    got = run(doit())
+    assert [r.output for r in got] == [f'{n}\n' for n in range(100)]
+
+
+def test_pipe_restart():
+    async def doit():
+        conn = astluft.Connection(fakehc)
+        assert (await conn.call("echo", "one")).output == "one\n"
+        try:
+            await conn.call("die")
+        except ConnectionError:
+            pass
+        else:
+            assert False, "pipe should have died"
+        got = await conn.call("echo", "two")
+        await conn.close()
+        return got
+    assert run(doit()).output == "two\n"
+
+
+def test_pipe_fallback(monkeypatch):
+    async def doit():
+        got = await astluft.hc("echo ohai")
+        return got, astluft.connection().supported
+    monkeypatch.setenv("FAKEHC_NO_PIPE", "1")
+    got, supported = run(doit())
+    assert got == "ohai\n"
+    assert supported is False
+
+
+def test_pipe_died_after_send():
+    async def doit():
+        # the echo ran before the pipe died so the chain is not run again
+        try:
+            await astluft.call("chain", ",", "echo", "once", ",", "die")
+        except ConnectionError:
+            pass
+        else:
+            assert False, "the chain should not have been retried"
+        return await astluft.call("echo", "again")
+    assert run(doit()) == astluft.Reply(0, "again\n")
+
+
+def test_batch():
+    async def doit():
+        async with astluft.hc_batch() as b:
+            one = b.add("echo one")
+            bad = b.add("false")
+            two = b.add("echo", "two", "2")
+        return one.result(), bad.result(), two.result(), b.results
+    one, bad, two, results = run(doit())
+    assert one == astluft.Reply(0, "one\n")
+    assert bad.status == 1
+    assert two == astluft.Reply(0, "two 2\n")
+    assert len(results) == 3
+
+
+snapshot_text = '''\x1esnap clients.0x1200003
+0 children.
+3 attributes:
+ .---- type
+ | .-- writable
+ V V V
+ s - - class = "Emacs"
+ s - - tag = "dev"
+ s w - title = "a = b"
+ s - - winid = "0x1200003"
+ s w - my_focus_time = "1700000000.5"
+\x1esnap clients.focus
+ V V V
+ s - - winid = "0x1200003"
+\x1esnap tags.0
+ V V V
+ s w - name = "dev"
+ u - - index = 0
+ i - - client_count = 1
+\x1esnap tags.by-name
+\x1esnap tags.focus
+ V V V
+ s w - name = "dev"
+\x1esnap monitors.0
+ V V V
+ u - - index = 0
+ s - - tag = "dev"
+'''
+
+def test_parse_snapshot():
+    snap = astluft.parse_snapshot(snapshot_text)
+    assert list(snap.clients) == ["0x1200003"]
+    cli = snap.clients["0x1200003"]
+    assert cli.klass == "Emacs"
+    assert cli.title == "a = b"
+    assert cli.focus_time == 1700000000.5
+    assert snap.focused_wid == "0x1200003"
+    assert snap.focused_tag == "dev"
+    assert snap.tags["dev"].client_count == 1
+    assert snap.monitors[0].tag == "dev"
+    assert snap.window_times("dev") == [("0x1200003", "dev", 1700000000.5)]
+
+
+def test_write_behind():
+    async def doit():
+        wb = astluft.WriteBehind(window=0.01)
+        for n in range(100):
+            wb.set("clients.0x1.my_focus_time", n)
+            wb.set("tags.by-name.dev.my_focus_time", n)
+        pending = wb.get("clients.0x1.my_focus_time")
+        await asyncio.sleep(0.2)
+        return pending, wb.metrics()
+    pending, m = run(doit())
+    assert pending == "99"
+    assert m["writes"] == 200
+    assert m["flushes"] == 1
+    assert m["flushed"] == 2
+    assert m["pending"] == 0
+
+
+def test_write_behind_failed(monkeypatch):
+    fail = [True]
+
+    class Flaky(astluft.Batch):
+        async def flush(self):
+            if fail.pop():
+                await asyncio.sleep(0.01)
+                raise ConnectionError("herbstclient pipe died")
+            return await super().flush()
+
+    monkeypatch.setattr(astluft, "hc_batch", Flaky)
+
+    async def doit():
+        wb = astluft.WriteBehind()
+        wb.set("clients.0x1.my_focus_time", 1)
+        wb.set("clients.0x2.my_focus_time", 2)
+        flushing = asyncio.create_task(wb.flush())
+        await asyncio.sleep(0)
+        wb.set("clients.0x2.my_focus_time", 3)      # newer than the batch
+        try:
+            await flushing
+        except ConnectionError:
+            pass
+        else:
+            assert False, "flush should have failed"
+        kept = dict(wb.pending)
+        fail.append(False)
+        await wb.flush()
+        return kept, wb.metrics()
+    kept, m = run(doit())
+    assert kept == {"clients.0x1.my_focus_time": ("string", "1"),
+                    "clients.0x2.my_focus_time": ("string", "3")}
+    assert m["flushes"] == 1 and m["flushed"] == 2 and m["pending"] == 0
+
+
+def test_write_behind_retry(monkeypatch):
+    fails = [True, True]
+
+    class Flaky(astluft.Batch):
+        async def flush(self):
+            if fails and fails.pop():
+                raise ConnectionError("herbstclient pipe died")
+            return await super().flush()
+
+    monkeypatch.setattr(astluft, "hc_batch", Flaky)
+
+    async def doit():
+        wb = astluft.WriteBehind(window=0.01)
+        wb.set("clients.0x1.my_focus_time", 1)
+        # fails after 0.01s, then 0.02s later, then works 0.04s later
+        await asyncio.sleep(0.2)
+        return wb.metrics()
+    m = run(doit())
+    assert not fails
+    assert m["flushes"] == 1 and m["pending"] == 0
+
+
+def test_clear_plan():
+    snap = astluft.Snapshot()
+    for ind, name in enumerate(["dev", "web", "mail", "irc"]):
+        snap.tags[name] = astluft.Tag(name, ind)
+    for wid, tag in [("0x1", "dev"), ("0x2", "web"), ("0x3", "mail"),
+                     ("0x4", "irc")]:
+        snap.clients[wid] = astluft.Client(wid, tag=tag)
+
+    # never merge into a tag being cleared, nor go to one
+    got = astluft.clear_plan(snap, ["dev", "mail"], goto="dev")
+    assert got == [("close", "0x1"), ("close", "0x3"),
+                   ("focus_monitor", "0"), ("use", "web"),
+                   ("merge_tag", "dev", "web"), ("merge_tag", "mail", "web")]
+    got = astluft.clear_plan(snap, ["web", "nope"], goto="irc")
+    assert got == [("close", "0x2"), ("focus_monitor", "0"), ("use", "irc"),
+                   ("merge_tag", "web", "dev")]
+    # one tag must remain
+    got = astluft.clear_plan(snap, ["irc", "mail", "web", "dev"])
+    assert [cmd for cmd in got if cmd[0] == "close"] == [
+        ("close", wid) for wid in ["0x1", "0x2", "0x3", "0x4"]]
+    assert ("use", "dev") in got and ("merge_tag", "irc", "dev") in got
+    assert len([cmd for cmd in got if cmd[0] == "merge_tag"]) == 3
+
+
+def test_clear_tag(monkeypatch):
+    wm = FakeWM(tags=3, clients=6)
+    monkeypatch.setattr(astluft, "_connection", FakeConnection(wm))
+    doomed = list(wm.tags)[1]
+    got = run(astluft.clear_tag(doomed))
+    assert got["tags"] == [doomed] and got["failed"] == 0
+    assert doomed not in wm.tags and len(wm.tags) == 2
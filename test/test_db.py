@@ -21,3 +21,44 @@ def test_get_layouts():
     
 def test_del_layouts():
     hdb.del_layouts("test_tag", ["test_layout"])
+
+
+def test_bulk():
+    lays = [hdb.Layout(f'lay{n}', fodder.sexp) for n in range(5000)]
+    for tag in ("a", "b", "c"):
+        hdb.add_layouts(tag, lays, db)
+    assert len(hdb.get_layouts("b", db)) == 5000
+    hdb.del_layouts("b", [lay.name for lay in lays], db)
+    assert hdb.get_layouts("b", db) == []
+    assert "a" in hdb.tags(db)
+
+
+def test_migrate(tmp_path):
+    (tmp_path / "dev").mkdir()
+    (tmp_path / "dev" / "wide.layout").write_text(fodder.sexp + "\n")
+    mdb = hdb.connection(tmp_path / "herbie.db")
+    assert hdb.migrate(mdb, tmp_path) == 1
+    assert hdb.migrate(mdb, tmp_path) == 0
+    assert hdb.get_layouts("dev", mdb) == [hdb.Layout("wide", fodder.sexp)]
+
+
+def test_find(tmp_path):
+    path = tmp_path / "old.db"
+    # a database from before fingerprints
+    old = hdb.sqlite3.connect(path)
+    old.execute("create table layouts (tag text not null, name text not null,"
+                " sexp text not null, primary key (tag, name)) without rowid")
+    old.execute("insert into layouts values ('dev', 'wide', ?)", (fodder.sexp,))
+    old.commit()
+    old.close()
+
+    fdb = hdb.connection(path)
+    same = fodder.sexp.replace("0.44:1", "0.440000:0")
+    hdb.add_layouts("dev", [hdb.Layout("copy", same),
+                            hdb.Layout("tall", "(clients vertical:0)")], fdb)
+    got = hdb.find_layouts("(split horizontal:0.44:0 (clients vertical:0 0x1)"
+                           " (clients max:0))", "dev", fdb)
+    assert [lay.name for lay in got] == ["copy", "wide"]
+    assert hdb.find_layouts(fodder.sexp, "other", fdb) == []
+    # opening another database leaves the default alone
+    assert hdb._default is not fdb
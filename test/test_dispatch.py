@@ -0,0 +1,101 @@
+#!/usr/bin/env pytest
+import os
+import asyncio
+from pathlib import Path
+from herbie.dispatch import Dispatcher
+from herbie.hmenu import Menu, Item, Rofi
+
+fakerofi = str(Path(__file__).parent / "fakerofi")
+
+
+def test_policies():
+    got = list()
+
+    async def slow(name, n):
+        got.append(f'{name}{n}')
+        await asyncio.sleep(0.05)
+        got.append(f'{name}{n}done')
+
+    async def fast(name, n):
+        got.append(f'{name}{n}')
+
+    async def doit():
+        d = Dispatcher(dict(menu="drop", jump="cancel", focus="fast"))
+        d.submit("menu", slow, ("menu", 1))
+        d.submit("jump", slow, ("jump", 1))
+        await asyncio.sleep(0)
+        d.submit("menu", slow, ("menu", 2))     # dropped
+        d.submit("jump", slow, ("jump", 2))     # cancels jump1
+        for n in range(3):                      # not blocked by menus
+            d.submit("focus", fast, ("focus", n))
+        await asyncio.sleep(0.01)
+        assert got[-3:] == ["focus0", "focus1", "focus2"]
+        await asyncio.sleep(0.1)
+        m = d.metrics()
+        await d.close()
+        return m
+
+    m = asyncio.run(doit())
+    assert "menu2" not in got
+    assert "jump1done" not in got
+    assert "jump2done" in got
+    assert m["menu"]["dropped"] == 1
+    assert m["jump"]["cancelled"] == 1
+    assert m["fast"]["done"] == 3
+    assert m["fast"]["depth"] == 0
+
+
+def test_serialize():
+    got = list()
+
+    async def one(n):
+        got.append(n)
+        await asyncio.sleep(0.001)
+        got.append(-n)
+
+    async def doit():
+        d = Dispatcher()
+        for n in range(1, 4):
+            d.submit("last_window", one, (n,))
+        await asyncio.sleep(0.05)
+        await d.close()
+
+    asyncio.run(doit())
+    assert got == [1, -1, 2, -2, 3, -3]
+
+
+def test_cancel_menu(tmp_path, monkeypatch):
+    pids = tmp_path / "pids"
+    monkeypatch.setenv("FAKEROFI_PIDS", str(pids))
+    monkeypatch.setenv("FAKEROFI_CHOICE", "b")
+    rofi = Rofi(program=fakerofi)
+    got = list()
+
+    async def layout_load():
+        menu = Menu([Item("a"), Item("b")])
+        got.append(await rofi(menu))
+
+    async def doit():
+        d = Dispatcher(dict(layout_load="cancel"))
+        monkeypatch.setenv("FAKEROFI_WAIT", "10")   # the user walked away
+        d.submit("layout_load", layout_load, ())
+        while not pids.exists():
+            await asyncio.sleep(0.01)
+        monkeypatch.setenv("FAKEROFI_WAIT", "0")
+        d.submit("layout_load", layout_load, ())
+        await d.join()
+        m = d.metrics()
+        await d.close()
+        return m
+
+    m = asyncio.run(doit())
+    assert m["layout_load"]["cancelled"] == 1
+    assert [[choice.text for choice in one] for one in got] == [["b"]]
+    first, second = [int(pid) for pid in pids.read_text().split()]
+    for pid in (first, second):     # both gone and reaped
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            pass
+        else:
+            assert False, f'rofi {pid} still running'
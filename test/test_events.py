@@ -1,4 +1,5 @@
 #!/usr/bin/env pytest
+import re
 import pytest
 from herbie.events import *
 
@@ -21,3 +22,30 @@ def test_parse():
     e = parse('tag_flags')
     e = parse('tag_removed	foo	irc')
     e = parse('boogie	down	productions')
+
+
+def test_table():
+    got = list()
+    async def handler(event):
+        got.append(event)
+    t = Table(dict(focus_changed=handler, tag_removed=None,
+                   window_jump_any=handler))
+    assert t.lookup(b'tag_flags\n') is None
+    e, h = t.lookup(b'focus_changed\t0x140000b\ttitle\twith tab\n')
+    assert h is handler
+    assert e.winid == 0x140000b
+    e, h = t.lookup(b'tag_removed\tfoo\tirc\n')
+    assert h is None
+    assert e.now == "irc"
+    e, h = t.lookup(b'window_jump_any\n')
+    assert isinstance(e, hook)
+    assert e.name == "window_jump_any"
+    assert e.args == []
+    assert re.match(t.regex(), 'tag_removed\tfoo')
+    assert not re.match(t.regex(), 'tag_removed_not\tfoo')
+
+
+def test_slots():
+    e = parse('urgent\toff\t0x1')
+    assert e.status is False
+    assert not hasattr(e, '__dict__')
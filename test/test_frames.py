@@ -0,0 +1,93 @@
+#!/usr/bin/env pytest
+import random
+import pytest
+import herbie.frames as frames
+from herbie.util import make_tree, render_split
+
+dumps = [
+    '(clients max:0)',
+    '(clients vertical:0 0x1400003 0x1400004)',
+    '(clients )',
+    '(split horizontal:0.500000:0 (clients vertical:0) (clients max:1 0xe00007))',
+    '(split horizontal:0.75:1 (clients window:firefox-rss)'
+    ' (split vertical:0.50:0 (clients window:liferea) (clients )))',
+    '(split vertical:0.6:1\n  (clients grid:0 0xa 0xb)\n  (split horizontal:0.3:0'
+    ' (clients horizontal:1 0xc) (clients max:0 0xd window:term)))',
+]
+
+
+def big_dump(depth, rng):
+    '''
+    Return a random dump with frames nested to depth.
+    '''
+    if depth == 0 or rng.random() < 0.2:
+        layout = rng.choice(["vertical", "horizontal", "max", "grid"])
+        wids = ' '.join(hex(rng.randrange(1 << 24)) for _ in range(rng.randrange(4)))
+        return f'(clients {layout}:{rng.randrange(2)} {wids})'
+    orient = rng.choice(["vertical", "horizontal"])
+    return (f'(split {orient}:{rng.random():.6f}:{rng.randrange(2)} '
+            f'{big_dump(depth - 1, rng)} {big_dump(depth - 1, rng)})')
+
+
+def legacy(text):
+    # Newer sexpdata Symbols are not equal to str so make_tree() misses
+    # giving an empty clients frame its default layout.
+    return text.replace('(clients )', '(clients vertical:0)')
+
+
+def same(frame, node):
+    assert frame.what == str(node.what)
+    assert frame.attrs == ([str(a) for a in node.attrs] or ["vertical:0"])
+    assert frame.orient == getattr(node, "orient", None)
+    assert frame.ratio == getattr(node, "ratio", None)
+    assert frame.selection == getattr(node, "selection", None)
+    assert frame.grid == getattr(node, "grid", None)
+    assert list(frame.wids) == [str(w) for w in getattr(node, "wids", ())]
+    assert list(frame.windows) == [str(w) for w in getattr(node, "windows", ())]
+    assert len(frame.children) == len(node.children)
+    for a, b in zip(frame.children, node.children):
+        same(a, b)
+
+
+def test_roundtrip():
+    rng = random.Random(42)
+    for dump in dumps + [big_dump(8, rng) for _ in range(50)]:
+        tree = frames.parse(dump)
+        same(tree, make_tree(dump))
+        text = frames.render(tree)
+        assert text == legacy(render_split(make_tree(dump)))
+        assert frames.render(frames.parse(text)) == text
+
+
+def test_index():
+    tree = frames.parse(dumps[5])
+    assert [n.index for n in tree.walk()] == ["", "0", "1", "10", "11"]
+    assert tree.get("11").windows == ["term"]
+    assert tree.get("11").path == (tree, tree.get("1"), tree.get("11"))
+    assert tree.get("0").get("1") is None
+    assert tree.get("111") is None
+    assert frames.wids(tree) == ["0xa", "0xb", "0xc", "0xd"]
+    assert len(tree.descendants) == 4
+
+
+def test_errors():
+    for bad in ['', 'clients', '(clients max:0', '(clients max:0))',
+                '(clients bogus:1)', '(split vertical:0.5:0 (clients) '
+                '(clients) (clients))']:
+        with pytest.raises(ValueError):
+            frames.parse(bad)
+
+
+def test_fingerprint():
+    base = '(split horizontal:0.500000:1 (clients vertical:0 0x1) (clients max:1 0x2))'
+    for other in ['(split  horizontal:0.5:0 (clients vertical:1) (clients max:0 window:x))',
+                  '(split horizontal:0.5001:0\n (clients ) (clients max:0 0x3 0x4))']:
+        assert frames.fingerprint(other) == frames.fingerprint(base)
+    for other in ['(split vertical:0.5:1 (clients vertical:0) (clients max:0))',
+                  '(split horizontal:0.6:1 (clients vertical:0) (clients max:0))',
+                  '(split horizontal:0.5:1 (clients grid:0) (clients max:0))',
+                  '(split horizontal:0.5:1 (clients max:0) (clients vertical:0))']:
+        assert frames.fingerprint(other) != frames.fingerprint(base)
+    assert frames.fingerprint(frames.parse(base)) == frames.fingerprint(base)
+    assert frames.canonical(frames.parse(base)) == \
+        '(split horizontal:0.500 (clients vertical) (clients max))'
@@ -0,0 +1,36 @@
+#!/usr/bin/env pytest
+import herbie.fuzzy as fuzzy
+from herbie.hmenu import Menu
+
+texts = ["Mozilla Firefox", "xterm: ~/dev/herbie", "Emacs: fuzzy.py",
+         "firefox-rss", "Liferea", "xterm: htop"]
+
+
+def test_score():
+    assert fuzzy.score("ff", "firefox") is not None
+    assert fuzzy.score("xf", "firefox") is None
+    # substring beats scattered, word start beats middle
+    assert fuzzy.score("fox", "firefox") > fuzzy.score("fox", "f o x")
+    assert fuzzy.score("fox", "fox den") > fuzzy.score("fox", "firefox")
+
+
+def test_rank():
+    matcher = fuzzy.Matcher(texts)
+    got = [texts[ind] for _, ind in matcher.rank("fire")]
+    # equal scores keep their order
+    assert got[:2] == ["Mozilla Firefox", "firefox-rss"]
+    assert "Liferea" not in got
+    assert [texts[ind] for _, ind in matcher.rank("xt", limit=1)] == ["xterm: ~/dev/herbie"]
+    assert len(matcher.rank("e")) == 6
+    assert matcher.rank("zzz") == []
+
+
+def test_select():
+    menu = Menu(prompt="jump")
+    for ind, text in enumerate(texts):
+        menu.add(text, value=ind, active=(ind == 3))
+    got = fuzzy.select(menu, "fire", limit=2)
+    assert got.texts == ["Mozilla Firefox", "firefox-rss"]
+    assert got.values == [0, 3]
+    assert got.active == [1]
+    assert got.prompt == "jump"
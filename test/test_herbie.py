@@ -1,4 +1,4 @@
-from herbie.util import binode, render_split
+from herbie.util import binode, render_split, make_tree
 
 def _test_commands():
     '''
@@ -20,27 +20,6 @@ def _test_commands():
     subprocess.Popen(["firefox-esr","-P","default-esr"])
 
 
-def test_node():
-    top = binode(None, split="vertical", ratio=0.75)
-    u = binode(top, split="horizontal", ratio=0.5)
-    ul = binode(u, command="emacs", match={'class':'Emacs'})
-    ur = binode(u, command="firefox-esr -P default-esr",
-              match=dict(title='Mozilla Firefox'))
-    d = binode(top, command="kitty", match={'class':'kitty'})
-    print(render_split(top))
-    return top
-
-
-def test_task_irc():
-    from herbie.tasks import task_irc
-    tree = task_irc()
-    print('IRC',render_split(tree))
-    
-
-def test_toscreen():
-    top = test_node()
-    toscreen("test", top)
-
 def test_sexp():
     # eg from hc dump
     text = '(split vertical:0.75:0 (split horizontal:0.5:0 (clients vertical:1 0x1e00142 0x3200142) (clients vertical:1 0x1200003 0x1200024)) (clients vertical:1 0x1c0000e 0x300000e))'
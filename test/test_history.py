@@ -0,0 +1,48 @@
+#!/usr/bin/env pytest
+from herbie.astluft import Client
+from herbie.history import FocusHistory
+
+
+def test_mru():
+    h = FocusHistory()
+    h.seed([Client("0x3", "dev", focus_time=3.0),
+            Client("0x1", "dev", focus_time=1.0),
+            Client("0x2", "web", focus_time=2.0)])
+    assert [w for w, t in h.recent()] == ["0x3", "0x2", "0x1"]
+    assert h.nth(1, "dev") == "0x1"
+    assert h.nth(5, "dev") is None
+
+    h.touch("0x1", "dev", 4.0)
+    assert h.nth(0) == "0x1"
+    assert h.nth(1, "dev") == "0x3"
+    assert h.count("dev") == 2
+
+    h.rename_tag("web", "dev")
+    assert [w for w, t in h.recent("dev")] == ["0x1", "0x3", "0x2"]
+    assert h.count("web") == 0
+
+    h.remove("0x3")
+    assert h.count() == 2
+
+
+def test_sync():
+    h = FocusHistory()
+    h.seed([Client("0x1", "dev", focus_time=1.0),
+            Client("0x2", "dev", focus_time=2.0)])
+    h.sync({"0x2": Client("0x2", "web", focus_time=2.0),
+            "0x4": Client("0x4", "web", focus_time=0.5)})
+    assert "0x1" not in h
+    assert [w for w, t in h.recent("web")] == ["0x2", "0x4"]
+
+
+def test_move():
+    h = FocusHistory()
+    h.seed([Client(f'0x{n}', "dev", focus_time=float(n)) for n in range(5)])
+    h.move("0x1", "web")
+    h.move("0x0", "web")
+    assert [w for w, t in h.recent("web")] == ["0x0", "0x1"]
+    assert [w for w, t in h.recent("dev")] == ["0x4", "0x3", "0x2"]
+    assert h.tag("0x0") == "web"
+    h.rename_tag("web", "mail")
+    assert [w for w, t in h.recent("mail")] == ["0x0", "0x1"]
+    assert h.tag("0x1") == "mail" and h.count("web") == 0
@@ -0,0 +1,114 @@
+#!/usr/bin/env pytest
+import asyncio
+from pathlib import Path
+from herbie.hmenu import Menu, Item, Rofi, Scripted, Ready, Choice, RS, NUL, US
+
+fakerofi = str(Path(__file__).parent / "fakerofi")
+
+
+def test_prepare():
+    menu = Menu([Item("a"), Item("b", icon="bi", active=True)],
+                prompt="pick", message="hi")
+    payload = Rofi(multi_select=True).prepare(menu)
+    assert payload.data == f'a{RS}b{NUL}icon{US}bi{US}active{US}true'.encode()
+    cmd = payload.command
+    assert cmd[0] == "rofi"
+    assert cmd[cmd.index("-p") + 1] == "pick"
+    assert cmd[cmd.index("-selected-row") + 1] == "1"
+    assert "-show-icons" in cmd and "-multi-select" in cmd
+
+
+def test_columns():
+    menu = Menu()
+    for ind in range(20000):
+        assert menu.add(f'item {ind % 10000}', value=ind) == ind
+    assert len(menu) == 20000
+    assert menu.index("item 9999") == 9999     # first of duplicates
+    assert menu.index("nope") is None
+    assert menu[3] == Item("item 3", 3)
+    assert menu.payload.count(RS.encode()) == 19999
+    menu.append(Item("<b>x</b>", icon="i", active=True))
+    assert menu.active == [20000] and menu.have_icons
+    assert menu.payload.endswith(f'{RS}<b>x</b>{NUL}icon{US}i{US}active{US}true'.encode())
+
+
+def test_ready(monkeypatch):
+    monkeypatch.setenv("FAKEROFI_CHOICE", "b")
+    version = [0]
+    built = list()
+
+    async def key():
+        return version[0]
+
+    async def build(key):
+        built.append(key)
+        return Menu([Item("a"), Item('b')])
+
+    async def run():
+        ready = Ready(key, build, Rofi(program=fakerofi))
+        got = await ready.show()
+        assert got[0] == 0 and got[2] == [Choice(1, "b")]
+        await ready.show()
+        assert built == [0] and ready.hits == 1
+
+        version[0] += 1
+        ready.refresh()
+        ready.refresh()
+        await asyncio.sleep(2 * ready.delay)
+        assert built == [0, 1]
+        await ready.show()
+        assert ready.hits == 2 and ready.render.spawned
+
+        ready.enabled = False
+        await ready.show()
+        assert built == [0, 1, 1]
+
+    asyncio.run(run())
+
+
+def test_stream(monkeypatch):
+    monkeypatch.setenv("FAKEROFI_CHOICE", "item 7")
+
+    async def items(n):
+        for ind in range(n):
+            yield Item(f'item {ind}')
+            await asyncio.sleep(0)
+
+    async def run():
+        render = Rofi(program=fakerofi)
+        menu = Menu([Item("first")], source=items(10))
+        assert await render(menu) == [Choice(8, "item 7")]
+        assert menu.source is None
+        assert len(menu) == 11 and menu.texts[8] == "item 7"
+
+        menu = Menu(list(), source=items(3))
+        await menu.fill()
+        assert menu.texts == ["item 0", "item 1", "item 2"]
+
+    asyncio.run(run())
+
+
+def test_choices(monkeypatch):
+    # duplicate texts select by index and new text comes back as is
+    monkeypatch.setenv("FAKEROFI_CHOICE", "b\nnew one")
+    menu = Menu([Item("a"), Item("b"), Item("b")])
+    got = asyncio.run(Rofi(program=fakerofi, multi_select=True)(menu))
+    assert got == [Choice(1, "b"), Choice(None, "new one")]
+
+
+def test_scripted():
+    async def items():
+        yield Item("later")
+
+    async def run():
+        render = Scripted(["b", 2, ["a", "new"], lambda menu: len(menu) - 1])
+        menu = Menu([Item("a"), Item("b"), Item("c")])
+        assert await render(menu) == [Choice(1, "b")]
+        assert await render(menu) == [Choice(2, "c")]
+        assert await render(menu) == [Choice(0, "a"), Choice(None, "new")]
+        streamed = Menu([Item("first")], source=items())
+        assert await render(streamed) == [Choice(1, "later")]
+        assert await render(menu) == []
+        assert render.shown == [menu, menu, menu, streamed, menu]
+
+    asyncio.run(run())
@@ -0,0 +1,53 @@
+#!/usr/bin/env pytest
+import os
+from herbie.icons import IconCache
+
+one = '(split horizontal:0.44:1 (clients vertical:0 0x1) (clients max:1 0x2))'
+same = '(split horizontal:0.44:0 (clients vertical:0 0xa0) (clients grid:0))'
+other = '(split vertical:0.50:1 (clients vertical:0) (clients max:1))'
+
+
+def test_icon(tmp_path):
+    cache = IconCache(tmp_path)
+    path = cache.icon(one)
+    assert os.path.exists(path)
+    assert path.startswith(str(tmp_path))
+    assert "<line" in open(path).read()
+
+    # same geometry, one file
+    assert cache.icon(same) == path
+    assert cache.icon(one) == path
+    assert cache.made == 1
+    assert cache.icon(other) != path
+    assert cache.made == 2
+
+    # a new cache finds what is on disk
+    again = IconCache(tmp_path)
+    assert again.icon(same) == path
+    assert again.made == 0
+
+
+def test_evict(tmp_path):
+    cache = IconCache(tmp_path, capacity=3)
+    paths = [cache.icon(f'(split horizontal:0.{n}:0 (clients max:0) '
+                        '(clients max:0))') for n in range(1, 6)]
+    left = sorted(os.listdir(tmp_path))
+    assert len(left) == 3
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[-1])
+
+    # a use counts for the next run too
+    os.utime(paths[2], (0, 0))
+    os.utime(paths[3], (1, 1))
+    os.utime(paths[4], (2, 2))
+    cache.icon('(split horizontal:0.3:0 (clients max:0) (clients max:0))')
+    again = IconCache(tmp_path, capacity=3)
+    again.icon(other)
+    assert os.path.exists(paths[2])
+    assert not os.path.exists(paths[3])
+
+    # a removed file is made again
+    os.remove(paths[2])
+    assert again.icon('(split horizontal:0.3:0 (clients max:0) '
+                      '(clients max:0))') == paths[2]
+    assert os.path.exists(paths[2])
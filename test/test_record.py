@@ -0,0 +1,163 @@
+#!/usr/bin/env pytest
+import os
+import asyncio
+from time import monotonic
+import herbie.astluft as astluft
+import herbie.hmenu as hmenu
+import herbie.icons as icons
+import herbie.alayouts as alayouts
+from herbie.hmenu import Scripted
+from herbie.record import Recorder, load, replay
+from fakewm import FakeWM, FakeConnection
+from test_aherbie import make_herbie
+
+lines = [b'focus_changed\t0x1000002\temacs window 1\n',
+         b'window_jump_any\n',
+         b'tag_changed\ttag1\t0\n',
+         b'window_menu\n']
+
+
+def test_record_replay(tmp_path, monkeypatch):
+    path = tmp_path / "session.jsonl.gz"
+    herbie = make_herbie(tmp_path)
+    wm = FakeWM(tags=3, clients=6)
+    menus = Scripted([3, "Close"])
+    herbie.use_menus(lambda render: menus)
+    recorder = Recorder(path)
+    recorder.install(herbie)
+    monkeypatch.setattr(astluft, "_connection", FakeConnection(wm))
+
+    async def record():
+        await astluft.init_my_focus_time()
+        await herbie.state.load()
+        for line in lines:
+            herbie.feed(line)
+            await herbie.dispatcher.join()
+            await asyncio.sleep(0.01)
+        await astluft.write_behind.flush()
+        await herbie.dispatcher.close()
+
+    asyncio.run(record())
+    recorder.close()
+    assert recorder.call not in astluft.observers
+    assert recorder.menu not in hmenu.observers
+    assert len(wm.clients) == 5     # one closed from the window menu
+
+    header, records = load(path)
+    assert "herbie" in header
+    kinds = [rec[0] for rec in records]
+    assert kinds.count("hook") == 4 and kinds.count("menu") == 2
+    assert ["hc"] == list({kind for kind in kinds} - {"hook", "menu"})
+
+    again = make_herbie(tmp_path)
+    got = asyncio.run(replay(again, path, fast=True))
+    assert got["hooks"] == 4
+    assert got["menus"] == 2 == got["recorded_menus"]
+    assert got["missed"] == 0
+    assert got["exact"] >= got["calls"] - 2   # focus times differ
+    assert "lane window_menu" in got
+
+    # at recorded speed it takes at least as long as the hooks were apart
+    again = make_herbie(tmp_path)
+    got = asyncio.run(replay(again, path))
+    assert got["seconds"] >= got["recorded_seconds"] > 0
+    assert got["menus"] == 2
+
+
+def test_replay_keeps_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(alayouts, "base_path", tmp_path / "layouts")
+    monkeypatch.setattr(alayouts, "_index", dict())
+    monkeypatch.setattr(icons, "_cache", icons.IconCache(tmp_path / "icons"))
+    path = tmp_path / "session.jsonl"
+    herbie = make_herbie(tmp_path)
+    wm = FakeWM(tags=3, clients=6)
+    old = alayouts.Layout("old", "(clients max:0)")
+    alayouts.add_store(old, wm.focused_tag)
+    menus = Scripted(["mine", "old"])
+    herbie.use_menus(lambda render: menus)
+    recorder = Recorder(path)
+    recorder.install(herbie)
+    monkeypatch.setattr(astluft, "_connection", FakeConnection(wm))
+
+    async def record():
+        await astluft.init_my_focus_time()
+        await herbie.state.load()
+        for line in [b'layout_save\n', b'layout_drop\n']:
+            herbie.feed(line)
+            await herbie.dispatcher.join()
+        await herbie.dispatcher.close()
+
+    asyncio.run(record())
+    recorder.close()
+    tag_path = alayouts.tag_path(wm.focused_tag)
+    assert sorted(one.stem for one in tag_path.glob("*.layout")) == ["mine"]
+
+    # the user's store as it was before the recording
+    (tag_path / "mine.layout").unlink()
+    alayouts.add_store(old, wm.focused_tag)
+    before = {one: one.read_text() for one in tmp_path.rglob("*")
+              if one.is_file() and one.suffix != ".jsonl"}
+    saved = alayouts.base_path, alayouts._index, icons._cache
+
+    again = make_herbie(tmp_path)
+    got = asyncio.run(replay(again, path, fast=True))
+    assert got["menus"] == 2
+    after = {one: one.read_text() for one in tmp_path.rglob("*")
+             if one.is_file() and one.suffix != ".jsonl"}
+    assert after == before
+    assert (alayouts.base_path, alayouts._index, icons._cache) == saved
+
+
+def test_replay_without_init(tmp_path):
+    path = tmp_path / "session.jsonl"
+    herbie = make_herbie(tmp_path)
+    recorder = Recorder(path)
+    recorder.install(herbie)
+    recorder.hook(b'focus_changed\t0x1000002\temacs window 1\n', monotonic())
+    recorder.close()
+
+    again = make_herbie(tmp_path)
+    assert again.focus_attrs
+    got = asyncio.run(replay(again, path, fast=True))
+    assert got["hooks"] == 1
+    assert got["missed"] >= 1
+
+
+def test_record_reload(tmp_path, monkeypatch):
+    path = tmp_path / "session.jsonl.gz"
+    monkeypatch.setattr(os, "execv", lambda *args: None)
+    for part in range(2):
+        herbie = make_herbie(tmp_path)
+        recorder = Recorder(path)
+        recorder.install(herbie)
+        recorder.hook(b'focus_changed\t0x1000002\temacs window 1\n',
+                      monotonic())
+        recorder.hook(b'reload\n', monotonic())
+        asyncio.run(herbie.reload(None))    # closes the recording
+        assert recorder.fp.closed and recorder.hook not in herbie.observers
+
+    header, records = load(path)
+    assert "herbie" in header
+    assert [rec[2] for rec in records] == [
+        "focus_changed\t0x1000002\temacs window 1", "reload"] * 2
+    times = [rec[1] for rec in records]
+    assert times == sorted(times)
+
+
+def test_load_cut_short(tmp_path):
+    path = tmp_path / "session.jsonl.gz"
+    herbie = make_herbie(tmp_path)
+    recorder = Recorder(path)
+    recorder.install(herbie)
+    for n in range(1000):
+        recorder.hook(f'focus_changed\t0x{n:x}\twindow {n}\n'.encode(),
+                      monotonic())
+    recorder.close()
+    whole = path.read_bytes()
+    path.write_bytes(whole[:len(whole) // 2])     # killed while writing
+
+    header, records = load(path)
+    assert "herbie" in header
+    assert 0 < len(records) < 1000
+    assert [rec[2] for rec in records] == [
+        f'focus_changed\t0x{n:x}\twindow {n}' for n in range(len(records))]
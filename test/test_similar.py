@@ -0,0 +1,37 @@
+#!/usr/bin/env pytest
+import herbie.similar as similar
+from herbie.frames import parse
+from herbie.alayouts import Layout
+
+cur = '(split horizontal:0.5:0 (clients vertical:0 0x1) (clients max:0 0x2 0x3))'
+
+lays = [
+    Layout("deep", '(split horizontal:0.5:0 (split vertical:0.5:0 (clients max:0)'
+           ' (clients max:0)) (split vertical:0.5:0 (clients max:0) (clients max:0)))'),
+    Layout("same", '(split horizontal:0.500000:1 (clients vertical:0) (clients max:0))'),
+    Layout("tall", '(split vertical:0.5:0 (clients vertical:0) (clients max:0))'),
+    Layout("one", '(clients max:0)'),
+    Layout("near", '(split horizontal:0.6:0 (clients vertical:0 0x1) (clients max:0 0x2 0x3))'),
+    Layout("bad", '(split oops)'),
+]
+
+
+def test_distance():
+    a = similar.shape(parse(cur))
+    assert similar.distance(a, a) == 0
+    for lay in lays[:5]:
+        b = similar.shape(parse(lay.sexp))
+        assert similar.distance(a, b) == similar.distance(b, a)
+    assert similar.size(similar.shape(parse(lays[0].sexp))) == 7
+    assert similar.features(a) == (3, 2, 0, 1, 3, 1, 0, 0.5)
+
+
+def test_rank():
+    got = similar.rank(cur, {"dev": lays})
+    assert [lay.name for _, _, lay in got] == ["same", "near", "tall", "one", "deep"]
+    # the same fingerprint is as near as can be
+    assert got[0][0] == 0 and got[0][0] < got[1][0]
+    got = similar.rank(cur, {"dev": lays, "web": lays[1:2]}, limit=2)
+    assert [(tag, lay.name) for _, tag, lay in got] == [("dev", "same"), ("web", "same")]
+    got = similar.rank(cur, {"dev": lays}, limit=1)
+    assert [lay.name for _, _, lay in got] == ["same"]
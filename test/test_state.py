@@ -0,0 +1,109 @@
+#!/usr/bin/env pytest
+import asyncio
+import herbie.astluft as astluft
+from herbie.astluft import parse_snapshot
+from herbie.events import parse
+from herbie.astluft import Client
+from herbie.state import Mirror, ClientIndex
+
+from fakewm import FakeWM, FakeConnection
+from test_astluft import snapshot_text
+
+
+def make_mirror():
+    m = Mirror()
+    m.snap = parse_snapshot(snapshot_text)
+    return m
+
+
+def test_follow():
+    m = make_mirror()
+    m.apply(parse('tag_added\tweb'))
+    assert list(m.snap.tags) == ["dev", "web"]
+    m.apply(parse('tag_changed\tweb\t0'), time=10.0)
+    assert m.focused_tag == "web"
+    assert m.snap.tags["web"].focus_time == 10.0
+    assert m.snap.monitors[0].tag == "web"
+    assert m.tag_status() == {"dev": ":", "web": "#"}
+
+    m.apply(parse('window_title_changed\t0x1200003\tnew title'))
+    assert m.snap.clients["0x1200003"].title == "new title"
+
+    m.apply(parse('tag_renamed\tdev\tcode'))
+    assert list(m.snap.tags) == ["code", "web"]
+    assert m.snap.clients["0x1200003"].tag == "code"
+
+    m.apply(parse('tag_removed\tcode\tweb'))
+    assert list(m.snap.tags) == ["web"]
+    assert m.window_ids() == [("0x1200003", "web")]
+
+
+def test_drift():
+    m = make_mirror()
+    fresh = parse_snapshot(snapshot_text)
+    assert m.drift(fresh) == []
+    m.snap.clients["0x1200003"].title = "stale"
+    assert len(m.drift(fresh)) == 1
+
+
+def test_client_index():
+    index = ClientIndex([Client("0x1", klass="XTerm", instance="xterm", title="a"),
+                         Client("0x2", klass="XTerm", instance="irc", title="b"),
+                         Client("0x3", klass="Firefox", title="a")])
+    assert index.find({"class": "XTerm"}) == ["0x1", "0x2"]
+    assert index.find({"class": "XTerm", "instance": "irc"}) == ["0x2"]
+    assert index.find({"title": "a", "class": "Firefox"}) == ["0x3"]
+    assert index.find({"class": "Nope"}) == []
+    assert index.find({"pid": "1"}) == []
+    index.remove("0x1")
+    assert index.find({"class": "XTerm"}) == ["0x2"]
+    assert "xterm" not in index.by["instance"]
+
+
+def test_find_clients():
+    m = make_mirror()
+    assert m.find_clients({"class": "Emacs"}) == ["0x1200003"]
+    m.apply(parse('window_title_changed\t0x1200003\tnew title'))
+    assert m.find_clients({"class": "Emacs", "title": "a = b"}) == []
+    assert m.find_clients({"title": "new title"}) == ["0x1200003"]
+    m.schedule_resync = lambda: None
+    m.apply(parse('focus_changed\t0x1400001\tirssi'))
+    assert m.find_clients({"title": "irssi"}) == ["0x1400001"]
+    # a fresh snapshot gets a fresh index
+    m.snap = parse_snapshot(snapshot_text)
+    assert m.find_clients({"title": "a = b"}) == ["0x1200003"]
+
+
+def test_watches(monkeypatch):
+    wm = FakeWM(tags=3, clients=7)     # tags hold 3, 2 and 2
+    m = Mirror()
+    m.resync_delay = 0.01
+    snapshots = list()
+
+    class Counting(FakeConnection):
+        async def call(self, *args):
+            if args[:1] == ("chain",) and "foreach" in args:
+                snapshots.append(args)
+            return await super().call(*args)
+
+    monkeypatch.setattr(astluft, "_connection", Counting(wm))
+    wm.listeners.append(lambda line: m.apply(parse(line.decode().rstrip("\n"))))
+
+    async def run():
+        await m.load()
+        loaded = len(snapshots)
+        # showing tags does not change what is on them
+        for tag in ["tag1", "tag2", "tag0"] * 3:
+            await astluft.hc("use", tag)
+        await asyncio.sleep(0.05)
+        shown = len(snapshots) - loaded
+        # a window closing on a tag not shown is noticed
+        gone, = [wid for wid, cli in wm.clients.items()
+                 if cli["tag"] == "tag2"][:1]
+        await astluft.hc("close", gone)
+        await asyncio.sleep(0.05)
+        return shown, gone
+
+    shown, gone = asyncio.run(run())
+    assert shown == 0
+    assert gone not in m.snap.clients
@@ -0,0 +1,80 @@
+#!/usr/bin/env pytest
+import json
+import asyncio
+import herbie.stats as stats
+from herbie.stats import Histogram
+from herbie.dispatch import Dispatcher
+
+
+def test_histogram():
+    hist = Histogram()
+    for _ in range(90):
+        hist.observe(0.0003)
+    for _ in range(10):
+        hist.observe(0.03)
+    assert hist.count == 100
+    assert hist.quantile(0.5) == 0.0005
+    assert hist.quantile(0.9) == 0.0005
+    assert hist.quantile(0.99) == 0.03     # bucket bound above the max
+    one = hist.summary()
+    assert abs(one["mean"] - 0.00327) < 1e-9
+    assert one["max"] == 0.03
+
+
+def test_dump_undump(tmp_path):
+    stats.reset()
+    stats.observe("hc", 0.001, who="layout_load")
+    stats.observe("hc", 20.0, who="layout_load")
+    stats.count("hc.failed", who="layout_load")
+    path = tmp_path / "stats.json"
+    stats.save(path)
+    hists, counts = stats.undump(json.loads(path.read_text()))
+    assert hists[("hc", "layout_load")].counts == \
+        stats.histograms[("hc", "layout_load")].counts
+    assert counts == {("hc.failed", "layout_load"): 1}
+    assert stats.lines(hists, counts) == stats.lines()
+    stats.reset()
+
+
+def test_prometheus():
+    hist = Histogram()
+    hist.observe(0.0015)
+    hist.observe(0.3)
+    text = stats.prometheus({("hook", "rule"): hist}, {("hc.failed", ""): 2})
+    assert 'herbie_seconds_bucket{what="hook",handler="rule",le="0.001"} 0' in text
+    assert 'herbie_seconds_bucket{what="hook",handler="rule",le="0.002"} 1' in text
+    assert 'herbie_seconds_bucket{what="hook",handler="rule",le="+Inf"} 2' in text
+    assert 'herbie_seconds_count{what="hook",handler="rule"} 2' in text
+    assert 'herbie_events_total{what="hc.failed",handler=""} 2' in text
+
+
+def test_timed_handler():
+    stats.reset()
+
+    @stats.timed("store.read")
+    def read():
+        return 1
+
+    @stats.timed("parse")
+    async def parse():
+        await asyncio.sleep(0)
+
+    async def layout_load(event):
+        read()
+        # tasks started by the handler count for it too
+        await asyncio.create_task(parse())
+
+    async def doit():
+        d = Dispatcher(dict())
+        d.submit("layout_load", layout_load, ("ev",))
+        await d.join()
+        await d.close()
+
+    asyncio.run(doit())
+    read()
+    assert stats.histograms[("store.read", "layout_load")].count == 1
+    assert stats.histograms[("store.read", "")].count == 1
+    assert stats.histograms[("parse", "layout_load")].count == 1
+    assert stats.histograms[("hook", "layout_load")].count == 1
+    assert stats.histograms[("hook.lag", "layout_load")].count == 1
+    stats.reset()
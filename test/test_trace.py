@@ -0,0 +1,87 @@
+#!/usr/bin/env pytest
+import os
+import json
+import asyncio
+import herbie.astluft as astluft
+import herbie.hmenu as hmenu
+import herbie.stats as stats
+from herbie.hmenu import Scripted
+from herbie.trace import Tracer
+from fakewm import FakeWM, FakeConnection
+from test_aherbie import make_herbie
+
+
+def test_trace_task_start(tmp_path, monkeypatch):
+    herbie = make_herbie(tmp_path, '''
+[herbie]
+ready_menus = no
+task_timeout = 1
+[tasks]
+dev = (split horizontal:0.5:0 (clients max:0 window:term) (clients max:0 window:web))
+[window term]
+class = Xterm
+command = xterm
+[window web]
+class = Firefox
+command = firefox
+''')
+    wm = FakeWM(tags=2, clients=2, spawn_delay=0.01)
+    wm.listeners.append(herbie.feed)
+    herbie.use_menus(lambda render: Scripted(["dev"]))
+    path = tmp_path / "trace.json"
+    tracer = Tracer(path)
+    tracer.install(herbie)
+    monkeypatch.setattr(astluft, "_connection", FakeConnection(wm))
+
+    async def run():
+        await herbie.state.load()
+        herbie.feed(b'task_start\n')
+        await herbie.dispatcher.join()
+        await herbie.dispatcher.close()
+
+    asyncio.run(run())
+    tracer.close()
+    assert tracer.timed not in stats.spans
+    assert tracer.call not in astluft.observers
+    assert tracer.menu not in hmenu.observers
+
+    events = json.loads(path.read_text())
+    spans = [ev for ev in events if ev["ph"] == "X"]
+    hook, = [ev for ev in spans if ev["name"] == "task_start"]
+    assert hook["cat"] == "hook"
+    menu, = [ev for ev in spans if ev["cat"] == "menu"]
+    assert menu["args"]["handler"] == "task_start"
+    assert menu["tid"] == hook["tid"]
+    # what the handler did lies within its span
+    inside = [ev for ev in spans
+              if ev.get("args", {}).get("handler") == "task_start"]
+    assert {ev["cat"] for ev in inside} == {"menu", "parse", "hc"}
+    for ev in inside:
+        assert hook["ts"] <= ev["ts"]
+        assert ev["ts"] + ev["dur"] <= hook["ts"] + hook["dur"] + 1
+    # the rule hooks of the spawned windows ran on tracks of their own
+    rules = [ev for ev in spans if ev["name"] == "rule"]
+    assert len(rules) == 2
+    assert len({hook["tid"]} | {ev["tid"] for ev in rules}) == 3
+    names = {ev["tid"]: ev["args"]["name"] for ev in events
+             if ev["ph"] == "M" and ev["name"] == "thread_name"}
+    assert names[hook["tid"]].startswith("task_start Lane._run")
+
+
+def test_trace_reload(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "execv", lambda *args: None)
+    path = tmp_path / "trace.json"
+    for part in range(3):
+        herbie = make_herbie(tmp_path)
+        tracer = Tracer(path)
+        tracer.install(herbie)
+        stats.span("store.read", tracer.start, 0.001)
+        # on disk before the trace is closed
+        assert '"store.read"' in path.read_text()
+        asyncio.run(herbie.reload(None))    # closes the trace
+        assert tracer.fp.closed and tracer.timed not in stats.spans
+    names = sorted(one.name for one in tmp_path.glob("trace*.json"))
+    assert names == ["trace.1.json", "trace.2.json", "trace.json"]
+    for name in names:
+        events = json.loads((tmp_path / name).read_text())
+        assert [ev["name"] for ev in events if ev["ph"] == "X"] == ["store.read"]